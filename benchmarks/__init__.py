@@ -0,0 +1,47 @@
+"""Benchmarks are standalone scripts, run from the project root with, for
+example, python -m benchmarks.auth_queries. Each one runs against a throwaway
+test database, so they can be run anywhere the test suite can."""
+
+import os
+import time
+import django
+from contextlib import contextmanager
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+django.setup()
+from django.db import connection
+from django.core.management import call_command
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+@contextmanager
+def test_database(fixtures=None):
+    """Creates a test database for the duration of the block, optionally
+    loading some fixtures into it, and destroys it afterwards."""
+
+    setup_test_environment()
+    name = connection.creation.create_test_db(verbosity=0)
+    try:
+        if fixtures: call_command("loaddata", *fixtures, verbosity=0)
+        yield
+    finally:
+        connection.creation.destroy_test_db(name, verbosity=0)
+        teardown_test_environment()
+
+
+def timed(function, repeat=100):
+    """Calls a function repeatedly and returns the mean time per call, in
+    seconds."""
+
+    start = time.perf_counter()
+    for _ in range(repeat): function()
+    return (time.perf_counter() - start) / repeat
+
+
+def print_table(headers, rows):
+    """Prints rows of values as an aligned plain text table."""
+
+    rows = [[str(value) for value in row] for row in rows]
+    widths = [max(len(str(h)), *(len(r[i]) for r in rows)) for i, h in enumerate(headers)]
+    print("  ".join(str(h).ljust(w) for h, w in zip(headers, widths)))
+    print("  ".join("-" * w for w in widths))
+    for row in rows:
+        print("  ".join(value.ljust(w) for value, w in zip(row, widths)))
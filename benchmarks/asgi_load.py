@@ -0,0 +1,103 @@
+"""Load tests the GraphQL endpoint served over WSGI, by Django's threaded
+server, and over ASGI, by uvicorn running core.asgi, reporting requests per
+second, median and 99th percentile latency, and how many threads the server
+needed. A number of idle keep-alive connections are held open throughout, as
+browsers do, to show what each one costs.
+
+Both servers run in this process against the same throwaway database, so the
+client threads share the GIL with them - the absolute numbers are lower than
+a real deployment would see, but the two paths are measured the same way."""
+
+import time
+import socket
+import threading
+import http.client
+import uvicorn
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.core.wsgi import get_wsgi_application
+from core.models import User
+from benchmarks import test_database, print_table
+
+QUERY = b'{"query": "{ user { name slots { name order } projects { name } } }"}'
+
+class QuietHandler(WSGIRequestHandler):
+
+    def log_message(self, *args): pass
+
+
+
+def serve_wsgi(port):
+    """Starts Django's threaded WSGI server in the background."""
+
+    server = ThreadedWSGIServer(("127.0.0.1", port), QuietHandler)
+    server.set_app(get_wsgi_application())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server.shutdown
+
+
+def serve_asgi(port):
+    """Starts uvicorn serving core.asgi in the background."""
+
+    from core.asgi import application
+    server = uvicorn.Server(uvicorn.Config(
+        application, host="127.0.0.1", port=port, log_level="warning",
+        lifespan="off"
+    ))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started: time.sleep(0.01)
+    def stop(): server.should_exit = True
+    return stop
+
+
+def load(port, token, clients, requests, idle):
+    """Holds idle connections open while some clients send requests as fast as
+    they can over keep-alive connections. Returns requests per second, the
+    sorted latencies and the most threads seen running."""
+
+    sockets = [socket.create_connection(("127.0.0.1", port)) for _ in range(idle)]
+    latencies, lock, peak = [], threading.Lock(), [threading.active_count()]
+    headers = {
+        "Host": "testserver", "Content-Type": "application/json",
+        "Authorization": f"Bearer {token}"
+    }
+
+    def client():
+        connection = http.client.HTTPConnection("127.0.0.1", port)
+        for _ in range(requests):
+            start = time.perf_counter()
+            connection.request("POST", "/graphql", QUERY, headers)
+            response = connection.getresponse()
+            assert response.status == 200 and b"errors" not in response.read()
+            with lock:
+                latencies.append(time.perf_counter() - start)
+                peak[0] = max(peak[0], threading.active_count())
+        connection.close()
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    start = time.perf_counter()
+    for thread in threads: thread.start()
+    for thread in threads: thread.join()
+    elapsed = time.perf_counter() - start
+    for sock in sockets: sock.close()
+    return len(latencies) / elapsed, sorted(latencies), peak[0] - clients
+
+
+def main(clients=32, requests=50, idle=200):
+    rows = []
+    with test_database(["users.json", "slots.json", "projects.json"]):
+        token = User.objects.get(email="jack@gmail.com").make_access_jwt()
+        for name, serve, port in [("wsgi", serve_wsgi, 8701), ("asgi", serve_asgi, 8702)]:
+            stop = serve(port)
+            load(port, token, 4, 10, 0)
+            rps, latencies, threads = load(port, token, clients, requests, idle)
+            stop()
+            rows.append([
+                name, f"{rps:.0f}", f"{latencies[len(latencies) // 2] * 1000:.1f}",
+                f"{latencies[int(len(latencies) * 0.99)] * 1000:.1f}", threads
+            ])
+    print(f"{clients} clients x {requests} requests, {idle} idle connections")
+    print_table(["server", "req/s", "p50 (ms)", "p99 (ms)", "threads"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Counts the database queries made by each of the operations exercised in
+tests/test_auth.py, with the user looked up eagerly by the authentication
+middleware (as it used to be) and lazily (as it is now)."""
+
+import json
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from core.middleware import AuthenticationMiddleware
+from core.models import User
+from benchmarks import test_database, print_table
+
+OPERATIONS = [
+    ("signup", """mutation { signup(
+        email: "kate@gmail.com", password: "sw0rdfish123", name: "Kate Austen"
+    ) { accessToken } }"""),
+    ("login", """mutation { login(
+        email: "jack@gmail.com", password: "livetogetha"
+    ) { accessToken } }"""),
+    ("accessToken", "{ accessToken }"),
+    ("logout", "mutation { logout { success } }"),
+    ("user", "{ user { email name lastLogin creationTime } }"),
+    ("updateUser", """mutation { updateUser(
+        email: "jack@island.com", name: "Dr Jack"
+    ) { user { email name } } }"""),
+    ("updatePassword", """mutation { updatePassword(
+        current: "livetogetha", new: "warwick96"
+    ) { success } }"""),
+    ("updateProjectSettings", """mutation { updateProjectSettings(
+        defaultProjectGrouping: "status", showDoneProjects: false
+    ) { user { defaultProjectGrouping } } }"""),
+    ("deleteUser", "mutation { deleteUser { success } }"),
+]
+
+class EagerAuthenticationMiddleware(AuthenticationMiddleware):
+    """Looks the user up before the view runs, whether it is needed or not."""
+
+    def __call__(self, request):
+        def get_response(request):
+            bool(request.user)
+            return self.get_response(request)
+        return AuthenticationMiddleware(get_response)(request)
+
+
+def count_queries(query, user):
+    """Sends an operation with the headers and cookies a logged in client would
+    have, inside a transaction that is rolled back afterwards, and returns the
+    number of queries it made. The response cache is cleared first so that
+    queries are always executed."""
+
+    cache.clear()
+    client = Client()
+    client.cookies["refresh_token"] = user.make_refresh_jwt()
+    with transaction.atomic():
+        with CaptureQueriesContext(connection) as context:
+            client.post(
+                "/graphql", json.dumps({"query": query}),
+                content_type="application/json",
+                HTTP_AUTHORIZATION=f"Bearer {user.make_access_jwt()}"
+            )
+        transaction.set_rollback(True)
+    return len(context)
+
+
+def main():
+    with test_database(fixtures=["users.json", "slots.json", "projects.json"]):
+        user = User.objects.get(email="jack@gmail.com")
+        user.set_password("livetogetha")
+        eager_middleware = "benchmarks.auth_queries.EagerAuthenticationMiddleware"
+        middleware = [
+            eager_middleware if m == "core.middleware.AuthenticationMiddleware"
+            else m for m in settings.MIDDLEWARE
+        ]
+        rows, totals = [], [0, 0]
+        for name, query in OPERATIONS:
+            with override_settings(MIDDLEWARE=middleware):
+                eager = count_queries(query, user)
+            lazy = count_queries(query, user)
+            totals[0] += eager
+            totals[1] += lazy
+            rows.append([name, eager, lazy, eager - lazy])
+        rows.append(["total", *totals, totals[0] - totals[1]])
+        print_table(["operation", "eager", "lazy", "saved"], rows)
+
+
+if __name__ == "__main__":
+    main()
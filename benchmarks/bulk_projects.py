@@ -0,0 +1,87 @@
+"""Compares creating, updating and deleting a batch of projects one mutation
+at a time with doing the same through the bulk mutations, counting the
+database queries each approach makes as well as timing it."""
+
+import time
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from core.models import User, Project
+from core.schema import schema
+from benchmarks import test_database, print_table
+
+FIELDS = 'name: "P%i", description: "Imported", status: 4, color: "#00ff00"'
+
+OPERATIONS = {
+    "create": (
+        lambda ids: ["mutation { createProject(%s) { project { id } } }" % (
+            FIELDS % i
+        ) for i in range(len(ids))],
+        lambda ids: ["mutation { createProjects(projects: [%s]) { projects { id } } }" % (
+            ", ".join("{%s}" % (FIELDS % i) for i in range(len(ids)))
+        )]
+    ),
+    "update": (
+        lambda ids: ["mutation { updateProject(id: %i, %s) { project { id } } }" % (
+            id, FIELDS % i
+        ) for i, id in enumerate(ids)],
+        lambda ids: ["mutation { updateProjects(projects: [%s]) { projects { id } } }" % (
+            ", ".join("{id: %i, %s}" % (id, FIELDS % i) for i, id in enumerate(ids))
+        )]
+    ),
+    "delete": (
+        lambda ids: ["mutation { deleteProject(id: %i) { success } }" % id for id in ids],
+        lambda ids: ["mutation { deleteProjects(ids: [%s]) { success } }" % (
+            ", ".join(str(id) for id in ids)
+        )]
+    ),
+}
+
+def reset(user, count):
+    """Replaces the user's projects with a given number of new ones, returning
+    their IDs."""
+
+    user.projects.all().delete()
+    return [project.id for project in Project.create_many([Project(
+        name=f"P{i}", description="Imported", color="#000000", user=user
+    ) for i in range(count)])]
+
+
+def run(user, operations):
+    """Executes GraphQL operations in turn, returning the time taken in
+    milliseconds and the number of queries made."""
+
+    with CaptureQueriesContext(connection) as queries:
+        start = time.perf_counter()
+        for operation in operations:
+            request = RequestFactory().post("/graphql")
+            request.user = user
+            result = schema.execute(operation, context_value=request)
+            assert not result.errors, result.errors
+        elapsed = time.perf_counter() - start
+    return elapsed * 1000, len(queries)
+
+
+def main(count=200):
+    rows = []
+    with test_database(["users.json", "slots.json", "projects.json"]):
+        user = User.objects.get(email="jack@gmail.com")
+        for name, (single, bulk) in OPERATIONS.items():
+            results = []
+            for operations in [single, bulk]:
+                ids = reset(user, count)
+                results.append(run(user, operations(ids)))
+            (single_ms, single_queries), (bulk_ms, bulk_queries) = results
+            rows.append([
+                name, single_queries, bulk_queries,
+                f"{single_ms:.1f}", f"{bulk_ms:.1f}", f"{single_ms / bulk_ms:.1f}x"
+            ])
+    print(f"{count} projects")
+    print_table([
+        "operation", "single queries", "bulk queries",
+        "single (ms)", "bulk (ms)", "speedup"
+    ], rows)
+
+
+if __name__ == "__main__":
+    main()
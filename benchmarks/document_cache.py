@@ -0,0 +1,58 @@
+"""Measures the CPU time spent turning each query string used in
+tests/test_projects.py and tests/test_slots.py into a validated document, with
+graphql-core's default backend (parse and validate every time) and with the
+cached backend the GraphQL view now uses."""
+
+import time
+from graphql import get_default_backend
+from graphql.validation import validate
+from core.backend import CachedDocumentBackend
+from core.schema import schema
+from benchmarks import print_table
+
+QUERIES = [
+    ("projects", "{ user { projects { name description color status } } }"),
+    ("project", "{ user { project(id: 1) { name description color status } } }"),
+    ("createProject", """mutation { createProject(
+        name: "Project 3" description: "3rd project" status: 4 color: "#00ff00"
+    ) { project { name description color status } } }"""),
+    ("updateProject", """mutation { updateProject(
+        id: 1, name: "Project 3" description: "3rd project" status: 4 color: "#00ff00"
+    ) { project { name description color status } } }"""),
+    ("deleteProject", "mutation { deleteProject(id: 1) { success } }"),
+    ("slots", "{ user { slots { name order } } }"),
+    ("createSlot", 'mutation { createSlot(name: "Slot 3") { slot { name order } } }'),
+    ("updateSlot", 'mutation { updateSlot(id: 1, name: "X") { slot { name order } } }'),
+    ("moveSlot", """mutation { moveSlot(id: 1, index: 1) {
+        slot { name order } user { slots { name order } }
+    } }"""),
+    ("deleteSlot", "mutation { deleteSlot(id: 1) { success } }"),
+]
+
+def cpu_time(function, repeat):
+    """Returns the mean CPU time per call of a function, in microseconds."""
+
+    start = time.process_time()
+    for _ in range(repeat): function()
+    return (time.process_time() - start) / repeat * 1000000
+
+
+def main(repeat=2000):
+    default_backend = get_default_backend()
+    cached_backend = CachedDocumentBackend(maxsize=100)
+    rows = []
+    for name, query in QUERIES:
+        uncached = cpu_time(lambda: validate(
+            schema, default_backend.document_from_string(schema, query).document_ast
+        ), repeat)
+        cached = cpu_time(
+            lambda: cached_backend.document_from_string(schema, query), repeat
+        )
+        rows.append([name, f"{uncached:.1f}", f"{cached:.1f}", f"{uncached - cached:.1f}"])
+    print_table(["operation", "uncached (us)", "cached (us)", "saved (us)"], rows)
+    print()
+    print("Cache stats:", cached_backend.documents.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Holds increasing numbers of change streams open against uvicorn running
+core.asgi, reporting how many threads the server needed, how much memory the
+streams took, and how long one change took to reach every stream.
+
+The server runs in this process, so the client sockets are read by the same
+interpreter - fan-out times include the client's share of the work."""
+
+import time
+import socket
+import resource
+import selectors
+import threading
+from core.models import User, Slot
+from benchmarks import test_database, print_table
+from benchmarks.asgi_load import serve_asgi
+
+def open_stream(port, token):
+    """Opens a change stream and waits for its first heartbeat."""
+
+    sock = socket.create_connection(("127.0.0.1", port))
+    sock.sendall((
+        "GET /events HTTP/1.1\r\nHost: testserver\r\n"
+        f"Authorization: Bearer {token}\r\n\r\n"
+    ).encode())
+    received = b""
+    while b": heartbeat" not in received: received += sock.recv(4096)
+    sock.setblocking(False)
+    return sock
+
+
+def fan_out(sockets, slot):
+    """Saves a slot and returns the time until every stream has been told."""
+
+    selector = selectors.DefaultSelector()
+    for sock in sockets: selector.register(sock, selectors.EVENT_READ, bytearray())
+    waiting = len(sockets)
+    start = time.perf_counter()
+    slot.save()
+    while waiting:
+        for key, _ in selector.select(5):
+            key.data.extend(key.fileobj.recv(4096))
+            if b"event: change" in key.data:
+                selector.unregister(key.fileobj)
+                waiting -= 1
+    elapsed = time.perf_counter() - start
+    selector.close()
+    return elapsed
+
+
+def main(counts=(100, 1000, 4000)):
+    rows = []
+    with test_database(["users.json", "slots.json", "projects.json"]):
+        user = User.objects.get(email="jack@gmail.com")
+        token, slot = user.make_access_jwt(), user.slots.first()
+        stop = serve_asgi(8703)
+        for count in counts:
+            memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            sockets = [open_stream(8703, token) for _ in range(count)]
+            threads = threading.active_count()
+            memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - memory
+            elapsed = fan_out(sockets, slot)
+            for sock in sockets: sock.close()
+            rows.append([
+                count, threads, f"{memory / 1024:.1f}", f"{elapsed * 1000:.1f}"
+            ])
+            time.sleep(1)
+        stop()
+    print_table(["streams", "threads", "memory (MB)", "fan-out (ms)"], rows)
+
+
+if __name__ == "__main__":
+    main()
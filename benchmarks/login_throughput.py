@@ -0,0 +1,60 @@
+"""Measures how many logins per second the password check can sustain with
+sixteen clients logging in at once, for hashing pools of different sizes, along
+with the time each client waits and how many are turned away when the pool's
+queue is full. The numbers depend on how many cores the machine has - PBKDF2
+releases the GIL, so the pool scales until it runs out of them."""
+
+import os
+import time
+import threading
+from django.contrib.auth.hashers import make_password
+from core.hashing import HashingPool, HashingBusy
+from core.models import User
+from benchmarks import print_table
+
+CLIENTS = 16
+
+def run_clients(pool, user, logins):
+    """Has every client check the user's password a number of times, and
+    returns the wall time taken, each successful check's latency and how many
+    checks were rejected."""
+
+    latencies, rejected, lock = [], [0], threading.Lock()
+
+    def client():
+        for _ in range(logins):
+            start = time.perf_counter()
+            try:
+                pool.check_password("livetogetha", user.password)
+            except HashingBusy:
+                with lock: rejected[0] += 1
+                continue
+            with lock: latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=client) for _ in range(CLIENTS)]
+    start = time.perf_counter()
+    for thread in threads: thread.start()
+    for thread in threads: thread.join()
+    return time.perf_counter() - start, sorted(latencies), rejected[0]
+
+
+def main(logins=4):
+    user = User(password=make_password("livetogetha"))
+    rows = []
+    for workers, queue in [(1, 32), (2, 32), (4, 32), (8, 32), (4, 4)]:
+        pool = HashingPool(workers, queue, timeout=0.5)
+        elapsed, latencies, rejected = run_clients(pool, user, logins)
+        pool.executor.shutdown()
+        rows.append([
+            workers, queue, f"{len(latencies) / elapsed:.1f}",
+            f"{latencies[len(latencies) // 2] * 1000:.0f}",
+            f"{latencies[int(len(latencies) * 0.95)] * 1000:.0f}", rejected
+        ])
+    print(f"{os.cpu_count()} CPUs, {CLIENTS} clients, {logins} logins each")
+    print_table(
+        ["workers", "queue", "logins/s", "p50 (ms)", "p95 (ms)", "rejected"], rows
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Times the moveSlot mutation for users with 10, 1,000 and 100,000 slots, with
+the sparse ordering Slot.move_to now uses and with the old approach of
+renumbering every slot in the user on each move, and counts the rows each move
+writes."""
+
+import time
+from random import Random
+from django.db.models.sql.compiler import SQLUpdateCompiler
+from django.test import RequestFactory
+from unittest.mock import patch
+from core.models import User, Slot
+from core.schema import schema
+from benchmarks import test_database, print_table
+
+def renumbering_move_to(self, index):
+    """Slot.move_to as it was before sparse ordering, rewriting the order of
+    every slot the user has. The new orders start above the current highest
+    one so that they don't collide with the unique (user, order) constraint."""
+
+    slots = list(self.user.slots.exclude(id=self.id))
+    slots.insert(index, self)
+    start = max(slot.order for slot in slots)
+    for i, slot in enumerate(slots, start=1):
+        slot.order = start + i
+    Slot.objects.bulk_update(slots, ["order"])
+
+
+def make_user(count):
+    """Creates a user with the given number of slots."""
+
+    user = User.objects.create(email=f"user{count}@example.com", name="User")
+    Slot.objects.bulk_create([Slot(
+        name=f"Slot {i}", user=user, order=(i + 1) * Slot.ORDER_STEP
+    ) for i in range(count)], batch_size=500)
+    return user
+
+
+def time_moves(user, repeat):
+    """Moves random slots to random positions through the GraphQL API and
+    returns the mean time per move in milliseconds, and the mean number of
+    rows each move updated."""
+
+    rows, execute_sql = [0], SQLUpdateCompiler.execute_sql
+    def counting_execute_sql(self, *args, **kwargs):
+        count = execute_sql(self, *args, **kwargs)
+        rows[0] += count
+        return count
+    random = Random(1)
+    ids = list(user.slots.values_list("id", flat=True))
+    request = RequestFactory().post("/graphql")
+    request.user = user
+    total = 0
+    for _ in range(repeat):
+        query = "mutation { moveSlot(id: %i, index: %i) { slot { id } } }" % (
+            random.choice(ids), random.randint(0, len(ids) - 1)
+        )
+        with patch.object(SQLUpdateCompiler, "execute_sql", counting_execute_sql):
+            start = time.perf_counter()
+            result = schema.execute(query, context_value=request)
+            total += time.perf_counter() - start
+        assert not result.errors, result.errors
+    return total / repeat * 1000, rows[0] / repeat
+
+
+def main():
+    rows = []
+    with test_database():
+        for count, repeat in [(10, 200), (1000, 50), (100000, 3)]:
+            user = make_user(count)
+            with patch.object(Slot, "move_to", renumbering_move_to):
+                renumbering = time_moves(user, repeat)
+            Slot.objects.filter(user=user).delete()
+            user.delete()
+            user = make_user(count)
+            sparse = time_moves(user, repeat)
+            rows.append([
+                count, f"{renumbering[0]:.2f}", f"{sparse[0]:.2f}",
+                f"{renumbering[0] / sparse[0]:.0f}x",
+                f"{renumbering[1]:.0f}", f"{sparse[1]:.1f}"
+            ])
+    print_table([
+        "slots", "renumbering (ms)", "sparse (ms)", "speedup",
+        "renumbering rows", "sparse rows"
+    ], rows)
+
+
+if __name__ == "__main__":
+    main()
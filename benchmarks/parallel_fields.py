@@ -0,0 +1,97 @@
+"""Measures the latency of queries with several independent root fields, run
+on graphene's default executor and on the ParallelExecutor that
+GRAPHQL_MAX_PARALLELISM turns on. The test database is a local sqlite one with
+no network between it and the server, so each query is also run with a
+simulated round trip added to every database query, as a database on another
+machine would have, and three added to opening a connection - for TCP, TLS
+and authentication. The parallel executor is run both with connections
+closed after each root field and with persistent ones."""
+
+import os
+import time
+import tempfile
+from unittest.mock import patch
+from django.db import connection, connections
+from django.db.backends.utils import CursorWrapper
+from django.test import RequestFactory
+from core.backend import CachedDocumentBackend
+from core.executors import ParallelExecutor
+from core.models import User
+from core.schema import schema
+from benchmarks import test_database, print_table
+
+FIELDS = [
+    "user { name slots { name order } }",
+    "user { projects(statusIn: [1]) { name category { name } } }",
+    "user { projectGroups { status count projects { name } } }",
+    "user { projectCategories { name projects { name } } }",
+    "user { projectsConnection(first: 5) { edges { node { name } } } }",
+    "user { projects(orderBy: \"-name\") { name status } }",
+    "user { projects(statusIn: [2]) { name } }",
+    "user { slots { name } projectCategories { name } }",
+]
+
+def latency(backend, user, query, repeat):
+    """Returns the mean time taken to execute a query, in milliseconds."""
+
+    document = backend.document_from_string(schema, query)
+    total = 0
+    for _ in range(repeat):
+        request = RequestFactory().post("/graphql")
+        request.user = user
+        start = time.perf_counter()
+        result = document.execute(context_value=request)
+        total += time.perf_counter() - start
+        assert not result.errors, result.errors
+    return total / repeat * 1000
+
+
+def main(repeat=50, workers=4):
+    serial = CachedDocumentBackend(maxsize=100)
+    # Each CONN_MAX_AGE gets its own pool, so no thread keeps a connection
+    # opened under the other
+    parallel = {max_age: CachedDocumentBackend(
+        maxsize=100, executor=ParallelExecutor(max_workers=workers)
+    ) for max_age in [0, 600]}
+    original_execute = CursorWrapper._execute
+    wrapper = connections["default"].__class__
+    original_connect = wrapper.get_new_connection
+    rows = []
+    # An in-memory sqlite database can't be closed without losing it, so
+    # Django never closes one - a file is used so connections really close
+    connection.settings_dict["TEST"]["NAME"] = os.path.join(
+        tempfile.mkdtemp(), "parallel_fields.sqlite3"
+    )
+    with test_database(["users.json", "slots.json", "projects.json"]):
+        user = User.objects.get(email="jack@gmail.com")
+        for round_trip in [0, 2]:
+            def execute(self, *args, **kwargs):
+                time.sleep(round_trip / 1000)
+                return original_execute(self, *args, **kwargs)
+            def connect(self, *args, **kwargs):
+                time.sleep(round_trip * 3 / 1000)
+                return original_connect(self, *args, **kwargs)
+            with patch.object(CursorWrapper, "_execute", execute), \
+             patch.object(wrapper, "get_new_connection", connect):
+                for count in [1, 2, 4, 8]:
+                    query = "{ %s }" % " ".join(
+                        f"f{i}: {field}" for i, field in enumerate(FIELDS[:count])
+                    )
+                    before = latency(serial, user, query, repeat)
+                    times = []
+                    for max_age, backend in parallel.items():
+                        connection.settings_dict["CONN_MAX_AGE"] = max_age
+                        times.append(latency(backend, user, query, repeat))
+                    rows.append([
+                        round_trip, count, f"{before:.2f}",
+                        *(f"{after:.2f} ({before / after:.1f}x)" for after in times)
+                    ])
+    print(f"ParallelExecutor with {workers} workers")
+    print_table([
+        "round trip (ms)", "root fields", "serial (ms)",
+        "parallel, CONN_MAX_AGE=0 (ms)", "parallel, persistent (ms)"
+    ], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""Times a client polling for its user's slots and projects through the whole
+Django stack: with the response cache emptied before every request, answered
+from the cache, and answered with 304 Not Modified because the client sent
+back the ETag it was last given. Response caching is turned on for the run,
+as it is off with the default per-process cache."""
+
+import json
+from django.core.cache import cache
+from django.test import Client
+from django.test.utils import override_settings
+from core.models import User
+from benchmarks import test_database, timed, print_table
+
+QUERY = json.dumps({"query": """{ user {
+    slots { name order } projects { name description color status category { name } }
+} }"""})
+
+def main(repeat=500):
+    with test_database(["users.json", "slots.json", "projects.json"]), \
+            override_settings(RESPONSE_CACHE_TIMEOUT=300):
+        user = User.objects.get(email="jack@gmail.com")
+        client = Client(HTTP_AUTHORIZATION=f"Bearer {user.make_access_jwt()}")
+        post = lambda **headers: client.post(
+            "/graphql", QUERY, content_type="application/json", **headers
+        )
+        etag = post()["ETag"]
+        assert post(HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+        def uncached():
+            cache.clear()
+            post()
+
+        rows = [[name, f"{timed(function, repeat) * 1000:.2f}"] for name, function in [
+            ("executed", uncached), ("cached", post),
+            ("not modified", lambda: post(HTTP_IF_NONE_MATCH=etag)),
+        ]]
+    print_table(["response", "time (ms)"], rows)
+
+
+if __name__ == "__main__":
+    main()
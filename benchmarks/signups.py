@@ -0,0 +1,63 @@
+"""Measures signups per second through the signup mutation, with the user and
+its default slots saved one by one as they used to be and in one transaction
+as they are now, counting the queries each signup makes.
+
+The password is hashed with a low iteration count, as otherwise hashing takes
+far longer than everything else and would hide the difference - both ways hash
+just as much. The database is sqlite in autocommit mode, so every write that
+isn't inside a transaction is committed on its own."""
+
+import time
+from unittest.mock import patch
+from django.db import connection
+from django.forms import ModelForm
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext, override_settings
+from core.forms import SignupForm
+from core.models import User, Slot
+from core.schema import schema
+from benchmarks import test_database, print_table
+
+def one_by_one_save(self):
+    """SignupForm.save as it was, along with the slots the mutation used to
+    create afterwards - the user is saved by set_password and again after it,
+    and each slot looks up its order and checks its ID before its INSERT."""
+
+    user = ModelForm.save(self, commit=False)
+    user.set_password(self.cleaned_data.get("password"))
+    user.save()
+    for name in self.default_slots: Slot.objects.create(name=name, user=user)
+
+
+def run(count, prefix):
+    """Signs up a number of new users, returning the signups per second and
+    the queries made per signup."""
+
+    with CaptureQueriesContext(connection) as queries:
+        start = time.perf_counter()
+        for i in range(count):
+            result = schema.execute("""mutation { signup(
+                email: "%s%i@example.com", password: "sw0rdfish123", name: "User"
+            ) { accessToken } }""" % (prefix, i), context_value=RequestFactory().post(
+                "/graphql"
+            ))
+            assert not result.errors, result.errors
+        elapsed = time.perf_counter() - start
+    return count / elapsed, len(queries) / count
+
+
+def main(count=500):
+    with test_database(), override_settings(PASSWORD_ITERATIONS=1):
+        with patch.object(SignupForm, "save", one_by_one_save):
+            before = run(count, "before")
+        after = run(count, "after")
+        assert Slot.objects.count() == User.objects.count() * 2
+    print(f"{count} signups")
+    print_table(["signup", "signups/s", "queries per signup"], [
+        ["one by one", f"{before[0]:.0f}", f"{before[1]:.0f}"],
+        ["one transaction", f"{after[0]:.0f}", f"{after[1]:.0f}"],
+    ])
+
+
+if __name__ == "__main__":
+    main()
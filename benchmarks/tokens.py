@@ -0,0 +1,62 @@
+"""Compares PyJWT with the token codec User now uses, for issuing a token and
+for verifying a good one, and times how quickly the codec turns away the kinds
+of bad token a client might send."""
+
+import jwt
+import time
+from django.conf import settings
+from core.tokens import token_codec, TokenError
+from benchmarks import timed, print_table
+
+def pyjwt_encode(sub, iat, expires):
+    return jwt.encode({
+        "sub": sub, "iat": iat, "expires": expires
+    }, settings.SECRET_KEY, algorithm="HS256").decode()
+
+
+def pyjwt_decode(token):
+    claims = jwt.decode(token, settings.SECRET_KEY)
+    assert claims["expires"] > time.time()
+    return claims
+
+
+def rejecting(decode, token):
+    """Returns a function which decodes a token that ought to be rejected."""
+
+    def function():
+        try:
+            decode(token)
+        except (TokenError, jwt.InvalidTokenError, AssertionError): return
+        raise AssertionError(f"{token} was accepted")
+    return function
+
+
+def main(repeat=20000):
+    now = int(time.time())
+    token = token_codec.encode(123456789012345678, now, now + 900)
+    header, payload, signature = token.split(".")
+    expired = token_codec.encode(123456789012345678, now - 1000, now - 100)
+    rows = [[
+        "issue",
+        timed(lambda: pyjwt_encode(123456789012345678, now, now + 900), repeat),
+        timed(lambda: token_codec.encode(123456789012345678, now, now + 900), repeat)
+    ], [
+        "verify",
+        timed(lambda: pyjwt_decode(token), repeat),
+        timed(lambda: token_codec.decode(token), repeat)
+    ]]
+    for name, bad in [
+        ("reject garbage", "sdsfsfd"), ("reject expired", expired),
+        ("reject signature", f"{header}.{payload}.{signature[::-1]}")
+    ]:
+        rows.append([
+            name, timed(rejecting(pyjwt_decode, bad), repeat),
+            timed(rejecting(token_codec.decode, bad), repeat)
+        ])
+    print_table(["operation", "pyjwt (us)", "codec (us)", "speedup"], [[
+        name, f"{old * 1000000:.1f}", f"{new * 1000000:.1f}", f"{old / new:.1f}x"
+    ] for name, old, new in rows])
+
+
+if __name__ == "__main__":
+    main()
@@ -3,10 +3,11 @@ from graphql import GraphQLError
 from django.forms.fields import *
 from django.forms.models import ModelChoiceField
 
-def create_mutation_arguments(ModelForm, edit=False, ignore=None):
+def create_mutation_arguments(ModelForm, edit=False, ignore=None, partial=False):
     """Creates mutation arguments from a modelform. If the edit parameter is set
     to True, an id argument will be added and any parent model fields will be
-    ignored."""
+    ignored. If the partial parameter is set to True, no argument other than
+    the id is required."""
     
     ignore = ignore or []
     ignore.append("user")
@@ -21,9 +22,22 @@ def create_mutation_arguments(ModelForm, edit=False, ignore=None):
         if field.__class__ == TypedChoiceField:
             d[name] = {int: graphene.Int, str: graphene.String}.get(
                 type(field.choices[0][0]), graphene.String
-            )(required=field.required) 
+            )(required=field.required and not partial)
         elif name not in ignore and (field.__class__ != ModelChoiceField or not edit):
             d[name] = lookup.get(
                 field.__class__, graphene.String
-            )(required=field.required)
-    return type("Arguments", (), d)
\ No newline at end of file
+            )(required=field.required and not partial)
+    return type("Arguments", (), d)
+
+
+def create_input_type(name, ModelForm, edit=False, **fields):
+    """Creates an input object type from a modelform, with the same fields as
+    the mutation arguments create_mutation_arguments would make for it, so
+    that many objects can be given to one mutation. Any fields given replace
+    the ones made from the form."""
+
+    arguments = create_mutation_arguments(ModelForm, edit=edit)
+    return type(name, (graphene.InputObjectType,), {**{
+        field_name: field for field_name, field in vars(arguments).items()
+        if not field_name.startswith("__")
+    }, **fields})
@@ -0,0 +1,144 @@
+"""An ASGI entry point, for serving the API with an async server such as
+uvicorn (uvicorn core.asgi:application). GraphQL requests are authenticated on
+the event loop and executed on worker threads, so a slow database round trip
+or password hash ties up a thread rather than a whole server process, and idle
+keep-alive connections cost nothing but a socket. Anything other than the
+GraphQL endpoint and the change stream is passed to the ordinary WSGI
+application."""
+
+import os
+import asyncio
+import django
+from io import BytesIO
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+django.setup()
+from asgiref.wsgi import WsgiToAsgi
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+from django.http import HttpRequest, QueryDict, JsonResponse
+from django.http.cookie import parse_cookie
+from core.middleware import AsyncAuthenticationMiddleware
+from core.urls import AsyncGraphQLView, ChangeStreamView
+from core.backend import document_backend
+
+class ASGIRequest(HttpRequest):
+    """A Django request made from an ASGI connection scope and the body that
+    was received for it."""
+
+    def __init__(self, scope, body):
+        HttpRequest.__init__(self)
+        self.scope = scope
+        self.method = scope["method"].upper()
+        self.path = self.path_info = scope["path"]
+        self.META = {
+            "REQUEST_METHOD": self.method, "PATH_INFO": self.path,
+            "SCRIPT_NAME": scope.get("root_path", ""),
+            "QUERY_STRING": scope.get("query_string", b"").decode("latin1"),
+        }
+        if scope.get("server"):
+            self.META["SERVER_NAME"], self.META["SERVER_PORT"] = map(str, scope["server"])
+        if scope.get("client"):
+            self.META["REMOTE_ADDR"] = scope["client"][0]
+        for name, value in scope.get("headers", []):
+            name = name.decode("latin1").upper().replace("-", "_")
+            if name not in ["CONTENT_TYPE", "CONTENT_LENGTH"]: name = "HTTP_" + name
+            value = value.decode("latin1")
+            if name in self.META: value = self.META[name] + "," + value
+            self.META[name] = value
+        self.GET = QueryDict(self.META["QUERY_STRING"])
+        self.COOKIES = parse_cookie(self.META.get("HTTP_COOKIE", ""))
+        self._body, self._stream = body, BytesIO(body)
+
+
+    def _get_scheme(self):
+        return self.scope.get("scheme", "http")
+
+
+
+class ASGIHandler:
+    """A minimal ASGI application which turns each HTTP request to the paths it
+    serves into an ASGIRequest, awaits a response for it from the coroutine
+    for that path, and sends that response back. Other requests go to a
+    fallback application.
+
+    Bodies larger than DATA_UPLOAD_MAX_MEMORY_SIZE are refused with a 413
+    response as soon as they pass it, without reading the rest. Streaming
+    responses are sent a chunk at a time as their content is iterated, until
+    it runs out or the client disconnects."""
+
+    def __init__(self, routes, fallback):
+        self.routes = routes
+        self.fallback = fallback
+
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                await send({"type": message["type"] + ".complete"})
+                if message["type"] == "lifespan.shutdown": return
+        if scope["type"] != "http" or scope["path"] not in self.routes:
+            return await self.fallback(scope, receive, send)
+        chunks, size, limit = [], 0, settings.DATA_UPLOAD_MAX_MEMORY_SIZE
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect": return
+            chunks.append(message.get("body", b""))
+            size += len(chunks[-1])
+            if limit is not None and size > limit:
+                return await self.send_response(JsonResponse(
+                    {"error": "Request body too large"}, status=413
+                ), receive, send)
+            if not message.get("more_body"): break
+        response = await self.routes[scope["path"]](
+            ASGIRequest(scope, b"".join(chunks))
+        )
+        await self.send_response(response, receive, send)
+
+
+    async def send_response(self, response, receive, send):
+        """Sends a response's status, headers and content."""
+
+        headers = [(name.encode("latin1"), str(value).encode("latin1"))
+            for name, value in response.items()]
+        headers += [(b"Set-Cookie", cookie.output(header="").strip().encode("latin1"))
+            for cookie in response.cookies.values()]
+        await send({
+            "type": "http.response.start", "status": response.status_code,
+            "headers": headers
+        })
+        if response.streaming:
+            await self.stream(response, receive, send)
+        else:
+            await send({"type": "http.response.body", "body": response.content})
+
+
+    async def stream(self, response, receive, send):
+        """Sends a streaming response's content until it ends or the client
+        disconnects, whichever comes first."""
+
+        async def send_content():
+            async for chunk in response:
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": b""})
+
+        async def wait_for_disconnect():
+            while (await receive())["type"] != "http.disconnect": pass
+
+        tasks = [
+            asyncio.ensure_future(send_content()),
+            asyncio.ensure_future(wait_for_disconnect())
+        ]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks: task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        for task in done: task.result()
+
+
+
+application = ASGIHandler({
+    "/graphql": AsyncAuthenticationMiddleware(AsyncGraphQLView(backend=document_backend)),
+    "/events": AsyncAuthenticationMiddleware(ChangeStreamView()),
+}, WsgiToAsgi(get_wsgi_application()))
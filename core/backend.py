@@ -0,0 +1,60 @@
+from hashlib import sha256
+from functools import partial
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from graphql import parse, validate, execute
+from graphql.execution import ExecutionResult
+from graphql.backend import GraphQLCoreBackend, GraphQLDocument
+from core.cache import LRUCache
+from core.executors import ParallelExecutor
+
+def execute_validated(schema, document_ast, errors, *args, **kwargs):
+    """Executes a document which has already been validated, returning the
+    validation errors instead if there were any."""
+
+    if errors: return ExecutionResult(errors=errors, invalid=True)
+    return execute(schema, document_ast, *args, **kwargs)
+
+
+
+class CachedDocumentBackend(GraphQLCoreBackend):
+    """A GraphQL backend which parses and validates each distinct query string
+    once, and then keeps the resulting document in a bounded LRU cache keyed by
+    a hash of the query text. Clients send a small number of distinct queries,
+    so almost every request can skip straight to execution."""
+
+    def __init__(self, maxsize, executor=None):
+        GraphQLCoreBackend.__init__(self, executor=executor)
+        self.documents = LRUCache(maxsize)
+
+
+    def document_from_string(self, schema, document_string):
+        key = (id(schema), sha256(document_string.encode()).hexdigest())
+        document = self.documents.get(key)
+        if document is None:
+            document_ast = parse(document_string)
+            document = GraphQLDocument(
+                schema=schema, document_string=document_string,
+                document_ast=document_ast, execute=partial(
+                    execute_validated, schema, document_ast,
+                    validate(schema, document_ast), **self.execute_params
+                )
+            )
+            self.documents.set(key, document)
+        return document
+
+
+
+if settings.GRAPHQL_MAX_PARALLELISM and any(
+    database.get("CONN_MAX_AGE", 0) == 0 for database in settings.DATABASES.values()
+):
+    raise ImproperlyConfigured(
+        "GRAPHQL_MAX_PARALLELISM needs persistent database connections - "
+        "CONN_MAX_AGE can't be 0"
+    )
+
+document_backend = CachedDocumentBackend(
+    settings.DOCUMENT_CACHE_SIZE, executor=ParallelExecutor(
+        settings.GRAPHQL_MAX_PARALLELISM
+    ) if settings.GRAPHQL_MAX_PARALLELISM else None
+)
@@ -0,0 +1,137 @@
+import time
+import threading
+from collections import OrderedDict
+from django.conf import settings
+
+class LRUCache:
+    """A bounded, thread-safe, least-recently-used mapping which keeps count of
+    how often lookups succeed so that its usefulness can be measured."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+
+    def __len__(self):
+        return len(self.entries)
+
+
+    def get(self, key, default=None):
+        """Returns the value stored against a key, marking it as recently used,
+        or the default if there is no such key."""
+
+        with self.lock:
+            try:
+                value = self.entries[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+
+    def set(self, key, value):
+        """Stores a value, evicting the least recently used entries if the
+        cache is now over its size limit."""
+
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.delete(next(iter(self.entries)))
+
+
+    def delete(self, key):
+        """Removes a key from the cache if it is present."""
+
+        with self.lock:
+            self.entries.pop(key, None)
+
+
+    def clear(self):
+        """Empties the cache and resets its counters."""
+
+        with self.lock:
+            self.entries.clear()
+            self.hits, self.misses = 0, 0
+
+
+    def stats(self):
+        """Returns the cache's counters as a dictionary."""
+
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self.entries), "maxsize": self.maxsize,
+                "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+
+
+class TokenCache(LRUCache):
+    """Remembers which tokens have already been verified, along with the user
+    they were issued to and when they expire, so that the signature does not
+    need to be checked again. Entries are dropped once they expire, and can be
+    dropped for a given user when that user changes."""
+
+    def __init__(self, maxsize):
+        LRUCache.__init__(self, maxsize)
+        self.users = {}
+
+
+    def get(self, token):
+        """Returns the user ID a token was issued to, or None if the token has
+        not been verified or has since expired."""
+
+        with self.lock:
+            entry = self.entries.get(token)
+            if entry and entry[1] <= time.time():
+                self.delete(token)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(token)
+            self.hits += 1
+            return entry[0]
+
+
+    def set(self, token, user_id, expires):
+        """Records that a token was verified as belonging to a user, and when
+        it will stop being valid."""
+
+        with self.lock:
+            self.users.setdefault(user_id, set()).add(token)
+            LRUCache.set(self, token, (user_id, expires))
+
+
+    def delete(self, token):
+        with self.lock:
+            entry = self.entries.pop(token, None)
+            if entry:
+                tokens = self.users.get(entry[0], set())
+                tokens.discard(token)
+                if not tokens: self.users.pop(entry[0], None)
+
+
+    def invalidate_user(self, user_id):
+        """Forgets every token that was verified for a given user."""
+
+        with self.lock:
+            for token in list(self.users.get(user_id, [])):
+                self.delete(token)
+
+
+    def clear(self):
+        with self.lock:
+            LRUCache.clear(self)
+            self.users.clear()
+
+
+
+verified_tokens = TokenCache(settings.TOKEN_CACHE_SIZE)
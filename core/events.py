@@ -0,0 +1,140 @@
+import json
+import asyncio
+import threading
+from django.conf import settings
+from django.http.response import HttpResponseBase
+from django.utils.module_loading import import_string
+
+class Broker:
+    """Base class for the ways notifications of changes to a user's data get
+    from wherever the change was made to the streams open for that user.
+    Changes can be published from any thread, and are received by
+    subscriptions on an event loop."""
+
+    def publish(self, user_id, event):
+        """Sends an event to every stream open for a user."""
+
+        raise NotImplementedError
+
+
+    def subscribe(self, user_id):
+        """Returns a new Subscription to a user's events. It must be called
+        from the event loop that will be waiting on the subscription."""
+
+        raise NotImplementedError
+
+
+    def unsubscribe(self, subscription):
+        """Stops sending events to a subscription."""
+
+        raise NotImplementedError
+
+
+
+class Subscription:
+    """A queue of events for one stream, waited on by the event loop it was
+    created on. Events can be delivered from any thread. A stream which falls
+    too far behind has its backlog dropped and is told to resync instead, so a
+    slow client can't use up memory without limit."""
+
+    def __init__(self, broker, user_id, maxsize):
+        self.broker, self.user_id = broker, user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.overflowed = False
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *args):
+        self.close()
+
+
+    def deliver(self, event):
+        """Adds an event to the queue from any thread."""
+
+        self.loop.call_soon_threadsafe(self.put, event)
+
+
+    def put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            while not self.queue.empty(): self.queue.get_nowait()
+
+
+    async def get(self):
+        """Waits for the next event, which is a resync event if any were
+        dropped."""
+
+        if self.overflowed:
+            self.overflowed = False
+            return {"type": "resync"}
+        return await self.queue.get()
+
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+
+class InProcessBroker(Broker):
+    """A broker which delivers events to the streams open in this process. It
+    is only suitable when the API is served by a single process - with more
+    than one, a broker backed by something they all share is needed."""
+
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self.subscriptions = {}
+        self.lock = threading.Lock()
+
+
+    def publish(self, user_id, event):
+        with self.lock:
+            subscriptions = list(self.subscriptions.get(user_id, ()))
+        for subscription in subscriptions: subscription.deliver(event)
+
+
+    def subscribe(self, user_id):
+        subscription = Subscription(self, user_id, self.queue_size)
+        with self.lock:
+            self.subscriptions.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            subscriptions = self.subscriptions.get(subscription.user_id, set())
+            subscriptions.discard(subscription)
+            if not subscriptions: self.subscriptions.pop(subscription.user_id, None)
+
+
+
+class EventStreamResponse(HttpResponseBase):
+    """A server-sent events response, whose content is an async iterator of
+    events rather than bytes. Only core.asgi knows how to send one."""
+
+    streaming = True
+
+    def __init__(self, events):
+        HttpResponseBase.__init__(self, content_type="text/event-stream")
+        self["Cache-Control"] = "no-cache"
+        self["X-Accel-Buffering"] = "no"
+        self.events = events
+
+
+    async def __aiter__(self):
+        async for event in self.events:
+            if event is None:
+                yield b": heartbeat\n\n"
+            else:
+                yield "event: {}\ndata: {}\n\n".format(
+                    event.get("type", "change"), json.dumps(event)
+                ).encode()
+
+
+
+broker = import_string(settings.EVENT_BROKER)(**settings.EVENT_BROKER_OPTIONS)
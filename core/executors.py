@@ -0,0 +1,70 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from promise import Promise
+from graphql.execution.executors.utils import process
+from django.db import close_old_connections
+
+class ParallelExecutor:
+    """A GraphQL executor which resolves the root fields of a query side by
+    side on a bounded pool of threads, rather than one after another.
+
+    Only root fields are handed to the pool. Everything beneath a root field is
+    resolved on the thread that resolved it, where DataLoaders batch sibling
+    lookups into single queries - splitting those across threads would mean
+    more queries, not faster ones. Root fields are only submitted to the pool
+    once the whole operation has been laid out and the request thread has
+    chained each field's nested fields onto it, so a root field which resolves
+    instantly can't leave its nested fields to the request thread. Mutations
+    are left alone, as their root fields must run in order.
+
+    Each thread uses its own database connection, as Django connections belong
+    to the thread that opened them, and tidies it up once its field is done
+    the way Django does at the end of a request. That closes the connection
+    unless connections are persistent, so CONN_MAX_AGE must not be 0 when the
+    executor is used - otherwise every root field pays to connect to the
+    database again. One executor serves every request, so the work each
+    request is waiting on is tracked per thread."""
+
+    def __init__(self, max_workers):
+        self.pool = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="graphql"
+        )
+        self.local = threading.local()
+
+
+    @property
+    def pending(self):
+        if not hasattr(self.local, "pending"): self.local.pending = []
+        return self.local.pending
+
+
+    def submit(self):
+        """Hands the root fields laid out so far to the pool, returning their
+        futures."""
+
+        pending, self.local.pending = self.pending, []
+        return [self.pool.submit(self.run, *field) for field in pending]
+
+
+    def clean(self):
+        self.submit()
+
+
+    def wait_until_finished(self):
+        while self.pending: wait(self.submit())
+
+
+    def execute(self, fn, *args, **kwargs):
+        info = args[1] if len(args) > 1 else None
+        if info is None or len(info.path) != 1 or info.operation.operation != "query":
+            return fn(*args, **kwargs)
+        promise = Promise()
+        self.pending.append((promise, fn, args, kwargs))
+        return promise
+
+
+    def run(self, promise, fn, args, kwargs):
+        try:
+            process(promise, fn, args, kwargs)
+        finally:
+            close_old_connections()
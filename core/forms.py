@@ -1,17 +1,39 @@
-from django.forms import ModelForm, Form, CharField
+from django.forms import ModelForm, Form, CharField, IntegerField
 from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
-from django.contrib.auth.hashers import check_password
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from core.models import *
+from core import hashing
+
+class PartialUpdateMixin:
+    """Makes a ModelForm edit only the fields present in its data. Fields that
+    weren't given are dropped from the form, so they are neither validated
+    nor changed, and saving writes only the columns whose values actually
+    changed - or nothing at all, if none did."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for name in list(self.fields):
+            if name not in self.data: del self.fields[name]
+
+
+    def save(self):
+        columns = {field.name for field in self.instance._meta.concrete_fields}
+        fields = [name for name in self.changed_data if name in columns]
+        if fields: self.instance.save(update_fields=fields)
+        return self.instance
+
+
 
 class SignupForm(ModelForm):
-    """Creates a user object."""
+    """Creates a user object, along with their default slots."""
 
     class Meta:
         model = User
         fields = ["email", "name", "password"]
+    
+    default_slots = ["Work", "Personal"]
 
 
     def clean_password(self):
@@ -22,16 +44,17 @@ class SignupForm(ModelForm):
 
         
     def save(self):
-        """Hash password before saving."""
+        """Hashes the password once, then saves the user and their default
+        slots together."""
 
         user = ModelForm.save(self, commit=False)
-        user.set_password(self.cleaned_data.get("password"))
-        user.save()
+        user.password = hashing.pool.make_password(self.cleaned_data.get("password"))
+        user.create_with_slots(self.default_slots)
 
 
 
-class UpdateUserForm(ModelForm):
-    """Edits the basic fields of a user."""
+class UpdateUserForm(PartialUpdateMixin, ModelForm):
+    """Edits whichever of the basic fields of a user are given."""
 
     class Meta:
         model = User
@@ -53,7 +76,7 @@ class UpdatePasswordForm(ModelForm):
     def clean_current(self):
         """Checks that the supplied current password is currect."""
 
-        if not check_password(self.data["current"], self.instance.password):
+        if not self.instance.check_password(self.data["current"]):
             self.add_error("current", "Current password not correct.")
         return self.data["current"]
 
@@ -86,8 +109,49 @@ class SlotForm(ModelForm):
 
 
 
+class PartialSlotForm(PartialUpdateMixin, SlotForm):
+    """Edits whichever fields of a slot are given."""
+
+
+
 class ProjectForm(ModelForm):
 
     class Meta:
         model = Project
-        exclude = ["id", "creation_time"]
\ No newline at end of file
+        exclude = ["id", "creation_time"]
+
+
+
+class PartialProjectForm(PartialUpdateMixin, ProjectForm):
+    """Edits whichever fields of a project are given."""
+
+
+
+class BulkProjectForm(ProjectForm):
+    """A ProjectForm for one of many projects being validated at once, which
+    makes no queries of its own. The user is given rather than looked up, and
+    the category is looked up in the user's categories, which are also given.
+    The category must be one of the user's."""
+
+    class Meta:
+        model = Project
+        exclude = ["id", "creation_time", "user", "category"]
+    
+    category = IntegerField(required=False)
+
+    def __init__(self, data, user, categories, instance=None):
+        ModelForm.__init__(self, data, instance=instance)
+        self.instance.user = user
+        self.categories = categories
+
+
+    def clean_category(self):
+        """Sets the project's category from the user's categories, if one was
+        given - a project being updated without one keeps the one it has."""
+
+        category = self.cleaned_data.get("category")
+        if category is not None and category not in self.categories:
+            raise ValidationError("Select a valid choice. That choice is not one of the available choices.")
+        if "category" in self.data or self.instance._state.adding:
+            self.instance.category = self.categories.get(category)
+        return category
@@ -0,0 +1,78 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.contrib.auth import hashers
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    """Django's PBKDF2 hasher with the iteration count taken from settings, so
+    that each environment can choose its own work factor. Hashes made with a
+    different count are upgraded the next time their password is checked."""
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_ITERATIONS
+
+
+
+class HashingBusy(Exception):
+    """Raised when the hashing pool's queue is full."""
+
+
+
+class HashingPool:
+    """Runs password hashing and checking on a fixed number of worker threads.
+
+    Hashing is deliberately slow, and PBKDF2 releases the GIL while it works,
+    so handing it to a pool bounds how much CPU a burst of logins can take
+    without stopping other requests from being served. At most workers + queue
+    jobs can be waiting or running at once - beyond that, callers wait up to
+    timeout seconds for a place and are then turned away with HashingBusy
+    rather than piling up behind each other."""
+
+    def __init__(self, workers, queue, timeout):
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="hashing"
+        )
+        self.places = threading.BoundedSemaphore(workers + queue)
+        self.timeout = timeout
+
+
+    def run(self, function, *args):
+        """Runs a function in the pool and returns its result."""
+
+        if not self.places.acquire(timeout=self.timeout):
+            raise HashingBusy('{"error": "Server busy, please try again"}')
+        try:
+            return self.executor.submit(function, *args).result()
+        finally:
+            self.places.release()
+
+
+    def make_password(self, password):
+        """Salts and hashes a password with the preferred hasher."""
+
+        return self.run(hashers.make_password, password)
+
+
+    def check_password(self, password, encoded):
+        """Checks a password against a hash. Returns whether it matched, and if
+        it did but the hash was made with an outdated hasher or work factor, a
+        new hash of the password to store in its place."""
+
+        def check():
+            upgraded = []
+            valid = hashers.check_password(
+                password, encoded, setter=lambda raw: upgraded.append(
+                    hashers.make_password(raw)
+                )
+            )
+            return valid, upgraded[0] if upgraded else None
+
+        return self.run(check)
+
+
+
+pool = HashingPool(
+    settings.PASSWORD_HASHING_WORKERS, settings.PASSWORD_HASHING_QUEUE,
+    settings.PASSWORD_HASHING_TIMEOUT
+)
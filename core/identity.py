@@ -0,0 +1,68 @@
+import threading
+
+class IdentityMap:
+    """The model objects loaded while handling one request, keyed by model and
+    primary key, so that a row already loaded is reused rather than fetched
+    again and there is only ever one object for it.
+
+    Objects can be loaded with only some of their fields, so an object is
+    only given out if it has all the fields the caller is going to use. The
+    root fields of a query can be resolved on several threads at once, so
+    objects are added under a lock."""
+
+    def __init__(self):
+        self.objects = {}
+        self.lock = threading.Lock()
+
+
+    def __len__(self):
+        return len(self.objects)
+
+
+    def get(self, model, pk, fields=None):
+        """Returns the object of a model with the given primary key, if it has
+        been loaded with all of the fields given - or with every field, if
+        none are given. Otherwise None is returned."""
+
+        obj = self.objects.get((model, pk))
+        if obj is None: return None
+        deferred = obj.get_deferred_fields()
+        if deferred and (fields is None or deferred.intersection(
+            model._meta.get_field(name).attname for name in fields
+        )): return None
+        return obj
+
+
+    def add(self, obj, replace=False):
+        """Adds an object, returning the one to use from now on - which is the
+        object already held for its row, if there is one, unless the new
+        object is to replace it, or the new object has fields loaded which the
+        held one doesn't."""
+
+        if obj is None: return None
+        key = (obj.__class__, obj.pk)
+        with self.lock:
+            held = self.objects.get(key)
+            if held is None or replace or not held.get_deferred_fields().issubset(
+                obj.get_deferred_fields()
+            ):
+                self.objects[key] = held = obj
+        return held
+
+
+
+lock = threading.Lock()
+
+
+
+def identity_map(request):
+    """Returns the identity map belonging to a request, creating it if this is
+    the first time it has been asked for."""
+
+    identities = getattr(request, "identities", None)
+    if identities is None:
+        with lock:
+            identities = getattr(request, "identities", None)
+            if identities is None:
+                identities = request.identities = IdentityMap()
+    return identities
@@ -0,0 +1,81 @@
+import os
+import time
+import fcntl
+import threading
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+EPOCH = 1577836800000
+
+class IDGenerator:
+    """Makes 18 digit integer IDs which are unique by construction, so they
+    never need checking against the table before use and can be given to
+    objects before they are saved - including many at once with bulk_create.
+
+    An ID is a 1 followed by the milliseconds since 2020 (12 digits, enough
+    until the 2300s), the process's node number (2 digits) and a sequence
+    number within the millisecond (3 digits). IDs from one process are always
+    increasing - if the sequence runs out, or the clock goes backwards, the
+    next millisecond is borrowed - so new rows go at the end of the primary
+    key index.
+
+    IDs from different processes can't clash as no two processes hold the
+    same node number. Unless a node is given, each process claims one of the
+    nodes it is allowed by taking an exclusive lock on that node's lock file,
+    which it holds until it exits - so a process which can't find a free node
+    refuses to make IDs rather than risk a clash. Processes on different hosts
+    must be allowed different nodes."""
+
+    def __init__(self, node=None, nodes=range(100), lock_dir=None):
+        self.node, self.nodes, self.lock_dir = node, nodes, lock_dir
+        self.lock = threading.Lock()
+        self.pid, self.last, self.lock_file = None, 0, None
+
+
+    def __call__(self):
+        with self.lock:
+            if self.pid != os.getpid():
+                self.process_node = self.claim_node()
+                self.pid = os.getpid()
+            self.last = max(self.last + 1, (int(time.time() * 1000) - EPOCH) * 1000)
+            milliseconds, sequence = divmod(self.last, 1000)
+        return (
+            10 ** 17 + milliseconds * 100000 + self.process_node * 1000 + sequence
+        )
+
+
+    def claim_node(self):
+        """Returns the node number for the current process, claiming the first
+        free node's lock file if no node was given. A process forked from one
+        which had claimed a node lets go of its copy of the parent's lock file
+        and claims one of its own."""
+
+        if self.node is not None: return self.node % 100
+        if self.nodes.start < 0 or self.nodes.stop > 100:
+            raise ImproperlyConfigured("ID nodes must be between 0 and 99")
+        if self.lock_file: self.lock_file.close()
+        self.lock_file = None
+        for node in self.nodes:
+            lock_file = open(os.path.join(
+                self.lock_dir or settings.ID_NODE_LOCK_DIR, f"stratako-id-node-{node}.lock"
+            ), "a")
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                continue
+            self.lock_file = lock_file
+            return node
+        raise ImproperlyConfigured(
+            f"Every ID node from {self.nodes.start} to {self.nodes.stop - 1} "
+            "is held by another process"
+        )
+
+
+
+generator = IDGenerator(nodes=settings.ID_NODES)
+
+def generate_id():
+    """Returns a new ID from the process's generator."""
+
+    return generator()
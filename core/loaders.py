@@ -0,0 +1,153 @@
+from collections import defaultdict
+from promise import Promise
+from promise.dataloader import DataLoader
+from .models import *
+from .identity import IdentityMap, identity_map
+
+def get_loader(info, loader_class, plan=None, filters=None, ordering=None):
+    """Returns the instance of a loader belonging to the current request,
+    creating it if this is the first time it has been asked for. Sharing
+    loaders across the request is what lets them batch lookups together.
+
+    A query plan can be given to restrict what the loader fetches, along with
+    filter arguments and an ordering to apply to its queryset - there is one
+    loader per distinct combination of these. Each root field has loaders of
+    its own, as root fields can be resolved on different threads and a
+    loader can't be used from two at once. All of them share the request's
+    identity map."""
+
+    identities = identity_map(info.context)
+    loaders = getattr(info.context, "loaders", None)
+    if loaders is None:
+        with identities.lock:
+            loaders = getattr(info.context, "loaders", None)
+            if loaders is None: loaders = info.context.loaders = {}
+    filters = filters or {}
+    key = (
+        info.path[0], loader_class, plan.key if plan else None,
+        tuple(sorted(filters.items())), tuple(ordering or ())
+    )
+    if key not in loaders:
+        loaders[key] = loader_class(plan, filters, ordering, identities=identities)
+    return loaders[key]
+
+
+
+class ModelLoader(DataLoader):
+    """Base class for loaders which fetch objects of a single model. Objects
+    they fetch are added to an identity map, and the objects already in it
+    are used in their place."""
+
+    model = None
+
+    def __init__(self, plan=None, filters=None, ordering=None, identities=None):
+        DataLoader.__init__(self)
+        self.plan = plan
+        self.filters = filters or {}
+        self.ordering = ordering
+        self.identities = IdentityMap() if identities is None else identities
+
+
+    def get_queryset(self):
+        """Returns the model's queryset, filtered and ordered as the loader
+        was asked to, and restricted to its query plan if it has one."""
+
+        queryset = self.model.objects.filter(**self.filters)
+        if self.ordering: queryset = queryset.order_by(*self.ordering)
+        return self.plan.apply(queryset) if self.plan else queryset
+
+
+
+class ObjectLoader(ModelLoader):
+    """Loads objects of some model by primary key, fetching every key requested
+    in the same tick with a single query. Keys whose objects are already in
+    the identity map, with the fields the loader needs, aren't fetched at all
+    - unless the loader filters its objects, as the map's may not match.
+    Missing objects resolve to None."""
+
+    def batch_load_fn(self, keys):
+        objects = {}
+        if not self.filters:
+            fields = self.plan.columns if self.plan else None
+            for key in keys:
+                obj = self.identities.get(self.model, key, fields)
+                if obj is not None: objects[key] = obj
+        missing = [key for key in keys if key not in objects]
+        if missing:
+            for key, obj in self.get_queryset().in_bulk(missing).items():
+                objects[key] = self.identities.add(obj)
+        return Promise.resolve([objects.get(key) for key in keys])
+
+
+
+class RelationLoader(ModelLoader):
+    """Loads the objects of some model which point to each of a batch of parent
+    objects, as lists in the model's default order, with a single query."""
+
+    field = None
+
+    def batch_load_fn(self, keys):
+        groups = defaultdict(list)
+        for obj in self.get_queryset().filter(**{f"{self.field}__in": keys}):
+            groups[getattr(obj, self.field)].append(self.identities.add(obj))
+        return Promise.resolve([groups[key] for key in keys])
+
+
+
+class PositionsLoader(ModelLoader):
+    """Loads, for each of a batch of users, a dictionary mapping the IDs of
+    their objects of some ordered model to those objects' positions in the
+    user's list, counting from 1."""
+
+    def batch_load_fn(self, keys):
+        positions = {key: {} for key in keys}
+        for user_id, id in self.model.objects.filter(user_id__in=keys).order_by(
+            "user_id", "order"
+        ).values_list("user_id", "id"):
+            positions[user_id][id] = len(positions[user_id]) + 1
+        return Promise.resolve([positions[key] for key in keys])
+
+
+
+class UserLoader(ObjectLoader):
+    model = User
+
+
+
+class ProjectLoader(ObjectLoader):
+    model = Project
+
+
+
+class ProjectCategoryLoader(ObjectLoader):
+    model = ProjectCategory
+
+
+
+class SlotsByUserLoader(RelationLoader):
+    model, field = Slot, "user_id"
+
+
+
+class ProjectsByUserLoader(RelationLoader):
+    model, field = Project, "user_id"
+
+
+
+class ProjectsByCategoryLoader(RelationLoader):
+    model, field = Project, "category_id"
+
+
+
+class ProjectCategoriesByUserLoader(RelationLoader):
+    model, field = ProjectCategory, "user_id"
+
+
+
+class SlotPositionsLoader(PositionsLoader):
+    model = Slot
+
+
+
+class ProjectCategoryPositionsLoader(PositionsLoader):
+    model = ProjectCategory
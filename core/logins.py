@@ -0,0 +1,115 @@
+import atexit
+import logging
+import threading
+from django.conf import settings
+from django.db import connections, DatabaseError
+from django.db.models import Case, When, Value, F
+from django.db.models.functions import Coalesce, Greatest
+from core.models import User
+
+logger = logging.getLogger(__name__)
+
+class LastLoginBuffer:
+    """Remembers when users last logged in, and writes those times to the
+    users table in batches rather than with an UPDATE - and a row lock - per
+    login. What is in the table is never more than the flush interval behind,
+    as a background thread flushes the buffer that often, and the buffer is
+    flushed once more when the process exits. With an interval of 0, each
+    login is written straight away."""
+
+    def __init__(self, interval, batch_size=250):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.logins = {}
+        self.lock = threading.Lock()
+        self.thread = None
+
+
+    def __len__(self):
+        return len(self.logins)
+
+
+    def record(self, user_id, timestamp):
+        """Notes that a user logged in at some time, to be written later."""
+
+        if not self.interval: return self.write({user_id: timestamp})
+        with self.lock:
+            self.logins[user_id] = max(timestamp, self.logins.get(user_id, timestamp))
+            if self.thread is None: self.start()
+
+
+    def flush(self):
+        """Writes every login recorded so far, returning how many there were.
+        If they can't be written they are kept, along with any recorded since,
+        to be written next time."""
+
+        with self.lock:
+            logins, self.logins = self.logins, {}
+        try:
+            if logins: self.write(logins)
+        except Exception:
+            with self.lock:
+                for user_id, timestamp in logins.items():
+                    self.logins[user_id] = max(
+                        timestamp, self.logins.get(user_id, timestamp)
+                    )
+            raise
+        return len(logins)
+
+
+    def clear(self):
+        """Forgets every login recorded so far without writing them."""
+
+        with self.lock:
+            self.logins.clear()
+
+
+    def write(self, logins):
+        """Sets the last login times of some users, with one UPDATE per batch
+        of users. A time is only written if it is later than the one already
+        there, which another process may have written since the login."""
+
+        logins = list(logins.items())
+        for start in range(0, len(logins), self.batch_size):
+            batch = logins[start:start + self.batch_size]
+            User.objects.filter(id__in=[id for id, _ in batch]).update(
+                last_login=Greatest(Coalesce(F("last_login"), Value(0)), Case(*[
+                    When(id=id, then=Value(timestamp)) for id, timestamp in batch
+                ], default=F("last_login")))
+            )
+
+
+    def start(self):
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(
+            target=self.run, name="last_login_flush", daemon=True
+        )
+        self.thread.start()
+        atexit.register(self.stop)
+
+
+    def run(self):
+        """Flushes the buffer every interval until stopped, closing the
+        thread's database connections after each flush."""
+
+        while not self.stopped.wait(self.interval):
+            try:
+                self.flush()
+            except DatabaseError:
+                logger.exception("Couldn't write last login times")
+            finally:
+                connections.close_all()
+
+
+    def stop(self):
+        """Stops the background thread and writes whatever it hadn't yet."""
+
+        if self.thread:
+            self.stopped.set()
+            self.thread.join()
+            self.thread = None
+        self.flush()
+
+
+
+last_logins = LastLoginBuffer(settings.LAST_LOGIN_FLUSH_INTERVAL)
@@ -0,0 +1,8 @@
+from django.core.management.base import BaseCommand
+from core.models import Tombstone
+
+class Command(BaseCommand):
+    help = "Deletes tombstones older than TOMBSTONE_RETENTION - run it daily."
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Deleted {Tombstone.prune()} tombstones")
@@ -3,30 +3,90 @@ import time
 from datetime import datetime
 from django.conf import settings
 from django.http import JsonResponse
+from django.utils.functional import SimpleLazyObject, empty
 from .models import User
+from .tokens import token_codec, TokenError
+from .identity import identity_map
 
 class AuthenticationMiddleware:
     """Incoming requests will be annotated with a User, or None, based on the
-    access token provided. Outgoing responses set a HTTP-only refresh token
-    cookie if the request has had one added to it at some point, or removed if
-    it has been set to False."""
+    access token provided. The user is only looked up the first time it is
+    used, so operations which never read it don't touch the database, and is
+    then shared with the loaders through the request's identity map. Outgoing
+    responses set a HTTP-only refresh token cookie if the request has had one
+    added to it at some point, or removed if it has been set to False."""
     
     def __init__(self, get_response):
         self.get_response = get_response
     
 
     def __call__(self, request):
-        request.user = User.from_token(
-            request.META.get("HTTP_AUTHORIZATION", "").replace("Bearer ", "")
-        )
-
+        authenticate(request)
         response = self.get_response(request)
+        return set_refresh_cookie(request, response)
+
+
+
+class AsyncAuthenticationMiddleware:
+    """The same as AuthenticationMiddleware, for use in front of a coroutine
+    which returns responses, as in core.asgi. As the user is only looked up
+    when first used, that happens in whichever thread the view does its
+    database work in, and never on the event loop."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+    
+
+    async def __call__(self, request):
+        authenticate(request)
+        response = await self.get_response(request)
+        return set_refresh_cookie(request, response)
+
+
+
+def authenticate(request):
+    """Gives a request a lazily looked up user from its access token, which is
+    added to the request's identity map once looked up."""
+
+    token = access_token(request)
+    request.user = SimpleLazyObject(
+        lambda: identity_map(request).add(User.from_token(token))
+    )
+
+
+def access_token(request):
+    """Returns the access token a request was sent with."""
+
+    return request.META.get("HTTP_AUTHORIZATION", "").replace("Bearer ", "")
+
+
+def token_user_id(request):
+    """Returns the ID of the user a request's access token was issued to, or
+    None if the token isn't valid, without looking the user up."""
+
+    try:
+        return token_codec.decode(access_token(request))["sub"]
+    except TokenError: return None
+
+
+def looked_up_user(request):
+    """Returns a request's user if something has already looked it up, or None
+    if nothing has (or there is no user), without looking it up."""
+
+    user = getattr(request, "user", None)
+    if isinstance(user, SimpleLazyObject) and user._wrapped is empty: return None
+    return user or None
+
+
+def set_refresh_cookie(request, response):
+    """Sets or deletes the refresh token cookie on a response if the request
+    has had a refresh token added to it."""
 
-        try:
-            refresh_token = request.refresh_token
-        except AttributeError: refresh_token = None
-        if refresh_token is False:
-            response.delete_cookie("refresh_token")
-        elif refresh_token:
-            response.set_cookie("refresh_token", value=refresh_token, httponly=True)
-        return response
\ No newline at end of file
+    try:
+        refresh_token = request.refresh_token
+    except AttributeError: refresh_token = None
+    if refresh_token is False:
+        response.delete_cookie("refresh_token")
+    elif refresh_token:
+        response.set_cookie("refresh_token", value=refresh_token, httponly=True)
+    return response
\ No newline at end of file
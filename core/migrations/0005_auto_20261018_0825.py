@@ -0,0 +1,17 @@
+# Generated by Django 2.2.14 on 2026-10-18 08:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_auto_20210131_2031'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['user', 'creation_time', 'id'], name='projects_user_time_id'),
+        ),
+    ]
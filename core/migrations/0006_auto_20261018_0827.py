@@ -0,0 +1,21 @@
+# Generated by Django 2.2.14 on 2026-10-18 08:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_auto_20261018_0825'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['user', 'status', 'creation_time', 'id'], name='projects_user_status_time'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['user', 'name', 'id'], name='projects_user_name_id'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 2.2.14 on 2026-10-18 08:30
+
+from django.db import migrations, models
+
+def spread_orders(apps, schema_editor):
+    """Renumbers each user's slots and project categories so that their orders
+    are unique and 65536 apart."""
+
+    for model_name in ["Slot", "ProjectCategory"]:
+        Model = apps.get_model("core", model_name)
+        objects, user_id, index = [], None, 0
+        for obj in Model.objects.order_by("user_id", "order", "id"):
+            if obj.user_id != user_id: user_id, index = obj.user_id, 0
+            index += 1
+            obj.order = index * 2 ** 16
+            objects.append(obj)
+        Model.objects.bulk_update(objects, ["order"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_auto_20261018_0827'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='projectcategory',
+            name='order',
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='slot',
+            name='order',
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.RunPython(spread_orders, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='projectcategory',
+            constraint=models.UniqueConstraint(fields=('user', 'order'), name='project_categories_user_order'),
+        ),
+        migrations.AddConstraint(
+            model_name='slot',
+            constraint=models.UniqueConstraint(fields=('user', 'order'), name='slots_user_order'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 2.2.14 on 2026-10-18 08:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_auto_20261018_0830'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['category', 'creation_time', 'id'], name='projects_category_time'),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 2.2.14 on 2026-10-18 08:57
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_auto_20261018_0835'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=40)),
+                ('object_id', models.BigIntegerField()),
+                ('deleted_at', models.IntegerField()),
+            ],
+            options={
+                'db_table': 'tombstones',
+                'ordering': ['deleted_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='updated_at',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='projectcategory',
+            name='updated_at',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='slot',
+            name='updated_at',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['user', 'updated_at', 'id'], name='projects_user_updated_at'),
+        ),
+        migrations.AddIndex(
+            model_name='projectcategory',
+            index=models.Index(fields=['user', 'updated_at', 'id'], name='categories_user_updated_at'),
+        ),
+        migrations.AddIndex(
+            model_name='slot',
+            index=models.Index(fields=['user', 'updated_at', 'id'], name='slots_user_updated_at'),
+        ),
+        migrations.AddField(
+            model_name='tombstone',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tombstones', to='core.User'),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['user', 'deleted_at', 'id'], name='tombstones_user_deleted_at'),
+        ),
+    ]
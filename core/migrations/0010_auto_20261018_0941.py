@@ -0,0 +1,34 @@
+# Generated by Django 2.2.14 on 2026-10-18 09:41
+
+import core.ids
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_auto_20261018_0857'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='project',
+            name='id',
+            field=models.BigIntegerField(default=core.ids.generate_id, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='projectcategory',
+            name='id',
+            field=models.BigIntegerField(default=core.ids.generate_id, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='slot',
+            name='id',
+            field=models.BigIntegerField(default=core.ids.generate_id, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='id',
+            field=models.BigIntegerField(default=core.ids.generate_id, primary_key=True, serialize=False),
+        ),
+    ]
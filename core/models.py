@@ -1,14 +1,33 @@
 import time
-import jwt
-import base64
-from random import randint
-from django_random_id_model import RandomIDModel
-from django.db import models
+from django.db import models, transaction, IntegrityError
+from django.db.models import Max
 from django.conf import settings
 from django.core.exceptions import ValidationError
-from django.contrib.auth.hashers import make_password
+from core.cache import verified_tokens
+from core.tokens import token_codec, TokenError
+from core import hashing, events
+from core.ids import generate_id
 
-class User(RandomIDModel):
+class UniqueIDModel(models.Model):
+    """Gives a model an 18 digit integer primary key from core.ids, which is
+    set as soon as an object is made rather than when it is saved."""
+
+    class Meta:
+        abstract = True
+
+    id = models.BigIntegerField(primary_key=True, default=generate_id)
+
+    def save(self, *args, **kwargs):
+        """Inserts new objects straight away - as they already have a primary
+        key, Django would otherwise try to update them first."""
+
+        if self._state.adding and not kwargs.get("update_fields"):
+            kwargs.setdefault("force_insert", True)
+        super(UniqueIDModel, self).save(*args, **kwargs)
+
+
+
+class User(UniqueIDModel):
     """The user model."""
 
     class Meta:
@@ -34,42 +53,84 @@ class User(RandomIDModel):
     @staticmethod
     def from_token(token):
         """Takes a JWT, and if it's signed properly, isn't expired, and points
-        to an actual user, returns that user."""
+        to an actual user, returns that user. Tokens that have been verified
+        before are remembered until they expire, so that their signature only
+        needs to be checked once. Only the user's ID is remembered - the user
+        is still looked up by primary key every time, as the cache belongs to
+        one process and can't see changes made by any other."""
 
         try:
-            token = jwt.decode(token, settings.SECRET_KEY)
-            assert token["expires"] > time.time()
-            user = User.objects.get(id=token["sub"])
-        except: user = None
+            user_id = verified_tokens.get(token)
+            if user_id is None:
+                claims = token_codec.decode(token)
+                user = User.objects.get(id=claims["sub"])
+                verified_tokens.set(token, user.id, claims["expires"])
+            else:
+                user = User.objects.get(id=user_id)
+        except (TokenError, User.DoesNotExist): user = None
         return user
     
 
     def save(self, *args, **kwargs):
         """If the model is being saved for the first time, set the creation
-        time."""
+        time if it hasn't been given. Otherwise, forget any tokens verified
+        for the user."""
         
-        if not self.id:
-            self.creation_time = int(time.time())
+        if self._state.adding:
+            self.creation_time = self.creation_time or int(time.time())
+        else:
+            verified_tokens.invalidate_user(self.id)
         super(User, self).save(*args, **kwargs)
     
 
+    def delete(self, *args, **kwargs):
+        """Forgets any tokens verified for the user before deleting it."""
+
+        verified_tokens.invalidate_user(self.id)
+        return super(User, self).delete(*args, **kwargs)
+    
+
+    def create_with_slots(self, names):
+        """Saves a new user along with slots of the names given, in that order,
+        as one transaction of two INSERTs."""
+
+        now = int(time.time())
+        self.creation_time = now
+        slots = [Slot(
+            name=name, user=self, order=i * Slot.ORDER_STEP, updated_at=now
+        ) for i, name in enumerate(names, start=1)]
+        with transaction.atomic():
+            User.objects.bulk_create([self])
+            Slot.objects.bulk_create(slots)
+        for slot in slots: slot.notify()
+        return slots
+    
+
     def set_password(self, password):
         """"Sets the user's password, salting and hashing whatever is given
-        using Django's built in functions."""
+        using Django's built in functions on the hashing pool."""
 
-        self.password = make_password(password)
+        self.password = hashing.pool.make_password(password)
         self.save()
     
 
+    def check_password(self, password):
+        """Checks a password against the user's hash on the hashing pool. If
+        the hash is out of date it is replaced with a new one, which will be
+        stored the next time the user is saved."""
+
+        valid, upgraded = hashing.pool.check_password(password, self.password)
+        if upgraded: self.password = upgraded
+        return valid
+    
+
     def make_access_jwt(self):
         """Creates and signs an access token indicating the user who signed and
         the time it was signed. It will also indicate that it expires in 15
         minutes."""
         
         now = int(time.time())
-        return jwt.encode({
-            "sub": self.id, "iat": now, "expires": now + 900
-        }, settings.SECRET_KEY, algorithm="HS256").decode()
+        return token_codec.encode(self.id, now, now + 900)
     
 
     def make_refresh_jwt(self):
@@ -78,51 +139,308 @@ class User(RandomIDModel):
         days."""
         
         now = int(time.time())
-        return jwt.encode({
-            "sub": self.id, "iat": now, "expires": now + 31536000
-        }, settings.SECRET_KEY, algorithm="HS256").decode()
+        return token_codec.encode(self.id, now, now + 31536000)
 
 
 
-class Slot(RandomIDModel):
+class SyncedModel(UniqueIDModel):
+    """A model whose objects clients keep their own copies of, and ask for the
+    changes to. Every object records when it last changed, and deleting one
+    leaves a tombstone behind so that clients know to delete it too. Streams
+    open for the object's user are notified of both."""
 
     class Meta:
-        db_table = "slots"
-        ordering = ["order"]
+        abstract = True
 
-    name = models.CharField(max_length=40)
-    order = models.IntegerField(null=True)
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="slots")
+    updated_at = models.IntegerField(default=0, editable=False)
 
-    def __str__(self):
-        return self.name
+    def save(self, *args, **kwargs):
+        """Records the time the object was saved, including when only some of
+        its fields are."""
+
+        self.updated_at = int(time.time())
+        if kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = {*kwargs["update_fields"], "updated_at"}
+        super(SyncedModel, self).save(*args, **kwargs)
+        self.notify()
+    
+
+    def delete(self, *args, **kwargs):
+        """Deletes the object, leaving a tombstone in its place."""
+
+        with transaction.atomic():
+            tombstone = Tombstone.objects.create(
+                user_id=self.user_id, model=self._meta.model_name,
+                object_id=self.id, deleted_at=int(time.time())
+            )
+            self.notify(deleted_at=tombstone.deleted_at)
+            return super(SyncedModel, self).delete(*args, **kwargs)
+    
+
+    def notify(self, deleted_at=None):
+        """Publishes a change to the object to its user's streams, once the
+        transaction it was made in has committed."""
+
+        user_id, event = self.user_id, {
+            "type": "change", "model": self._meta.model_name, "id": str(self.id),
+            "updatedAt": deleted_at or self.updated_at, "deleted": bool(deleted_at)
+        }
+        transaction.on_commit(lambda: events.broker.publish(user_id, event))
+    
+
+    @classmethod
+    def update_owned(cls, user_id, id, **values):
+        """Updates an object with one UPDATE, if it belongs to the given user,
+        and returns whether it did."""
+
+        now = int(time.time())
+        updated = cls.objects.filter(id=id, user_id=user_id).update(
+            **values, updated_at=now
+        )
+        if updated: cls(id=id, user_id=user_id, updated_at=now).notify()
+        return bool(updated)
+    
+
+    @classmethod
+    def delete_owned(cls, user_id, id):
+        """Deletes an object with one DELETE, if it belongs to the given user.
+        Returns whether it was deleted, in which case a tombstone is left in its
+        place."""
+
+        with transaction.atomic(savepoint=False):
+            if not cls.objects.filter(id=id, user_id=user_id).delete()[0]: return False
+            tombstone = Tombstone.objects.create(
+                user_id=user_id, model=cls._meta.model_name,
+                object_id=id, deleted_at=int(time.time())
+            )
+            cls(id=id, user_id=user_id).notify(deleted_at=tombstone.deleted_at)
+        return True
+    
+
+    @classmethod
+    def create_many(cls, objects):
+        """Saves many new objects with one INSERT."""
+
+        now = int(time.time())
+        for obj in objects: obj.updated_at = now
+        cls.objects.bulk_create(objects)
+        for obj in objects: obj.notify()
+        return objects
+    
+
+    @classmethod
+    def update_many(cls, objects, fields):
+        """Saves the given fields of many objects with one UPDATE."""
+
+        now = int(time.time())
+        for obj in objects: obj.updated_at = now
+        cls.objects.bulk_update(objects, [*fields, "updated_at"])
+        for obj in objects: obj.notify()
+    
+
+    @classmethod
+    def delete_many(cls, objects):
+        """Deletes many objects with one DELETE, leaving tombstones for all of
+        them, which are inserted with one INSERT."""
+
+        now = int(time.time())
+        with transaction.atomic():
+            Tombstone.objects.bulk_create([Tombstone(
+                user_id=obj.user_id, model=cls._meta.model_name,
+                object_id=obj.id, deleted_at=now
+            ) for obj in objects])
+            for obj in objects: obj.notify(deleted_at=now)
+            cls.objects.filter(id__in=[obj.id for obj in objects]).delete()
+
+
+
+class OrderedModel(SyncedModel):
+    """A model whose objects are kept in an order of the user's choosing.
+
+    Rather than numbering objects 1, 2, 3..., orders are spaced ORDER_STEP
+    apart, so that an object can be moved by giving it an order between those
+    of its new neighbours - only the moved row's order needs to be written.
+    When two neighbours have no room left between them, all the user's objects
+    are spread out again. No two objects of a user can share an order.
+
+    Clients syncing a user's objects are given the order as each object's sort
+    key and sort by it themselves, so moving or deleting an object doesn't
+    change any other - only spreading the orders out, or reordering them all,
+    marks every object as updated."""
+
+    class Meta:
+        abstract = True
+
+    ORDER_STEP = 2 ** 16
+
+    FIELD_COLUMNS = {"sort_key": "order"}
+
+    order = models.BigIntegerField(null=True)
+
+    def siblings(self):
+        """Returns the objects in the same user as this one, including this
+        one, in order."""
+
+        return self.__class__.objects.filter(user_id=self.user_id).order_by("order")
     
 
     def save(self, *args, **kwargs):
-        """If no order is given, count the number of slots in the containing
-        user and add one."""
-        
-        if self.order is None:
-            self.order = self.user.slots.count() + 1
-        super(Slot, self).save(*args, **kwargs)
+        """If no order is given, put the object after the user's last one. If
+        another object took that order in the meantime, the last order is
+        looked up again and the save retried."""
+
+        if self.order is not None:
+            return super(OrderedModel, self).save(*args, **kwargs)
+        attempts = 5
+        for attempt in range(attempts):
+            last = self.siblings().aggregate(last=Max("order"))["last"]
+            self.order = (last or 0) + self.ORDER_STEP
+            try:
+                with transaction.atomic():
+                    return super(OrderedModel, self).save(*args, **kwargs)
+            except IntegrityError: continue
+        self.order = None
+        raise IntegrityError(f"Could not add {self} after {attempts} attempts")
+    
+
+    @classmethod
+    def create_many(cls, objects, attempts=5):
+        """Saves many new objects of one user with one INSERT, after the
+        user's last object and in the order given. If another object took one
+        of those orders in the meantime, the last order is looked up again
+        and the INSERT retried."""
+
+        if not objects: return objects
+        for attempt in range(attempts):
+            last = objects[0].siblings().aggregate(last=Max("order"))["last"] or 0
+            for i, obj in enumerate(objects, start=1):
+                obj.order = last + i * cls.ORDER_STEP
+            try:
+                with transaction.atomic():
+                    return super(OrderedModel, cls).create_many(objects)
+            except IntegrityError: continue
+        raise IntegrityError(f"Could not add {len(objects)} objects after {attempts} attempts")
+    
+
+    @classmethod
+    def reorder(cls, objects):
+        """Puts all of a user's objects into the order given, with one UPDATE.
+        As in spread(), the new orders all come after the current highest one
+        so that they never clash. Every object's order changes, so all of them
+        are marked as updated."""
+
+        if not objects: return objects
+        start = max(obj.order for obj in objects) + cls.ORDER_STEP
+        now = int(time.time())
+        for position, obj in enumerate(objects):
+            obj.order, obj.updated_at = start + position * cls.ORDER_STEP, now
+        with transaction.atomic():
+            cls.objects.bulk_update(objects, ["order", "updated_at"])
+            for obj in objects: obj.notify()
+        return objects
+    
+
+    def neighbours(self, index):
+        """Returns the orders of the objects either side of the given position
+        in the user's list - None at either end. Positions before the start
+        are taken to be the start."""
+
+        index = max(index, 0)
+        others = self.siblings().exclude(id=self.id).values_list("order", flat=True)
+        orders = list(others[max(index - 1, 0):index + 1])
+        if index == 0: return None, orders[0] if orders else None
+        if not orders:
+            return others.aggregate(last=Max("order"))["last"], None
+        return orders[0], orders[1] if len(orders) > 1 else None
+    
+
+    def spread(self):
+        """Gives every object in the user evenly spaced orders, keeping their
+        current sequence. The new orders all come after the current highest
+        one, so they can be written in one statement without ever clashing.
+        Every object's order changes, so all of them are marked as updated."""
+
+        siblings = list(self.siblings())
+        start, now = siblings[-1].order + self.ORDER_STEP, int(time.time())
+        for i, sibling in enumerate(siblings):
+            sibling.order, sibling.updated_at = start + i * self.ORDER_STEP, now
+            if sibling.id == self.id: self.order = sibling.order
+        with transaction.atomic():
+            self.__class__.objects.bulk_update(siblings, ["order", "updated_at"])
+            for sibling in siblings: sibling.notify()
     
 
-    def move_to(self, index):
-        """Moves a Slot to a new position within the containing user."""
+    def move_to(self, index, attempts=5):
+        """Moves an object to a new position within the containing user, by
+        writing its order and nothing else. If another move took the order
+        this one wanted in the meantime, the neighbours are looked up again
+        and the move retried."""
+
+        for attempt in range(attempts):
+            before, after = self.neighbours(index)
+            if before is None and after is None: return
+            if (before is None or before < self.order) and (after is None or self.order < after):
+                return
+            if before is None:
+                order = after - self.ORDER_STEP
+            elif after is None:
+                order = before + self.ORDER_STEP
+            elif after - before > 1:
+                order = (before + after) // 2
+            else:
+                self.spread()
+                continue
+            try:
+                self.updated_at = int(time.time())
+                with transaction.atomic():
+                    self.__class__.objects.filter(id=self.id).update(
+                        order=order, updated_at=self.updated_at
+                    )
+                    self.notify()
+                self.order = order
+                return
+            except IntegrityError: continue
+        raise IntegrityError(f"Could not move {self} after {attempts} attempts")
+
+
+
+class Slot(OrderedModel):
+
+    class Meta:
+        db_table = "slots"
+        ordering = ["order"]
+        constraints = [models.UniqueConstraint(
+            fields=["user", "order"], name="slots_user_order"
+        )]
+        indexes = [models.Index(
+            fields=["user", "updated_at", "id"], name="slots_user_updated_at"
+        )]
+
+    name = models.CharField(max_length=40)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="slots")
 
-        slots = list(self.user.slots.exclude(id=self.id))
-        slots.insert(index, self)
-        for i, slot in enumerate(slots, start=1):
-            slot.order = i
-        Slot.objects.bulk_update(slots, ["order"])
+    def __str__(self):
+        return self.name
 
 
 
-class Project(RandomIDModel):
+class Project(SyncedModel):
 
     class Meta:
         db_table = "projects"
         ordering = ["creation_time"]
+        indexes = [models.Index(
+            fields=["user", "creation_time", "id"], name="projects_user_time_id"
+        ), models.Index(
+            fields=["user", "status", "creation_time", "id"],
+            name="projects_user_status_time"
+        ), models.Index(
+            fields=["user", "name", "id"], name="projects_user_name_id"
+        ), models.Index(
+            fields=["category", "creation_time", "id"], name="projects_category_time"
+        ), models.Index(
+            fields=["user", "updated_at", "id"], name="projects_user_updated_at"
+        )]
 
     STATUSES = [
         (1, "Active"),
@@ -133,6 +451,17 @@ class Project(RandomIDModel):
         (6, "Completed"),
     ]
 
+    DONE_STATUSES = [5, 6]
+
+    ORDERINGS = {
+        "creationTime": ["creation_time", "id"],
+        "-creationTime": ["-creation_time", "-id"],
+        "name": ["name", "id"],
+        "-name": ["-name", "-id"],
+        "status": ["status", "creation_time", "id"],
+        "-status": ["-status", "-creation_time", "-id"],
+    }
+
     name = models.CharField(max_length=100)
     description = models.TextField(default="")
     color = models.CharField(max_length=9)
@@ -146,34 +475,60 @@ class Project(RandomIDModel):
 
 
 
-class ProjectCategory(RandomIDModel):
+class ProjectCategory(OrderedModel):
 
     class Meta:
         db_table = "project_categories"
         ordering = ["order"]
+        constraints = [models.UniqueConstraint(
+            fields=["user", "order"], name="project_categories_user_order"
+        )]
+        indexes = [models.Index(
+            fields=["user", "updated_at", "id"], name="categories_user_updated_at"
+        )]
     
     name = models.CharField(max_length=40)
-    order = models.IntegerField(null=True)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="project_categories")
 
     def __str__(self):
         return self.name
+    
 
-    def save(self, *args, **kwargs):
-        """If no order is given, count the number of categories in the
-        containing user and add one."""
-        
-        if self.order is None:
-            self.order = self.user.project_categories.count() + 1
-        super(ProjectCategory, self).save(*args, **kwargs)
+    def delete(self, *args, **kwargs):
+        """Deletes the category, marking its projects - which are about to
+        lose their category - as updated."""
+
+        with transaction.atomic():
+            self.projects.update(updated_at=int(time.time()))
+            return super(ProjectCategory, self).delete(*args, **kwargs)
+
+
+
+class Tombstone(models.Model):
+    """A record of a synced object having been deleted, kept so that clients
+    asking for the changes to a user's data can be told about it."""
+
+    class Meta:
+        db_table = "tombstones"
+        ordering = ["deleted_at"]
+        indexes = [models.Index(
+            fields=["user", "deleted_at", "id"], name="tombstones_user_deleted_at"
+        )]
+
+    model = models.CharField(max_length=40)
+    object_id = models.BigIntegerField()
+    deleted_at = models.IntegerField()
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="tombstones")
+
+    def __str__(self):
+        return f"{self.model} {self.object_id}"
     
 
-    def move_to(self, index):
-        """Moves a project category to a new position within the containing
-        user."""
+    @classmethod
+    def prune(cls):
+        """Deletes the tombstones older than TOMBSTONE_RETENTION, which no
+        client can still ask for, returning how many there were."""
 
-        categories = list(self.user.project_categories.exclude(id=self.id))
-        categories.insert(index, self)
-        for i, category in enumerate(categories, start=1):
-            category.order = i
-        ProjectCategory.objects.bulk_update(categories, ["order"])
\ No newline at end of file
+        return cls.objects.filter(
+            deleted_at__lt=int(time.time()) - settings.TOMBSTONE_RETENTION
+        ).delete()[0]
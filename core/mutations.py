@@ -2,10 +2,119 @@ import time
 import json
 import graphene
 from graphql import GraphQLError
-from django.contrib.auth.hashers import check_password
+from django.conf import settings
+from django.db import transaction, IntegrityError
 from core.models import User, Slot, Project
 from core.forms import *
-from core.arguments import create_mutation_arguments
+from core.arguments import create_mutation_arguments, create_input_type
+from core.planner import plan_for
+from core.identity import identity_map
+from core.logins import last_logins
+
+ProjectInput = create_input_type(
+    "ProjectInput", BulkProjectForm, category=graphene.ID()
+)
+
+ProjectUpdateInput = create_input_type(
+    "ProjectUpdateInput", BulkProjectForm, edit=True, category=graphene.ID()
+)
+
+def current_user(info):
+    """Returns the user making the request as the object held in the request's
+    identity map, rather than the lazy object the middleware gives it - which
+    graphene-django would look up again when checking its type."""
+
+    return identity_map(info.context).add(info.context.user)
+
+
+def check_bulk_size(items):
+    """Raises an error if a bulk mutation has been given too many items."""
+
+    if len(items) > settings.BULK_MUTATION_LIMIT:
+        raise GraphQLError(json.dumps({"error":
+            f"No more than {settings.BULK_MUTATION_LIMIT} items can be given at once"
+        }))
+
+
+def get_bulk_objects(queryset, ids, name):
+    """Gets the objects a bulk mutation acts on from a queryset of the user's
+    objects, with one query. If any ID isn't one of them, or is given more
+    than once, an error is raised for each such ID, keyed by its position."""
+
+    check_bulk_size(ids)
+    ids = [int(id) if str(id).isdigit() else None for id in ids]
+    objects = queryset.in_bulk([id for id in ids if id is not None])
+    errors, seen = {}, set()
+    for index, id in enumerate(ids):
+        if id in seen:
+            errors[index] = {name: ["Given more than once"]}
+        elif id not in objects:
+            errors[index] = {name: ["Does not exist"]}
+        seen.add(id)
+    if errors: raise GraphQLError(json.dumps(errors))
+    return [objects[id] for id in ids]
+
+
+def user_slot_ids(user):
+    """Locks all of a user's slots until the end of the transaction and
+    returns their IDs, so that two deletions can't each see the other's slot
+    still there and leave the user with none."""
+
+    return list(user.slots.select_for_update().values_list("id", flat=True))
+
+
+def reorder_objects(queryset, ids, name):
+    """Puts all of the user's objects in a queryset into the order of the IDs
+    given, which must be each of them exactly once. The objects are returned
+    in their new order, numbered with their positions."""
+
+    with transaction.atomic():
+        objects = {str(obj.id): obj for obj in queryset.select_for_update()}
+        if len(ids) != len(objects) or set(ids) != set(objects):
+            raise GraphQLError(json.dumps({"ids": [
+                f"Must be each {name} exactly once"
+            ]}))
+        try:
+            objects = queryset.model.reorder([objects[id] for id in ids])
+        except IntegrityError:
+            raise GraphQLError(json.dumps({name: ["Changed while being reordered"]}))
+    for position, obj in enumerate(objects, start=1): obj.position = position
+    return objects
+
+
+def get_updated_object(info, model, name, user, id, values):
+    """Returns an object which has just been updated with the given values, as
+    the field of the given name in a mutation's result. If the selection only
+    uses those values it is made without a query, with any other fields left
+    deferred - otherwise just what the selection uses is fetched. Either way
+    it replaces any older copy in the request's identity map."""
+
+    id = model._meta.pk.to_python(id)
+    plan = plan_for(info, model, parent="user", path=(name,))
+    if plan.columns <= {*values, "id", "user"} and not plan.joins and not plan.prefetches:
+        values = {**values, "id": id, "user_id": user.id}
+        names = [f.attname for f in model._meta.concrete_fields if f.attname in values]
+        obj = model.from_db(None, names, [values[name] for name in names])
+    else:
+        obj = plan.apply(model.objects.filter(id=id)).get()
+    return identity_map(info.context).add(obj, replace=True)
+
+
+def get_bulk_forms(items, user, instances=None):
+    """Validates the items given to a bulk project mutation, with the user's
+    categories fetched once for all of them if any are needed. If any item is
+    invalid, its errors are raised keyed by its position."""
+
+    categories = {}
+    if any(item.get("category") is not None for item in items):
+        categories = {category.id: category for category in user.project_categories.all()}
+    forms = [BulkProjectForm(
+        item, user, categories, instance=instances[index] if instances else None
+    ) for index, item in enumerate(items)]
+    errors = {index: form.errors for index, form in enumerate(forms) if not form.is_valid()}
+    if errors: raise GraphQLError(json.dumps(errors))
+    return forms
+
 
 class SignupMutation(graphene.Mutation):
 
@@ -17,11 +126,9 @@ class SignupMutation(graphene.Mutation):
     def mutate(self, info, **kwargs):
         form = SignupForm(kwargs)
         if form.is_valid():
-            form.instance.last_login = time.time()
+            form.instance.last_login = int(time.time())
             form.save()
             info.context.refresh_token = form.instance.make_refresh_jwt()
-            Slot.objects.create(name="Work", user=form.instance)
-            Slot.objects.create(name="Personal", user=form.instance)
             return SignupMutation(
                 access_token=form.instance.make_access_jwt(),
                 user=form.instance
@@ -42,10 +149,12 @@ class LoginMutation(graphene.Mutation):
     def mutate(self, info, **kwargs):
         user = User.objects.filter(email=kwargs["email"]).first()
         if user:
-            if check_password(kwargs["password"], user.password):
+            password = user.password
+            if user.check_password(kwargs["password"]):
                 info.context.refresh_token = user.make_refresh_jwt()
-                user.last_login = time.time()
-                user.save()
+                if user.password != password: user.save(update_fields=["password"])
+                user.last_login = int(time.time())
+                last_logins.record(user.id, user.last_login)
                 return LoginMutation(access_token=user.make_access_jwt(), user=user)
         raise GraphQLError(json.dumps({"email": "Invalid credentials"}))
 
@@ -63,14 +172,14 @@ class LogoutMutation(graphene.Mutation):
 
 class UpdateUserMutation(graphene.Mutation):
 
-    Arguments = create_mutation_arguments(UpdateUserForm)
+    Arguments = create_mutation_arguments(UpdateUserForm, partial=True)
     
     user = graphene.Field("core.queries.UserType")
 
     def mutate(self, info, **kwargs):
         if not info.context.user:
             raise GraphQLError(json.dumps({"error": "Not authorized"}))
-        form = UpdateUserForm(kwargs, instance=info.context.user)
+        form = UpdateUserForm(kwargs, instance=current_user(info))
         if form.is_valid():
             form.save()
             return UpdateUserMutation(user=form.instance)
@@ -104,7 +213,7 @@ class UpdateProjectSettingsMutation(graphene.Mutation):
     def mutate(self, info, **kwargs):
         if not info.context.user:
             raise GraphQLError(json.dumps({"error": "Not authorized"}))
-        form = ProjectSettingsForm(kwargs, instance=info.context.user)
+        form = ProjectSettingsForm(kwargs, instance=current_user(info))
         if form.is_valid():
             form.save()
             return UpdateProjectSettingsMutation(user=form.instance)
@@ -145,22 +254,21 @@ class CreateSlotMutation(graphene.Mutation):
 
 class UpdateSlotMutation(graphene.Mutation):
 
-    Arguments = create_mutation_arguments(SlotForm, edit=True)
+    Arguments = create_mutation_arguments(SlotForm, edit=True, partial=True)
     
     slot = graphene.Field("core.queries.SlotType")
 
     def mutate(self, info, **kwargs):
         if not info.context.user:
             raise GraphQLError(json.dumps({"error": "Not authorized"}))
-        kwargs["user"] = info.context.user.id
-        slot = info.context.user.slots.filter(id=kwargs["id"])
-        if not slot: raise GraphQLError('{"slot": ["Does not exist"]}')
-        slot = slot.first()
-        form = SlotForm(kwargs, instance=slot)
-        if form.is_valid():
-            form.save()
-            return UpdateSlotMutation(slot=form.instance)
-        raise GraphQLError(json.dumps(form.errors))
+        form = PartialSlotForm(kwargs)
+        if not form.is_valid(): raise GraphQLError(json.dumps(form.errors))
+        user = info.context.user
+        if not Slot.update_owned(user.id, kwargs["id"], **form.cleaned_data):
+            raise GraphQLError('{"slot": ["Does not exist"]}')
+        return UpdateSlotMutation(slot=get_updated_object(
+            info, Slot, "slot", user, kwargs["id"], form.cleaned_data
+        ))
 
 
 class MoveSlotMutation(graphene.Mutation):
@@ -175,15 +283,32 @@ class MoveSlotMutation(graphene.Mutation):
     def mutate(self, info, **kwargs):
         if not info.context.user:
             raise GraphQLError(json.dumps({"error": "Not authorized"}))
-        slot = info.context.user.slots.filter(id=kwargs["id"])
+        slot = info.context.user.slots.filter(id=kwargs["id"]).first()
         if not slot: raise GraphQLError('{"slot": ["Does not exist"]}')
-        slot = slot.first()
+        if kwargs["index"] < 0:
+            raise GraphQLError('{"index": ["Must not be negative"]}')
         slot.move_to(kwargs["index"])
-        return MoveSlotMutation(slot=slot, user=slot.user)
+        return MoveSlotMutation(slot=slot, user=current_user(info))
         raise GraphQLError(json.dumps(form.errors))
 
 
 
+class ReorderSlotsMutation(graphene.Mutation):
+
+    class Arguments:
+        ids = graphene.List(graphene.NonNull(graphene.ID), required=True)
+    
+    slots = graphene.List("core.queries.SlotType")
+
+    def mutate(self, info, **kwargs):
+        if not info.context.user:
+            raise GraphQLError(json.dumps({"error": "Not authorized"}))
+        return ReorderSlotsMutation(slots=reorder_objects(
+            info.context.user.slots, kwargs["ids"], "slot"
+        ))
+
+
+
 class DeleteSlotMutation(graphene.Mutation):
 
     class Arguments:
@@ -194,15 +319,54 @@ class DeleteSlotMutation(graphene.Mutation):
     def mutate(self, info, **kwargs):
         if not info.context.user:
             raise GraphQLError('{"user": "Not authorized"}')
-        slot = info.context.user.slots.filter(id=kwargs["id"])
-        if not slot: raise GraphQLError('{"slot": ["Does not exist"]}')
-        if slot.first().user.slots.count() == 1:
-            raise GraphQLError('{"slot": ["You must have at least one slot"]}')
-        slot = slot.first().delete()
+        user = info.context.user
+        with transaction.atomic():
+            ids = [str(id) for id in user_slot_ids(user)]
+            if kwargs["id"] not in ids:
+                raise GraphQLError('{"slot": ["Does not exist"]}')
+            if len(ids) == 1:
+                raise GraphQLError('{"slot": ["You must have at least one slot"]}')
+            Slot.delete_owned(user.id, kwargs["id"])
         return DeleteSlotMutation(success=True)
 
 
 
+class DeleteSlotsMutation(graphene.Mutation):
+
+    class Arguments:
+        ids = graphene.List(graphene.NonNull(graphene.ID), required=True)
+    
+    success = graphene.Boolean()
+
+    def mutate(self, info, **kwargs):
+        if not info.context.user:
+            raise GraphQLError('{"user": "Not authorized"}')
+        with transaction.atomic():
+            ids = user_slot_ids(info.context.user)
+            slots = get_bulk_objects(info.context.user.slots, kwargs["ids"], "slot")
+            if len(ids) <= len(slots):
+                raise GraphQLError('{"slot": ["You must have at least one slot"]}')
+            Slot.delete_many(slots)
+        return DeleteSlotsMutation(success=True)
+
+
+
+class ReorderProjectCategoriesMutation(graphene.Mutation):
+
+    class Arguments:
+        ids = graphene.List(graphene.NonNull(graphene.ID), required=True)
+    
+    project_categories = graphene.List("core.queries.ProjectCategoryType")
+
+    def mutate(self, info, **kwargs):
+        if not info.context.user:
+            raise GraphQLError(json.dumps({"error": "Not authorized"}))
+        return ReorderProjectCategoriesMutation(project_categories=reorder_objects(
+            info.context.user.project_categories, kwargs["ids"], "category"
+        ))
+
+
+
 class CreateProjectMutation(graphene.Mutation):
 
     Arguments = create_mutation_arguments(ProjectForm)
@@ -223,22 +387,21 @@ class CreateProjectMutation(graphene.Mutation):
 
 class UpdateProjectMutation(graphene.Mutation):
 
-    Arguments = create_mutation_arguments(ProjectForm, edit=True)
+    Arguments = create_mutation_arguments(ProjectForm, edit=True, partial=True)
     
     project = graphene.Field("core.queries.ProjectType")
 
     def mutate(self, info, **kwargs):
         if not info.context.user:
             raise GraphQLError(json.dumps({"error": "Not authorized"}))
-        kwargs["user"] = info.context.user.id
-        project = info.context.user.projects.filter(id=kwargs["id"])
-        if not project: raise GraphQLError('{"project": ["Does not exist"]}')
-        project = project.first()
-        form = ProjectForm(kwargs, instance=project)
-        if form.is_valid():
-            form.save()
-            return UpdateProjectMutation(project=form.instance)
-        raise GraphQLError(json.dumps(form.errors))
+        form = PartialProjectForm(kwargs)
+        if not form.is_valid(): raise GraphQLError(json.dumps(form.errors))
+        user = info.context.user
+        if not Project.update_owned(user.id, kwargs["id"], **form.cleaned_data):
+            raise GraphQLError('{"project": ["Does not exist"]}')
+        return UpdateProjectMutation(project=get_updated_object(
+            info, Project, "project", user, kwargs["id"], form.cleaned_data
+        ))
 
 
 
@@ -252,7 +415,62 @@ class DeleteProjectMutation(graphene.Mutation):
     def mutate(self, info, **kwargs):
         if not info.context.user:
             raise GraphQLError('{"user": "Not authorized"}')
-        project = info.context.user.projects.filter(id=kwargs["id"])
-        if not project: raise GraphQLError('{"project": ["Does not exist"]}')
-        project = project.first().delete()
-        return DeleteProjectMutation(success=True)
\ No newline at end of file
+        if not Project.delete_owned(info.context.user.id, kwargs["id"]):
+            raise GraphQLError('{"project": ["Does not exist"]}')
+        return DeleteProjectMutation(success=True)
+
+
+
+class CreateProjectsMutation(graphene.Mutation):
+
+    class Arguments:
+        projects = graphene.List(graphene.NonNull(ProjectInput), required=True)
+    
+    projects = graphene.List("core.queries.ProjectType")
+
+    def mutate(self, info, **kwargs):
+        if not info.context.user:
+            raise GraphQLError(json.dumps({"error": "Not authorized"}))
+        check_bulk_size(kwargs["projects"])
+        forms = get_bulk_forms(kwargs["projects"], info.context.user)
+        with transaction.atomic():
+            projects = Project.create_many([form.instance for form in forms])
+        return CreateProjectsMutation(projects=projects)
+
+
+
+class UpdateProjectsMutation(graphene.Mutation):
+
+    class Arguments:
+        projects = graphene.List(graphene.NonNull(ProjectUpdateInput), required=True)
+    
+    projects = graphene.List("core.queries.ProjectType")
+
+    def mutate(self, info, **kwargs):
+        if not info.context.user:
+            raise GraphQLError(json.dumps({"error": "Not authorized"}))
+        projects = get_bulk_objects(info.context.user.projects, [
+            project["id"] for project in kwargs["projects"]
+        ], "project")
+        get_bulk_forms(kwargs["projects"], info.context.user, projects)
+        fields = [name for name in BulkProjectForm.base_fields if name != "category"
+            or any("category" in project for project in kwargs["projects"])]
+        with transaction.atomic():
+            Project.update_many(projects, fields)
+        return UpdateProjectsMutation(projects=projects)
+
+
+
+class DeleteProjectsMutation(graphene.Mutation):
+
+    class Arguments:
+        ids = graphene.List(graphene.NonNull(graphene.ID), required=True)
+    
+    success = graphene.Boolean()
+
+    def mutate(self, info, **kwargs):
+        if not info.context.user:
+            raise GraphQLError('{"user": "Not authorized"}')
+        projects = get_bulk_objects(info.context.user.projects, kwargs["ids"], "project")
+        Project.delete_many(projects)
+        return DeleteProjectsMutation(success=True)
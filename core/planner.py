@@ -0,0 +1,143 @@
+from django.db.models import Prefetch
+from django.core.exceptions import FieldDoesNotExist
+from graphene.utils.str_converters import to_snake_case
+from graphql.language.ast import Field, FragmentSpread, InlineFragment
+
+def selected_fields(selection_sets, fragments):
+    """Takes a list of GraphQL selection sets and returns the fields they
+    select, following fragments, as a dictionary mapping snake case field names
+    to the selection sets of those fields."""
+
+    fields = {}
+    for selection_set in selection_sets:
+        if not selection_set: continue
+        for selection in selection_set.selections:
+            if isinstance(selection, Field):
+                fields.setdefault(to_snake_case(selection.name.value), []).append(
+                    selection.selection_set
+                )
+            else:
+                if isinstance(selection, FragmentSpread):
+                    selection = fragments[selection.name.value]
+                for name, sets in selected_fields(
+                    [selection.selection_set], fragments
+                ).items():
+                    fields.setdefault(name, []).extend(sets)
+    return fields
+
+
+
+class QueryPlan:
+    """Works out which columns and relations of a model a GraphQL selection
+    actually uses, so that a queryset can fetch those and nothing else.
+
+    Selected concrete fields become only() columns, selected foreign keys are
+    joined with select_related() and selected reverse relations are fetched
+    with a Prefetch. The foreign key back to the parent object - the user when
+    planning a user's projects, say - is always fetched but never joined, as
+    the parent is already loaded. Any other columns the resolver needs can be
+    given as required, and a model can name the columns behind GraphQL fields
+    which aren't model fields in its FIELD_COLUMNS."""
+
+    def __init__(self, model, selection_sets, fragments, parent=None, required=()):
+        self.model = model
+        self.columns = {model._meta.pk.name, *required}
+        self.joins, self.prefetches = {}, {}
+        if parent: self.columns.add(parent)
+        for name, sets in selected_fields(selection_sets, fragments).items():
+            name = getattr(model, "FIELD_COLUMNS", {}).get(name, name)
+            try:
+                field = model._meta.get_field(name)
+            except FieldDoesNotExist: continue
+            if field.many_to_one or (field.one_to_one and field.concrete):
+                self.columns.add(name)
+                if name != parent:
+                    self.joins[name] = QueryPlan(field.related_model, sets, fragments)
+            elif field.one_to_many:
+                self.prefetches[name] = QueryPlan(
+                    field.related_model, sets, fragments, parent=field.field.name
+                )
+            elif field.concrete and not field.is_relation:
+                self.columns.add(name)
+
+
+    @property
+    def key(self):
+        """A hashable summary of the plan - two plans with the same key will
+        produce the same queries."""
+
+        return (
+            tuple(sorted(self.columns)),
+            tuple((name, plan.key) for name, plan in sorted(self.joins.items())),
+            tuple((name, plan.key) for name, plan in sorted(self.prefetches.items())),
+        )
+
+
+    def only_fields(self, prefix=""):
+        """Returns the arguments to only() for this plan and its joins."""
+
+        fields = [prefix + column for column in sorted(self.columns)]
+        for name, plan in sorted(self.joins.items()):
+            fields += plan.only_fields(f"{prefix}{name}__")
+        return fields
+
+
+    def related_fields(self, prefix=""):
+        """Returns the arguments to select_related() for this plan's joins."""
+
+        fields = []
+        for name, plan in sorted(self.joins.items()):
+            fields += [prefix + name] + plan.related_fields(f"{prefix}{name}__")
+        return fields
+
+
+    def prefetch_objects(self, prefix=""):
+        """Returns Prefetch objects for this plan's reverse relations, including
+        those reached through its joins."""
+
+        prefetches = [Prefetch(
+            prefix + name, queryset=plan.apply(plan.model.objects.all())
+        ) for name, plan in sorted(self.prefetches.items())]
+        for name, plan in sorted(self.joins.items()):
+            prefetches += plan.prefetch_objects(f"{prefix}{name}__")
+        return prefetches
+
+
+    def apply(self, queryset):
+        """Restricts a queryset of the plan's model to the plan."""
+
+        if self.joins: queryset = queryset.select_related(*self.related_fields())
+        if self.prefetches or self.joins:
+            prefetches = self.prefetch_objects()
+            if prefetches: queryset = queryset.prefetch_related(*prefetches)
+        return queryset.only(*self.only_fields())
+
+
+
+def plan_for(info, model, parent=None, path=(), required=()):
+    """Creates a query plan for the objects of a model being resolved by the
+    field currently executing. If the objects are nested further down in the
+    field's selection - in a connection's edges, say - the path of field names
+    leading to them can be given."""
+
+    selection_sets = [field.selection_set for field in info.field_asts]
+    for name in path:
+        selection_sets = selected_fields(selection_sets, info.fragments).get(name, [])
+    return QueryPlan(
+        model, selection_sets, info.fragments, parent=parent, required=required
+    )
+
+
+def joined(obj, name):
+    """Returns True if the object's foreign key of the given name has already
+    been loaded, by select_related() for example."""
+
+    return obj._meta.get_field(name).is_cached(obj)
+
+
+def prefetched(obj, name):
+    """Returns the objects prefetched for the object's reverse relation of the
+    given name, or None if it wasn't prefetched."""
+
+    cache = getattr(obj, "_prefetched_objects_cache", {})
+    return list(cache[name]) if name in cache else None
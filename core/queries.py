@@ -1,7 +1,92 @@
+import json
+import time
+import base64
 import graphene
 from graphene_django.types import DjangoObjectType
+from django.conf import settings
+from django.db.models import F, Count, Window, Exists, OuterRef
+from django.db.models.functions import RowNumber
 from graphql import GraphQLError
+from graphql.language import ast
 from .models import *
+from .loaders import *
+from .planner import plan_for, joined, prefetched
+
+def make_cursor(project):
+    """Creates an opaque pagination cursor from a project's position in the
+    (creation_time, id) ordering."""
+
+    return base64.b64encode(f"{project.creation_time}:{project.id}".encode()).decode()
+
+
+def read_cursor(cursor):
+    """Gets the (creation_time, id) position back out of a cursor."""
+
+    try:
+        creation_time, id = base64.b64decode(cursor).decode().split(":")
+        return int(creation_time), int(id)
+    except: raise GraphQLError('{"after": "Invalid cursor"}')
+
+
+def number(objects):
+    """Records the position of each object in a complete, ordered list of a
+    user's slots or project categories, counting from 1."""
+
+    for position, obj in enumerate(objects, start=1):
+        obj.position = position
+    return objects
+
+
+def resolve_position(obj, info, loader_class):
+    """Gets an ordered object's position in its user's list, counting from 1.
+    Positions are what the API calls order - the order column itself is a
+    sparse key, given to clients as sortKey so that those keeping their own
+    copy of the list can keep it in order without re-reading it all."""
+
+    if getattr(obj, "position", None) is not None: return obj.position
+    return get_loader(info, loader_class).load(obj.user_id).then(
+        lambda positions: positions.get(obj.id)
+    )
+
+
+
+class BigInt(graphene.Scalar):
+    """An integer which, unlike Int, isn't limited to 32 bits."""
+
+    serialize = int
+    parse_value = int
+
+    @staticmethod
+    def parse_literal(node):
+        if isinstance(node, ast.IntValue): return int(node.value)
+
+
+
+def project_filters(user, status_in=None, category=None, exclude_done=None, **kwargs):
+    """Turns the arguments of a projects field into filter arguments for a
+    projects queryset. Done projects are excluded if asked for, or if the user
+    has chosen to hide them and nothing else was asked for."""
+
+    filters = {}
+    statuses = None if status_in is None else set(status_in)
+    if exclude_done is None: exclude_done = not user.show_done_projects
+    if exclude_done:
+        if statuses is None: statuses = {status for status, _ in Project.STATUSES}
+        statuses -= set(Project.DONE_STATUSES)
+    if statuses is not None: filters["status__in"] = tuple(sorted(statuses))
+    if category is not None: filters["category_id"] = int(category)
+    return filters
+
+
+def project_ordering(order_by=None, **kwargs):
+    """Gets the ordering for a projects queryset from a field's order_by
+    argument, or None for the default ordering."""
+
+    if order_by is None: return None
+    if order_by in Project.ORDERINGS: return Project.ORDERINGS[order_by]
+    raise GraphQLError(json.dumps({"orderBy": f"Must be one of {', '.join(Project.ORDERINGS)}"}))
+
+
 
 class UserType(DjangoObjectType):
     
@@ -12,21 +97,166 @@ class UserType(DjangoObjectType):
     id = graphene.ID()
     slots = graphene.List("core.queries.SlotType")
     project = graphene.Field("core.queries.ProjectType", id=graphene.ID(required=True))
-    projects = graphene.List("core.queries.ProjectType")
+    projects = graphene.List(
+        "core.queries.ProjectType", status_in=graphene.List(graphene.Int),
+        category=graphene.ID(), exclude_done=graphene.Boolean(),
+        order_by=graphene.String()
+    )
+    projects_connection = graphene.Field(
+        "core.queries.ProjectConnection", first=graphene.Int(), after=graphene.String()
+    )
+    project_groups = graphene.List(
+        "core.queries.ProjectGroupType", first=graphene.Int(),
+        status_in=graphene.List(graphene.Int), category=graphene.ID(),
+        exclude_done=graphene.Boolean()
+    )
+    project_categories = graphene.List("core.queries.ProjectCategoryType")
+    changes = graphene.Field("core.queries.ChangesType", since=graphene.Int(required=True))
     default_project_grouping = graphene.String()
 
     def resolve_slots(self, info, **kwargs):
-        return self.slots.all()
+        plan = plan_for(info, Slot, parent="user")
+        return get_loader(info, SlotsByUserLoader, plan).load(self.id).then(number)
 
     
     def resolve_project(self, info, **kwargs):
-        project = self.projects.filter(id=int(kwargs["id"])).first()
-        if project: return project
-        raise GraphQLError('{"project": "Does not exist"}')
+        def check_owner(project):
+            if project and project.user_id == self.id: return project
+            raise GraphQLError('{"project": "Does not exist"}')
+
+        plan = plan_for(info, Project, parent="user")
+        return get_loader(info, ProjectLoader, plan).load(
+            int(kwargs["id"])
+        ).then(check_owner)
 
 
     def resolve_projects(self, info, **kwargs):
-        return self.projects.all()
+        plan = plan_for(info, Project, parent="user")
+        return get_loader(
+            info, ProjectsByUserLoader, plan,
+            project_filters(self, **kwargs), project_ordering(**kwargs)
+        ).load(self.id)
+
+
+    def resolve_projects_connection(self, info, **kwargs):
+        """Pages through the user's projects in creation order. Rather than
+        using an offset, each page starts from the position in the cursor it
+        is given, which the (user, creation_time, id) index can seek to
+        directly - so later pages cost no more than the first."""
+
+        first = min(kwargs.get("first") or 20, 100)
+        projects = self.projects.order_by("creation_time", "id")
+        if kwargs.get("after"):
+            creation_time, id = read_cursor(kwargs["after"])
+            projects = projects.filter(creation_time__gte=creation_time).exclude(
+                creation_time=creation_time, id__lte=id
+            )
+        plan = plan_for(
+            info, Project, parent="user", path=("edges", "node"),
+            required=["creation_time"]
+        )
+        projects = list(plan.apply(projects)[:first + 1])
+        edges = [ProjectConnection.Edge(
+            node=project, cursor=make_cursor(project)
+        ) for project in projects[:first]]
+        return ProjectConnection(edges=edges, page_info=graphene.relay.PageInfo(
+            has_next_page=len(projects) > first,
+            has_previous_page=bool(kwargs.get("after")),
+            start_cursor=edges[0].cursor if edges else None,
+            end_cursor=edges[-1].cursor if edges else None
+        ))
+
+
+    def resolve_project_groups(self, info, **kwargs):
+        """Groups the user's projects by status, returning the size of each
+        group and its first few projects. Projects are numbered and counted
+        within their status by window functions, and the numbering is then
+        used to cut each group down to size, so the whole thing is one
+        query. The numbering follows the (user, status, creation_time, id)
+        index, so the projects table itself is never sorted."""
+
+        first = min(kwargs.get("first") or 10, 100)
+        filters = project_filters(self, **kwargs)
+        plan = plan_for(info, Project, parent="user", path=("projects",))
+        projects = self.projects.filter(**filters).only(
+            *plan.columns, "status", "creation_time"
+        ).order_by().annotate(position=Window(
+            RowNumber(), partition_by=[F("status")],
+            order_by=[F("creation_time").asc(), F("id").asc()]
+        ), group_count=Window(Count("id"), partition_by=[F("status")]))
+        sql, params = projects.query.sql_with_params()
+        groups = {status: ProjectGroupType(
+            status=status, name=name, count=0, projects=[]
+        ) for status, name in Project.STATUSES if status in filters.get(
+            "status__in", [status]
+        )}
+        for project in Project.objects.raw(
+            f"SELECT * FROM ({sql}) ranked WHERE position <= %s", [*params, first]
+        ):
+            groups[project.status].count = project.group_count
+            groups[project.status].projects.append(project)
+        for group in groups.values():
+            group.projects.sort(key=lambda project: project.position)
+        return list(groups.values())
+
+
+    def resolve_project_categories(self, info, **kwargs):
+        plan = plan_for(info, ProjectCategory, parent="user")
+        return get_loader(
+            info, ProjectCategoriesByUserLoader, plan
+        ).load(self.id).then(number)
+    
+
+    def resolve_changes(self, info, since, **kwargs):
+        """Gets everything in the user's data that has changed at or after the
+        watermark given, along with a new watermark to ask from next time.
+
+        A change is stamped when it is made but only seen once its transaction
+        commits, so a change stamped just before a poll could commit after it.
+        Watermarks are therefore CHANGES_WATERMARK_MARGIN seconds behind the
+        time of the poll - the changes in that margin are sent again next time,
+        and any transaction taking longer than the margin could still be
+        missed. Tombstones are only kept for TOMBSTONE_RETENTION seconds, so a
+        watermark older than that is refused and the client must start again
+        from zero.
+
+        Whether each table has any changes is first found with one query, each
+        part of which is a single probe of a (user, updated_at) index, and only
+        the tables with changes are then read - so a poll finding nothing costs
+        one query. Changes come in the order they were made, which is the
+        order of the same indexes."""
+
+        now = int(time.time())
+        if since and since < now - settings.TOMBSTONE_RETENTION:
+            raise GraphQLError('{"since": ["Too old, ask for every change from 0"]}')
+        watermark = now - settings.CHANGES_WATERMARK_MARGIN
+        tables = {
+            "slots": Slot.objects.filter(updated_at__gte=since),
+            "projects": Project.objects.filter(updated_at__gte=since),
+            "project_categories": ProjectCategory.objects.filter(updated_at__gte=since),
+            "deletions": Tombstone.objects.filter(deleted_at__gte=since),
+        }
+        changed = User.objects.filter(id=self.id).values(**{
+            f"{name}_changed": Exists(queryset.filter(user=OuterRef("id")))
+            for name, queryset in tables.items()
+        }).get()
+        changes = ChangesType(
+            watermark=watermark, slots=[], projects=[],
+            project_categories=[], deletions=[]
+        )
+        for name, queryset in tables.items():
+            if not changed[f"{name}_changed"]: continue
+            queryset = queryset.filter(user=self).order_by(
+                "deleted_at" if name == "deletions" else "updated_at", "id"
+            )
+            if name == "deletions":
+                changes.deletions = [DeletionType(
+                    model=tombstone.model, id=tombstone.object_id
+                ) for tombstone in queryset]
+            else:
+                plan = plan_for(info, queryset.model, parent="user", path=(name,))
+                setattr(changes, name, list(plan.apply(queryset)))
+        return changes
 
 
 
@@ -36,6 +266,19 @@ class SlotType(DjangoObjectType):
         model = Slot
     
     id = graphene.ID()
+    order = graphene.Int()
+    sort_key = BigInt()
+
+    def resolve_order(self, info, **kwargs):
+        return resolve_position(self, info, SlotPositionsLoader)
+
+
+    def resolve_sort_key(self, info, **kwargs):
+        return self.order
+
+
+    def resolve_user(self, info, **kwargs):
+        return get_loader(info, UserLoader).load(self.user_id)
 
 
 
@@ -45,4 +288,76 @@ class ProjectType(DjangoObjectType):
         model = Project
     
     id = graphene.ID()
-    status = graphene.Int()
\ No newline at end of file
+    status = graphene.Int()
+
+    def resolve_category(self, info, **kwargs):
+        if self.category_id is None: return None
+        if joined(self, "category"): return self.category
+        return get_loader(info, ProjectCategoryLoader).load(self.category_id)
+
+
+    def resolve_user(self, info, **kwargs):
+        return get_loader(info, UserLoader).load(self.user_id)
+
+
+
+class ProjectConnection(graphene.relay.Connection):
+
+    class Meta:
+        node = ProjectType
+
+
+
+class ProjectGroupType(graphene.ObjectType):
+
+    status = graphene.Int()
+    name = graphene.String()
+    count = graphene.Int()
+    projects = graphene.List("core.queries.ProjectType")
+
+
+
+class DeletionType(graphene.ObjectType):
+
+    model = graphene.String()
+    id = graphene.ID()
+
+
+
+class ChangesType(graphene.ObjectType):
+
+    watermark = graphene.Int()
+    slots = graphene.List("core.queries.SlotType")
+    projects = graphene.List("core.queries.ProjectType")
+    project_categories = graphene.List("core.queries.ProjectCategoryType")
+    deletions = graphene.List("core.queries.DeletionType")
+
+
+
+class ProjectCategoryType(DjangoObjectType):
+    
+    class Meta:
+        model = ProjectCategory
+    
+    id = graphene.ID()
+    order = graphene.Int()
+    sort_key = BigInt()
+    projects = graphene.List("core.queries.ProjectType")
+
+    def resolve_order(self, info, **kwargs):
+        return resolve_position(self, info, ProjectCategoryPositionsLoader)
+
+
+    def resolve_sort_key(self, info, **kwargs):
+        return self.order
+
+
+    def resolve_projects(self, info, **kwargs):
+        projects = prefetched(self, "projects")
+        if projects is not None: return projects
+        plan = plan_for(info, Project, parent="category")
+        return get_loader(info, ProjectsByCategoryLoader, plan).load(self.id)
+
+
+    def resolve_user(self, info, **kwargs):
+        return get_loader(info, UserLoader).load(self.user_id)
@@ -0,0 +1,69 @@
+import json
+from uuid import uuid4
+from hashlib import sha256
+from promise import is_thenable
+from django.core.cache import cache
+from core.middleware import looked_up_user
+
+def user_version(user_id):
+    """Returns the current version of a user's data - an opaque string which
+    changes whenever any of it might have. A user with no version yet, or whose
+    version has been evicted, is given a new one, so an eviction can never
+    bring back responses cached against an old version."""
+
+    return cache.get_or_set(f"graphql-version:{user_id}", lambda: uuid4().hex, None)
+
+
+def bump_user_version(user_id):
+    """Gives a user a new version, so that every response cached for them is
+    no longer used."""
+
+    cache.set(f"graphql-version:{user_id}", uuid4().hex, None)
+
+
+def response_cache_key(user_id, query, variables, operation_name):
+    """Returns the key a user's response to an operation is cached under,
+    which includes the user's current version."""
+
+    operation = sha256(json.dumps(
+        [query, variables, operation_name], sort_keys=True
+    ).encode()).hexdigest()
+    return f"graphql-response:{user_id}:{user_version(user_id)}:{operation}"
+
+
+def response_etag(content):
+    """Returns a strong ETag for the body of a response."""
+
+    return '"%s"' % sha256(content).hexdigest()
+
+
+
+class MutationVersionMiddleware:
+    """Graphene middleware which bumps the version of the user a mutation acts
+    on - the requesting user, or the user a login or signup returns - once the
+    mutation has run, whether or not it succeeded.
+
+    Any mutation which changes the requesting user's data has to look them up
+    first, so the requesting user is only bumped if the mutation did so, and
+    mutations such as login and logout which never need them don't cause a
+    lookup just for this."""
+
+    def resolve(self, next, root, info, **kwargs):
+        if info.operation.operation != "mutation" or len(info.path) != 1:
+            return next(root, info, **kwargs)
+        try:
+            result = next(root, info, **kwargs)
+        except Exception:
+            self.bump(info, None)
+            raise
+        if is_thenable(result):
+            return result.then(lambda value: self.bump(info, value))
+        return self.bump(info, result)
+
+
+    def bump(self, info, result):
+        user_ids = set()
+        for user in [looked_up_user(info.context), getattr(result, "user", None)]:
+            if user and user.id: user_ids.add(user.id)
+        for user_id in user_ids: bump_user_version(user_id)
+        return result
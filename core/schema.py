@@ -21,7 +21,7 @@ class Query(graphene.ObjectType):
     def resolve_user(self, info, **kwargs):
         user = info.context.user
         if not user: raise GraphQLError('{"user": "Not authorized"}')
-        return info.context.user
+        return current_user(info)
 
 
 
@@ -38,10 +38,17 @@ class Mutation(graphene.ObjectType):
     create_slot = CreateSlotMutation.Field()
     update_slot = UpdateSlotMutation.Field()
     move_slot = MoveSlotMutation.Field()
+    reorder_slots = ReorderSlotsMutation.Field()
     delete_slot = DeleteSlotMutation.Field()
+    delete_slots = DeleteSlotsMutation.Field()
 
     create_project = CreateProjectMutation.Field()
     update_project = UpdateProjectMutation.Field()
     delete_project = DeleteProjectMutation.Field()
+    create_projects = CreateProjectsMutation.Field()
+    update_projects = UpdateProjectsMutation.Field()
+    delete_projects = DeleteProjectsMutation.Field()
+
+    reorder_project_categories = ReorderProjectCategoriesMutation.Field()
 
 schema = graphene.Schema(query=Query, mutation=Mutation)
\ No newline at end of file
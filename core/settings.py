@@ -1,4 +1,5 @@
 import os
+import tempfile
 from .secrets import SECRET_KEY, BASE_DIR, DATABASES
 
 ALLOWED_HOSTS = []
@@ -29,11 +30,79 @@ AUTH_PASSWORD_VALIDATORS = [{
     "NAME": "django.contrib.auth.password_validation.NumericPasswordValidator",
 }]
 
+PASSWORD_HASHER = os.environ.get("PASSWORD_HASHER", "core.hashing.PBKDF2PasswordHasher")
+
+PASSWORD_HASHERS = [PASSWORD_HASHER] + [hasher for hasher in [
+    "core.hashing.PBKDF2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "django.contrib.auth.hashers.Argon2PasswordHasher",
+    "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+] if hasher != PASSWORD_HASHER]
+
+PASSWORD_ITERATIONS = int(os.environ.get("PASSWORD_ITERATIONS", 150000))
+
+PASSWORD_HASHING_WORKERS = int(os.environ.get("PASSWORD_HASHING_WORKERS", 4))
+
+PASSWORD_HASHING_QUEUE = int(os.environ.get("PASSWORD_HASHING_QUEUE", 32))
+
+PASSWORD_HASHING_TIMEOUT = 5
+
 STATIC_URL = "/static/"
 
 CORS_ORIGIN_ALLOW_ALL = True
 CORS_ALLOW_CREDENTIALS = True
 
-ID_DIGITS_LENGTH = 18
+ID_NODES = range(
+    int(os.environ.get("ID_NODE_FIRST", 0)), int(os.environ.get("ID_NODE_LAST", 99)) + 1
+)
+
+ID_NODE_LOCK_DIR = os.environ.get("ID_NODE_LOCK_DIR", tempfile.gettempdir())
+
+TOKEN_CACHE_SIZE = 10000
+
+DOCUMENT_CACHE_SIZE = 100
+
+GRAPHQL_MAX_PARALLELISM = int(os.environ.get("GRAPHQL_MAX_PARALLELISM", 0))
+
+# Each of the parallel executor's threads holds its own database connection,
+# which without persistent connections would be opened afresh for every root
+# field - so they are kept for ten minutes unless a database says otherwise
+if GRAPHQL_MAX_PARALLELISM:
+    for database in DATABASES.values(): database.setdefault("CONN_MAX_AGE", 600)
+
+CACHES = {"default": {
+    "BACKEND": os.environ.get(
+        "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+    ),
+    "LOCATION": os.environ.get("CACHE_LOCATION", ""),
+}}
+
+# Each process has its own LocMemCache, so a mutation would only invalidate
+# the responses cached by the process that ran it - responses are only cached
+# when a cache shared between processes has been configured
+RESPONSE_CACHE_TIMEOUT = 0 if CACHES["default"]["BACKEND"] in [
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+] else 300
+
+BULK_MUTATION_LIMIT = 500
+
+# Changes are stamped with their time before their transaction commits, so a
+# watermark is set this many seconds in the past to cover any transaction
+# still open when it was given out
+CHANGES_WATERMARK_MARGIN = 60
+
+TOMBSTONE_RETENTION = 30 * 24 * 60 * 60
+
+LAST_LOGIN_FLUSH_INTERVAL = int(os.environ.get("LAST_LOGIN_FLUSH_INTERVAL", 30))
+
+EVENT_BROKER = os.environ.get("EVENT_BROKER", "core.events.InProcessBroker")
+
+EVENT_BROKER_OPTIONS = {}
+
+EVENT_STREAM_HEARTBEAT = 15
 
-GRAPHENE = {"SCHEMA": "core.schema.schema"}
+GRAPHENE = {
+    "SCHEMA": "core.schema.schema",
+    "MIDDLEWARE": ["core.responses.MutationVersionMiddleware"],
+}
@@ -0,0 +1,199 @@
+import json
+from asgiref.sync import async_to_sync, sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from django.test import TransactionTestCase
+from django.test.utils import override_settings
+from core.asgi import application, ASGIRequest
+from core.events import broker
+from core.logins import last_logins
+from core.models import User, Slot
+
+class ASGIRequestTests(TransactionTestCase):
+
+    def test_request_made_from_scope(self):
+        request = ASGIRequest({
+            "type": "http", "method": "post", "path": "/graphql",
+            "query_string": b"a=1", "scheme": "https",
+            "server": ("testserver", 443), "client": ("10.0.0.1", 5000),
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"authorization", b"Bearer 123"), (b"cookie", b"refresh_token=abc"),
+            ]
+        }, b'{"query": "{ user { name } }"}')
+        self.assertEqual(request.method, "POST")
+        self.assertEqual(request.GET["a"], "1")
+        self.assertTrue(request.is_secure())
+        self.assertEqual(request.get_host(), "testserver")
+        self.assertEqual(request.META["CONTENT_TYPE"], "application/json")
+        self.assertEqual(request.META["HTTP_AUTHORIZATION"], "Bearer 123")
+        self.assertEqual(request.META["REMOTE_ADDR"], "10.0.0.1")
+        self.assertEqual(request.COOKIES, {"refresh_token": "abc"})
+        self.assertEqual(json.loads(request.body), {"query": "{ user { name } }"})
+
+
+
+class ASGIApplicationTests(TransactionTestCase):
+
+    fixtures = ["users.json", "slots.json", "projects.json"]
+
+    def setUp(self):
+        self.user = User.objects.get(email="jack@gmail.com")
+        self.addCleanup(last_logins.clear)
+
+
+    def request(self, path, body=b"", headers=()):
+        async def run():
+            communicator = ApplicationCommunicator(application, {
+                "type": "http", "http_version": "1.1", "method": "POST", "path": path,
+                "query_string": b"",
+                "server": ("testserver", 80), "client": ("127.0.0.1", 5000),
+                "headers": [(b"content-type", b"application/json"), *headers]
+            })
+            await communicator.send_input({"type": "http.request", "body": body})
+            start = await communicator.receive_output(5)
+            body_message = await communicator.receive_output(5)
+            return start, body_message["body"]
+        return async_to_sync(run)()
+
+
+    def query(self, query, headers=()):
+        start, body = self.request(
+            "/graphql", json.dumps({"query": query}).encode(), headers
+        )
+        return start, json.loads(body)
+
+
+    def test_can_query_with_access_token(self):
+        start, result = self.query("{ user { name } }", [
+            (b"authorization", f"Bearer {self.user.make_access_jwt()}".encode())
+        ])
+        self.assertEqual(start["status"], 200)
+        self.assertEqual(result["data"]["user"]["name"], "Jack Shephard")
+
+
+    def test_query_without_token_not_authorized(self):
+        start, result = self.query("{ user { name } }")
+        self.assertIn("Not authorized", result["errors"][0]["message"])
+
+
+    def test_login_sets_refresh_cookie(self):
+        self.user.set_password("livetogetha")
+        start, result = self.query("""mutation { login(
+            email: "jack@gmail.com", password: "livetogetha"
+        ) { accessToken } }""")
+        self.assertTrue(result["data"]["login"]["accessToken"])
+        cookies = [value for name, value in start["headers"]
+            if name == b"Set-Cookie" and value.startswith(b"refresh_token=")]
+        self.assertEqual(len(cookies), 1)
+        self.assertIn(b"HttpOnly", cookies[0])
+
+
+    def request_in_chunks(self, chunks):
+        async def run():
+            communicator = ApplicationCommunicator(application, {
+                "type": "http", "http_version": "1.1", "method": "POST",
+                "path": "/graphql", "query_string": b"",
+                "server": ("testserver", 80), "client": ("127.0.0.1", 5000),
+                "headers": [(b"content-type", b"application/json")]
+            })
+            for index, chunk in enumerate(chunks):
+                await communicator.send_input({
+                    "type": "http.request", "body": chunk,
+                    "more_body": index < len(chunks) - 1
+                })
+            start = await communicator.receive_output(5)
+            body_message = await communicator.receive_output(5)
+            return start, json.loads(body_message["body"])
+        return async_to_sync(run)()
+
+
+    def test_body_received_in_chunks(self):
+        start, result = self.request_in_chunks(
+            [b'{"query": ', b'"{ user { name } }"', b"}"]
+        )
+        self.assertEqual(start["status"], 200)
+        self.assertIn("Not authorized", result["errors"][0]["message"])
+
+
+    @override_settings(DATA_UPLOAD_MAX_MEMORY_SIZE=20)
+    def test_body_over_limit_refused(self):
+        start, result = self.request_in_chunks(
+            [b'{"query": ', b'"{ user { name } }"', b"}"]
+        )
+        self.assertEqual(start["status"], 413)
+        self.assertEqual(result, {"error": "Request body too large"})
+
+
+    def test_other_paths_use_wsgi_application(self):
+        start, body = self.request("/other")
+        self.assertEqual(start["status"], 404)
+
+
+
+class ChangeStreamTests(TransactionTestCase):
+
+    fixtures = ["users.json", "slots.json", "projects.json"]
+
+    def setUp(self):
+        self.user = User.objects.get(email="jack@gmail.com")
+
+
+    def communicator(self, headers=()):
+        return ApplicationCommunicator(application, {
+            "type": "http", "http_version": "1.1", "method": "GET",
+            "path": "/events", "query_string": b"",
+            "server": ("testserver", 80), "client": ("127.0.0.1", 5000),
+            "headers": list(headers)
+        })
+
+
+    def test_changes_streamed(self):
+        def change():
+            slot = Slot.objects.get(id=1)
+            slot.name = "X"
+            slot.save()
+            Slot.objects.get(id=2).delete()
+
+        async def run():
+            communicator = self.communicator([(
+                b"authorization", f"Bearer {self.user.make_access_jwt()}".encode()
+            )])
+            await communicator.send_input({"type": "http.request", "body": b""})
+            start = await communicator.receive_output(5)
+            heartbeat = await communicator.receive_output(5)
+            await sync_to_async(change)()
+            chunks = [await communicator.receive_output(5) for _ in range(2)]
+            await communicator.send_input({"type": "http.disconnect"})
+            await communicator.wait(5)
+            return start, heartbeat, chunks
+
+        start, heartbeat, chunks = async_to_sync(run)()
+        self.assertEqual(start["status"], 200)
+        self.assertIn((b"Content-Type", b"text/event-stream"), start["headers"])
+        self.assertEqual(heartbeat["body"], b": heartbeat\n\n")
+        events = [json.loads(chunk["body"].decode().split("data: ")[1]) for chunk in chunks]
+        self.assertEqual([(e["model"], e["id"], e["deleted"]) for e in events], [
+            ("slot", "1", False), ("slot", "2", True)
+        ])
+        self.assertEqual(broker.subscriptions, {})
+
+
+    def test_refresh_cookie_accepted(self):
+        async def run():
+            communicator = self.communicator([
+                (b"cookie", f"refresh_token={self.user.make_refresh_jwt()}".encode())
+            ])
+            await communicator.send_input({"type": "http.request", "body": b""})
+            start = await communicator.receive_output(5)
+            await communicator.send_input({"type": "http.disconnect"})
+            await communicator.wait(5)
+            return start
+        self.assertEqual(async_to_sync(run)()["status"], 200)
+
+
+    def test_stream_requires_user(self):
+        async def run():
+            communicator = self.communicator()
+            await communicator.send_input({"type": "http.request", "body": b""})
+            return await communicator.receive_output(5)
+        self.assertEqual(async_to_sync(run)()["status"], 401)
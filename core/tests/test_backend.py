@@ -0,0 +1,48 @@
+from unittest.mock import patch
+from django.test import TestCase, RequestFactory
+from core.backend import CachedDocumentBackend
+from core.schema import schema
+
+class CachedDocumentBackendTests(TestCase):
+
+    def setUp(self):
+        self.backend = CachedDocumentBackend(maxsize=2)
+        self.request = RequestFactory().post("/graphql")
+        self.request.user = None
+    
+
+    def test_documents_parsed_and_validated_once(self):
+        document = self.backend.document_from_string(schema, "{ accessToken }")
+        with patch("core.backend.parse") as parse:
+            with patch("core.backend.validate") as validate:
+                self.assertIs(
+                    self.backend.document_from_string(schema, "{ accessToken }"),
+                    document
+                )
+                self.assertFalse(parse.called)
+                self.assertFalse(validate.called)
+        self.assertEqual(self.backend.documents.stats()["hits"], 1)
+        self.assertEqual(self.backend.documents.stats()["misses"], 1)
+    
+
+    def test_cached_document_can_be_executed_repeatedly(self):
+        for _ in range(2):
+            document = self.backend.document_from_string(
+                schema, "mutation { logout { success } }"
+            )
+            result = document.execute(context=self.request)
+            self.assertEqual(result.data, {"logout": {"success": True}})
+    
+
+    def test_invalid_documents_return_validation_errors(self):
+        for _ in range(2):
+            document = self.backend.document_from_string(schema, "{ xyz }")
+            result = document.execute(context=self.request)
+            self.assertTrue(result.invalid)
+            self.assertIn("xyz", str(result.errors[0]))
+    
+
+    def test_cache_is_bounded(self):
+        for query in ["{ accessToken }", "{ user { id } }", "{ user { name } }"]:
+            self.backend.document_from_string(schema, query)
+        self.assertEqual(len(self.backend.documents), 2)
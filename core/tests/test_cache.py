@@ -0,0 +1,82 @@
+import time
+from freezegun import freeze_time
+from django.test import TestCase
+from core.cache import LRUCache, TokenCache
+
+class LRUCacheTests(TestCase):
+
+    def test_can_store_and_retrieve_values(self):
+        cache = LRUCache(maxsize=10)
+        cache.set("a", 1)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("b", 2), 2)
+    
+
+    def test_least_recently_used_entries_evicted(self):
+        cache = LRUCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), 3)
+    
+
+    def test_cache_counts_hits_and_misses(self):
+        cache = LRUCache(maxsize=10)
+        cache.set("a", 1)
+        cache.get("a")
+        cache.get("a")
+        cache.get("a")
+        cache.get("b")
+        self.assertEqual(cache.stats(), {
+            "size": 1, "maxsize": 10, "hits": 3, "misses": 1, "hit_rate": 0.75
+        })
+        cache.clear()
+        self.assertEqual(cache.stats()["hits"], 0)
+        self.assertEqual(len(cache), 0)
+
+
+
+class TokenCacheTests(TestCase):
+
+    def test_can_remember_token(self):
+        cache = TokenCache(maxsize=10)
+        cache.set("token", 23, time.time() + 100)
+        self.assertEqual(cache.get("token"), 23)
+        self.assertIsNone(cache.get("other"))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+    
+
+    def test_expired_tokens_evicted(self):
+        cache = TokenCache(maxsize=10)
+        with freeze_time("2021-01-01 12:00:00"):
+            cache.set("token", 23, time.time() + 900)
+            self.assertEqual(cache.get("token"), 23)
+        with freeze_time("2021-01-01 12:15:01"):
+            self.assertIsNone(cache.get("token"))
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.users, {})
+    
+
+    def test_size_is_bounded(self):
+        cache = TokenCache(maxsize=2)
+        for token in ["a", "b", "c"]:
+            cache.set(token, 23, time.time() + 100)
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.users, {23: {"b", "c"}})
+    
+
+    def test_can_invalidate_user(self):
+        cache = TokenCache(maxsize=10)
+        cache.set("a", 23, time.time() + 100)
+        cache.set("b", 23, time.time() + 100)
+        cache.set("c", 24, time.time() + 100)
+        cache.invalidate_user(23)
+        self.assertIsNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), 24)
@@ -0,0 +1,73 @@
+import asyncio
+import threading
+from asgiref.sync import async_to_sync
+from django.test import TestCase
+from core.events import InProcessBroker, EventStreamResponse
+
+class InProcessBrokerTests(TestCase):
+
+    def setUp(self):
+        self.broker = InProcessBroker(queue_size=3)
+
+
+    def test_events_only_reach_users_subscriptions(self):
+        async def run():
+            with self.broker.subscribe(1) as first, self.broker.subscribe(1) as second:
+                with self.broker.subscribe(2) as other:
+                    self.broker.publish(1, {"id": "1"})
+                    self.assertEqual(await first.get(), {"id": "1"})
+                    self.assertEqual(await second.get(), {"id": "1"})
+                    self.assertTrue(other.queue.empty())
+        async_to_sync(run)()
+
+
+    def test_events_published_from_other_threads(self):
+        async def run():
+            with self.broker.subscribe(1) as subscription:
+                thread = threading.Thread(
+                    target=self.broker.publish, args=[1, {"id": "1"}]
+                )
+                thread.start()
+                event = await asyncio.wait_for(subscription.get(), 5)
+                thread.join()
+                return event
+        self.assertEqual(async_to_sync(run)(), {"id": "1"})
+
+
+    def test_slow_subscriptions_told_to_resync(self):
+        async def run():
+            with self.broker.subscribe(1) as subscription:
+                for id in range(5): subscription.put({"id": id})
+                self.assertEqual(await subscription.get(), {"type": "resync"})
+                self.assertEqual(await subscription.get(), {"id": 4})
+                self.assertTrue(subscription.queue.empty())
+        async_to_sync(run)()
+
+
+    def test_closed_subscriptions_forgotten(self):
+        async def run():
+            with self.broker.subscribe(1): pass
+        async_to_sync(run)()
+        self.assertEqual(self.broker.subscriptions, {})
+        self.broker.publish(1, {"id": "1"})
+
+
+
+class EventStreamResponseTests(TestCase):
+
+    def test_events_formatted(self):
+        async def events():
+            yield None
+            yield {"type": "change", "id": "1"}
+            yield {"type": "resync"}
+
+        async def run():
+            return [chunk async for chunk in EventStreamResponse(events())]
+
+        response = EventStreamResponse(events())
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        self.assertEqual(async_to_sync(run)(), [
+            b": heartbeat\n\n",
+            b'event: change\ndata: {"type": "change", "id": "1"}\n\n',
+            b'event: resync\ndata: {"type": "resync"}\n\n',
+        ])
@@ -0,0 +1,155 @@
+import os
+import time
+import threading
+import graphene
+from contextlib import redirect_stderr
+from django.test import TestCase, TransactionTestCase, RequestFactory
+from core.backend import CachedDocumentBackend
+from core.executors import ParallelExecutor
+from core.models import User
+from core.schema import schema
+
+class Recorder:
+    """Records which threads resolve fields, and how many run at once."""
+
+    def __init__(self):
+        self.threads, self.running, self.most = {}, 0, 0
+        self.lock = threading.Lock()
+
+
+    def resolve(self, name, value, delay=0):
+        with self.lock:
+            self.threads[name] = threading.current_thread().name
+            self.running += 1
+            self.most = max(self.most, self.running)
+        time.sleep(delay)
+        with self.lock: self.running -= 1
+        return value
+
+
+
+recorder = Recorder()
+
+class Child(graphene.ObjectType):
+
+    value = graphene.Int()
+
+    def resolve_value(self, info):
+        return recorder.resolve(f"{info.path[0]}.value", 1)
+
+
+
+class Query(graphene.ObjectType):
+
+    slow = graphene.Field(Child, delay=graphene.Float())
+    broken = graphene.Int()
+
+    def resolve_slow(self, info, delay):
+        return recorder.resolve(info.path[0], Child(), delay)
+
+
+    def resolve_broken(self, info):
+        raise ValueError("Broken")
+
+
+
+class Mutation(graphene.ObjectType):
+
+    change = graphene.Int()
+
+    def resolve_change(self, info):
+        return recorder.resolve(info.path[0], 1, 0.05)
+
+
+
+test_schema = graphene.Schema(query=Query, mutation=Mutation)
+
+class ParallelExecutorTests(TestCase):
+
+    def setUp(self):
+        global recorder
+        recorder = Recorder()
+        self.executor = ParallelExecutor(max_workers=2)
+
+
+    def execute(self, query):
+        return test_schema.execute(query, executor=self.executor)
+
+
+    def test_root_fields_resolved_side_by_side(self):
+        start = time.perf_counter()
+        result = self.execute("""{
+            a: slow(delay: 0.2) { value } b: slow(delay: 0.2) { value }
+        }""")
+        self.assertLess(time.perf_counter() - start, 0.35)
+        self.assertIsNone(result.errors)
+        self.assertEqual(result.data, {"a": {"value": 1}, "b": {"value": 1}})
+        self.assertEqual(recorder.most, 2)
+        self.assertNotEqual(recorder.threads["a"], recorder.threads["b"])
+
+
+    def test_nested_fields_stay_on_root_field_thread(self):
+        self.execute("{ a: slow(delay: 0) { value } }")
+        self.assertTrue(recorder.threads["a"].startswith("graphql"))
+        self.assertEqual(recorder.threads["a.value"], recorder.threads["a"])
+
+
+    def test_instant_root_fields_keep_nested_fields(self):
+        global recorder
+        for _ in range(50):
+            recorder = Recorder()
+            self.execute("""{
+                a: slow(delay: 0) { value } b: slow(delay: 0) { value }
+                c: slow(delay: 0) { value }
+            }""")
+            for name in "abc":
+                self.assertTrue(recorder.threads[name].startswith("graphql"))
+                self.assertEqual(recorder.threads[f"{name}.value"], recorder.threads[name])
+
+
+    def test_parallelism_capped(self):
+        result = self.execute("""{
+            a: slow(delay: 0.05) { value } b: slow(delay: 0.05) { value }
+            c: slow(delay: 0.05) { value } d: slow(delay: 0.05) { value }
+        }""")
+        self.assertEqual(len(result.data), 4)
+        self.assertEqual(recorder.most, 2)
+
+
+    def test_errors_reported(self):
+        with open(os.devnull, "w") as fnull:
+            with redirect_stderr(fnull):
+                result = self.execute("{ a: slow(delay: 0) { value } broken }")
+        self.assertEqual(result.data, {"a": {"value": 1}, "broken": None})
+        self.assertEqual(str(result.errors[0]), "Broken")
+
+
+    def test_mutations_run_in_order_on_request_thread(self):
+        result = self.execute("mutation { a: change b: change }")
+        self.assertEqual(result.data, {"a": 1, "b": 1})
+        self.assertEqual(recorder.most, 1)
+        self.assertEqual(recorder.threads["a"], threading.current_thread().name)
+
+
+
+class ParallelSchemaTests(TransactionTestCase):
+
+    fixtures = ["users.json", "slots.json", "projects.json"]
+
+    def test_parallel_execution_matches_serial(self):
+        query = """{
+            a: user { name slots { name order } }
+            b: user { projects(statusIn: [1]) { name } }
+            c: user { projects(statusIn: [2]) { name category { name } } }
+            d: user { projectGroups { status count } }
+        }"""
+        request = RequestFactory().post("/graphql")
+        request.user = User.objects.get(email="jack@gmail.com")
+        serial = schema.execute(query, context_value=request)
+        request = RequestFactory().post("/graphql")
+        request.user = User.objects.get(email="jack@gmail.com")
+        parallel = CachedDocumentBackend(
+            maxsize=10, executor=ParallelExecutor(max_workers=4)
+        ).document_from_string(schema, query).execute(context_value=request)
+        self.assertIsNone(parallel.errors)
+        self.assertEqual(parallel.data, serial.data)
@@ -1,7 +1,9 @@
 import os
 from mixer.backend.django import mixer
 from django.contrib.auth.hashers import check_password
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.core.files.uploadedfile import SimpleUploadedFile
 from core.forms import *
 
@@ -38,6 +40,22 @@ class SignupFormTests(TestCase):
         })
         self.assertFalse(form.is_valid())
         self.assertIn("too common", form.errors["password"][0])
+    
+
+    def test_signup_form_saves_user_and_slots_together(self):
+        form = SignupForm({
+            "name": "Johnny", "email": "a@b.co",
+            "password": "sw0rdfish123"
+        })
+        self.assertTrue(form.is_valid())
+        with CaptureQueriesContext(connection) as queries:
+            form.save()
+        writes = [q["sql"] for q in queries if q["sql"].startswith("INSERT")]
+        self.assertEqual(len(writes), 2)
+        self.assertEqual(len(queries), 4)
+        user = User.objects.get(email="a@b.co")
+        self.assertTrue(check_password("sw0rdfish123", user.password))
+        self.assertEqual([slot.name for slot in user.slots.all()], ["Work", "Personal"])
 
 
 
@@ -116,4 +134,55 @@ class ProjectFormTests(TestCase):
             "status": 1, "user": mixer.blend(User).id
         })
         self.assertFalse(form.is_valid())
-        self.assertIn("100", form.errors["name"][0])
\ No newline at end of file
+        self.assertIn("100", form.errors["name"][0])
+
+
+class PartialUpdateFormTests(TestCase):
+
+    def setUp(self):
+        self.project = mixer.blend(Project, name="P", description="D", status=1)
+
+
+    def updates(self, form):
+        """Saves a form, returning the UPDATE statements it made."""
+
+        with CaptureQueriesContext(connection) as queries:
+            form.save()
+        return [query["sql"] for query in queries if query["sql"].startswith("UPDATE")]
+
+
+    def test_only_given_fields_validated(self):
+        form = PartialProjectForm({"status": 4}, instance=self.project)
+        self.assertTrue(form.is_valid())
+        form = PartialProjectForm({"status": 4, "name": ""}, instance=self.project)
+        self.assertFalse(form.is_valid())
+        self.assertEqual(list(form.errors), ["name"])
+
+
+    def test_only_changed_columns_written(self):
+        form = PartialProjectForm({"status": 4, "name": "P"}, instance=self.project)
+        self.assertTrue(form.is_valid())
+        updates = self.updates(form)
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"status"', updates[0])
+        self.assertIn('"updated_at"', updates[0])
+        self.assertNotIn('"name"', updates[0])
+        self.assertNotIn('"description"', updates[0])
+        self.project.refresh_from_db()
+        self.assertEqual((self.project.status, self.project.description), (4, "D"))
+
+
+    def test_nothing_written_without_changes(self):
+        form = PartialProjectForm({"name": "P"}, instance=self.project)
+        self.assertTrue(form.is_valid())
+        self.assertEqual(self.updates(form), [])
+
+
+    def test_user_password_not_rewritten(self):
+        user = mixer.blend(User, name="Jack")
+        form = UpdateUserForm({"name": "John"}, instance=user)
+        self.assertTrue(form.is_valid())
+        updates = self.updates(form)
+        self.assertEqual(len(updates), 1)
+        self.assertNotIn('"password"', updates[0])
+        self.assertNotIn('"email"', updates[0])
@@ -0,0 +1,62 @@
+import threading
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.contrib.auth.hashers import make_password
+from core.hashing import HashingPool, HashingBusy
+
+class HashingPoolTests(TestCase):
+
+    def setUp(self):
+        self.pool = HashingPool(workers=2, queue=1, timeout=0.1)
+
+
+    def test_functions_run_on_worker_threads(self):
+        name = self.pool.run(lambda: threading.current_thread().name)
+        self.assertTrue(name.startswith("hashing"))
+
+
+    def test_exceptions_reach_caller(self):
+        with self.assertRaises(ZeroDivisionError):
+            self.pool.run(lambda: 1 / 0)
+
+
+    def test_full_pool_turns_callers_away(self):
+        self.pool = HashingPool(workers=2, queue=0, timeout=0.1)
+        release, started = threading.Event(), threading.Semaphore(0)
+        def block():
+            started.release()
+            release.wait()
+        threads = [threading.Thread(target=self.pool.run, args=[block]) for _ in range(2)]
+        for thread in threads: thread.start()
+        for _ in range(2): started.acquire()
+        try:
+            with self.assertRaises(HashingBusy):
+                self.pool.run(lambda: None)
+        finally:
+            release.set()
+            for thread in threads: thread.join()
+        self.assertIsNone(self.pool.run(lambda: None))
+
+
+    def test_can_make_and_check_passwords(self):
+        encoded = self.pool.make_password("sw0rdfish123")
+        self.assertEqual(self.pool.check_password("sw0rdfish123", encoded), (True, None))
+        self.assertEqual(self.pool.check_password("sw0rdfish124", encoded), (False, None))
+
+
+    @override_settings(PASSWORD_ITERATIONS=2000)
+    def test_outdated_hashes_are_replaced(self):
+        with override_settings(PASSWORD_ITERATIONS=1000):
+            fewer_iterations = make_password("sw0rdfish123")
+        for encoded in [
+            make_password("sw0rdfish123", hasher="pbkdf2_sha1"), fewer_iterations
+        ]:
+            self.assertEqual(
+                self.pool.check_password("sw0rdfish124", encoded), (False, None)
+            )
+            valid, upgraded = self.pool.check_password("sw0rdfish123", encoded)
+            self.assertTrue(valid)
+            self.assertTrue(upgraded.startswith("pbkdf2_sha256$2000$"))
+            self.assertEqual(
+                self.pool.check_password("sw0rdfish123", upgraded), (True, None)
+            )
@@ -0,0 +1,103 @@
+from mixer.backend.django import mixer
+from django.test import TestCase, RequestFactory
+from core.identity import IdentityMap, identity_map
+from core.middleware import authenticate
+from core.models import User, Slot, Project
+from core.schema import schema
+
+class IdentityMapTests(TestCase):
+
+    def setUp(self):
+        self.user = mixer.blend(User)
+        self.project = mixer.blend(Project, user=self.user)
+
+
+    def test_can_get_added_object(self):
+        identities = IdentityMap()
+        self.assertIs(identities.add(self.user), self.user)
+        self.assertIs(identities.get(User, self.user.id), self.user)
+        self.assertIsNone(identities.get(User, self.user.id + 1))
+        self.assertIsNone(identities.get(Project, self.user.id))
+
+
+    def test_first_object_for_row_is_kept(self):
+        identities = IdentityMap()
+        identities.add(self.user)
+        copy = User.objects.get(id=self.user.id)
+        self.assertIs(identities.add(copy), self.user)
+        self.assertIs(identities.add(copy, replace=True), copy)
+        self.assertEqual(len(identities), 1)
+
+
+    def test_partial_objects_only_given_for_their_fields(self):
+        identities = IdentityMap()
+        identities.add(Project.objects.only("name", "user").get(id=self.project.id))
+        self.assertIsNotNone(identities.get(Project, self.project.id, ["name", "user"]))
+        self.assertIsNone(identities.get(Project, self.project.id, ["status"]))
+        self.assertIsNone(identities.get(Project, self.project.id))
+
+
+    def test_objects_with_more_fields_replace_partial_ones(self):
+        identities = IdentityMap()
+        partial = Project.objects.only("name").get(id=self.project.id)
+        identities.add(partial)
+        self.assertIs(identities.add(
+            Project.objects.only("name").get(id=self.project.id)
+        ), partial)
+        full = Project.objects.get(id=self.project.id)
+        self.assertIs(identities.add(full), full)
+        self.assertIs(identities.get(Project, self.project.id), full)
+
+
+    def test_request_has_one_identity_map(self):
+        request = RequestFactory().post("/graphql")
+        self.assertIs(identity_map(request), identity_map(request))
+
+
+
+class RequestIdentityTests(TestCase):
+
+    fixtures = ["users.json", "slots.json", "projects.json"]
+
+    def setUp(self):
+        self.token = User.objects.get(email="jack@gmail.com").make_access_jwt()
+
+
+    def execute(self, operation):
+        request = RequestFactory().post(
+            "/graphql", HTTP_AUTHORIZATION=f"Bearer {self.token}"
+        )
+        authenticate(request)
+        result = schema.execute(operation, context_value=request)
+        self.assertIsNone(result.errors)
+        return result.data
+
+
+    def test_authenticated_user_not_loaded_again(self):
+        with self.assertNumQueries(3):
+            data = self.execute("""{ user {
+                email slots { user { email } } projects { user { email } }
+            } }""")
+        self.assertEqual(data["user"]["slots"][0]["user"]["email"], "jack@gmail.com")
+        self.assertEqual(data["user"]["projects"][0]["user"]["email"], "jack@gmail.com")
+
+
+    def test_moved_slot_returns_authenticated_user(self):
+        # User, slot, slot's neighbours and the move itself - the user isn't
+        # looked up again for either user field
+        with self.assertNumQueries(6):
+            data = self.execute("""mutation { moveSlot(id: 1, index: 1) {
+                slot { user { email } } user { email }
+            } }""")
+        self.assertEqual(data["moveSlot"]["user"]["email"], "jack@gmail.com")
+        self.assertEqual(data["moveSlot"]["slot"]["user"]["email"], "jack@gmail.com")
+
+
+    def test_updated_slot_replaces_loaded_copy(self):
+        data = self.execute("""mutation {
+            a: updateSlot(id: 1, name: "X") { slot { name } }
+            b: moveSlot(id: 1, index: 2) { user { slots { name } } }
+        }""")
+        self.assertEqual(data["a"]["slot"]["name"], "X")
+        self.assertIn("X", [slot["name"] for slot in data["b"]["user"]["slots"]])
+        self.assertEqual(Slot.objects.get(id=1).name, "X")
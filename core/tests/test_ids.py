@@ -0,0 +1,111 @@
+import os
+import threading
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase
+from core.ids import IDGenerator, generate_id, EPOCH
+from core.models import User, Slot
+
+class IDGeneratorTests(TestCase):
+
+    def test_ids_are_18_digits(self):
+        self.assertEqual(len(str(generate_id())), 18)
+        generator = IDGenerator(node=99)
+        with patch("time.time", return_value=9999999999):
+            self.assertEqual(len(str(generator())), 18)
+
+
+    def test_ids_are_increasing(self):
+        generator = IDGenerator()
+        ids = [generator() for _ in range(10000)]
+        self.assertEqual(ids, sorted(set(ids)))
+
+
+    def test_ids_made_of_time_node_and_sequence(self):
+        generator = IDGenerator(node=7)
+        with patch("time.time", return_value=(EPOCH + 123456) / 1000):
+            self.assertEqual(generator(), 100000012345607000)
+            self.assertEqual(generator(), 100000012345607001)
+
+
+    def test_running_out_of_sequence_borrows_next_millisecond(self):
+        generator = IDGenerator(node=7)
+        with patch("time.time", return_value=(EPOCH + 123456) / 1000):
+            ids = [generator() for _ in range(1001)]
+        self.assertEqual(ids[-2], 100000012345607999)
+        self.assertEqual(ids[-1], 100000012345707000)
+
+
+    def test_clock_going_backwards_doesnt_repeat_ids(self):
+        generator = IDGenerator()
+        with patch("time.time", return_value=1700000000):
+            first = generator()
+        with patch("time.time", return_value=1600000000):
+            self.assertGreater(generator(), first)
+
+
+    def test_processes_claim_different_nodes(self):
+        with TemporaryDirectory() as lock_dir:
+            generators = [IDGenerator(nodes=range(3, 5), lock_dir=lock_dir) for _ in range(3)]
+            self.assertEqual(generators[0]() // 1000 % 100, 3)
+            self.assertEqual(generators[1]() // 1000 % 100, 4)
+            with self.assertRaises(ImproperlyConfigured):
+                generators[2]()
+            generators[0].lock_file.close()
+            self.assertEqual(generators[2]() // 1000 % 100, 3)
+            self.assertEqual(IDGenerator(node=5, lock_dir=lock_dir)() // 1000 % 100, 5)
+            generators[1].lock_file.close()
+            generators[2].lock_file.close()
+
+
+    def test_forked_process_claims_new_node(self):
+        with TemporaryDirectory() as lock_dir:
+            generator = IDGenerator(nodes=range(3, 5), lock_dir=lock_dir)
+            generator()
+            read, write = os.pipe()
+            if os.fork() == 0:
+                os.write(write, str(generator() // 1000 % 100).encode())
+                os._exit(0)
+            os.wait()
+            self.assertEqual(os.read(read, 2), b"4")
+            self.assertEqual(generator() // 1000 % 100, 3)
+            generator.lock_file.close()
+
+
+    def test_nodes_must_fit_in_ids(self):
+        with self.assertRaises(ImproperlyConfigured):
+            IDGenerator(nodes=range(90, 110))()
+
+
+    def test_ids_unique_across_threads(self):
+        generator, ids = IDGenerator(), []
+        def make():
+            made = [generator() for _ in range(2000)]
+            ids.extend(made)
+        threads = [threading.Thread(target=make) for _ in range(4)]
+        for thread in threads: thread.start()
+        for thread in threads: thread.join()
+        self.assertEqual(len(set(ids)), 8000)
+
+
+
+class UniqueIDModelTests(TestCase):
+
+    def test_objects_have_ids_before_saving(self):
+        user = User(email="john@gmail.com", name="John")
+        self.assertEqual(len(str(user.id)), 18)
+        with self.assertNumQueries(1):
+            user.save()
+        self.assertEqual(User.objects.get(id=user.id), user)
+
+
+    def test_can_bulk_create_without_ids(self):
+        user = User.objects.create(email="john@gmail.com", name="John")
+        slots = Slot.objects.bulk_create([
+            Slot(name=f"S{i}", user=user, order=i) for i in range(100)
+        ])
+        self.assertEqual(
+            list(user.slots.values_list("id", flat=True)), [slot.id for slot in slots]
+        )
+        self.assertEqual([slot.id for slot in slots], sorted(slot.id for slot in slots))
@@ -0,0 +1,87 @@
+import os
+from contextlib import redirect_stderr
+from mixer.backend.django import mixer
+from django.test import TestCase, RequestFactory
+from core.models import User, Slot, Project, ProjectCategory
+from core.schema import schema
+
+class LoaderTests(TestCase):
+
+    def setUp(self):
+        self.user = mixer.blend(User)
+        self.categories = [
+            mixer.blend(ProjectCategory, user=self.user, order=None) for _ in range(3)
+        ]
+
+
+    def execute(self, query):
+        request = RequestFactory().post("/graphql")
+        request.user = self.user
+        result = schema.execute(query, context_value=request)
+        self.assertIsNone(result.errors)
+        return result.data
+
+
+    def make_projects(self, count):
+        for i in range(count):
+            mixer.blend(
+                Project, user=self.user, creation_time=i,
+                category=self.categories[i % 3] if i % 4 else None
+            )
+    
+
+    def test_nested_relations_use_fixed_number_of_queries(self):
+        query = """{ user {
+            slots { name user { email } }
+            projects { name category { name projects { name } } user { email } }
+        } }"""
+        self.make_projects(3)
+        with self.assertNumQueries(3):
+            data = self.execute(query)
+        self.assertEqual(len(data["user"]["projects"]), 3)
+        self.make_projects(30)
+        with self.assertNumQueries(3):
+            data = self.execute(query)
+        self.assertEqual(len(data["user"]["projects"]), 33)
+    
+
+    def test_root_fields_have_their_own_loaders(self):
+        request = RequestFactory().post("/graphql")
+        request.user = self.user
+        schema.execute("{ a: user { slots { name } } b: user { slots { name } } }",
+            context_value=request)
+        self.assertEqual(sorted(key[0] for key in request.loaders), ["a", "b"])
+    
+
+    def test_loaded_relations_are_correct(self):
+        self.make_projects(8)
+        data = self.execute("""{ user {
+            projects { name category { name } user { email } }
+            projectCategories { name projects { name } }
+        } }""")
+        for project, obj in zip(data["user"]["projects"], self.user.projects.all()):
+            self.assertEqual(project["name"], obj.name)
+            self.assertEqual(project["user"]["email"], self.user.email)
+            self.assertEqual(
+                project["category"], {"name": obj.category.name} if obj.category else None
+            )
+        for category, obj in zip(data["user"]["projectCategories"], self.categories):
+            self.assertEqual(category["name"], obj.name)
+            self.assertEqual(
+                [p["name"] for p in category["projects"]],
+                [p.name for p in obj.projects.all()]
+            )
+    
+
+    def test_project_lookup_checks_owner(self):
+        self.make_projects(1)
+        other_project = mixer.blend(Project)
+        request = RequestFactory().post("/graphql")
+        request.user = self.user
+        with open(os.devnull, "w") as fnull:
+            with redirect_stderr(fnull):
+                result = schema.execute(
+                    "{ user { project(id: %s) { name } } }" % other_project.id,
+                    context_value=request
+                )
+        self.assertIn("Does not exist", str(result.errors[0]))
@@ -0,0 +1,106 @@
+import time
+from unittest.mock import patch
+from mixer.backend.django import mixer
+from django.db import DatabaseError
+from django.test import TestCase
+from core.logins import LastLoginBuffer
+from core.models import User
+
+class LastLoginBufferTests(TestCase):
+
+    def setUp(self):
+        self.users = [mixer.blend(User, last_login=None) for _ in range(3)]
+
+
+    def make_buffer(self, **kwargs):
+        buffer = LastLoginBuffer(**kwargs)
+        self.addCleanup(buffer.stop)
+        return buffer
+
+
+    def last_logins(self):
+        return [User.objects.get(id=user.id).last_login for user in self.users]
+
+
+    def test_logins_not_written_until_flushed(self):
+        buffer = self.make_buffer(interval=3600)
+        with self.assertNumQueries(0):
+            buffer.record(self.users[0].id, 1000)
+            buffer.record(self.users[1].id, 2000)
+        self.assertEqual(self.last_logins(), [None, None, None])
+        with self.assertNumQueries(1):
+            self.assertEqual(buffer.flush(), 2)
+        self.assertEqual(self.last_logins(), [1000, 2000, None])
+        self.assertEqual(len(buffer), 0)
+        with self.assertNumQueries(0):
+            self.assertEqual(buffer.flush(), 0)
+
+
+    def test_logins_kept_if_not_written(self):
+        buffer = self.make_buffer(interval=3600)
+        buffer.record(self.users[0].id, 2000)
+        buffer.record(self.users[1].id, 1000)
+        with patch.object(buffer, "write", side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                buffer.flush()
+        buffer.record(self.users[0].id, 1500)
+        buffer.record(self.users[1].id, 3000)
+        self.assertEqual(buffer.flush(), 2)
+        self.assertEqual(self.last_logins(), [2000, 3000, None])
+
+
+    def test_latest_login_kept(self):
+        buffer = self.make_buffer(interval=3600)
+        buffer.record(self.users[0].id, 2000)
+        buffer.record(self.users[0].id, 1000)
+        buffer.record(self.users[0].id, 1500)
+        self.assertEqual(len(buffer), 1)
+        buffer.flush()
+        self.assertEqual(self.last_logins(), [2000, None, None])
+
+
+    def test_later_login_in_table_kept(self):
+        buffer = self.make_buffer(interval=3600)
+        buffer.record(self.users[0].id, 1000)
+        buffer.record(self.users[1].id, 3000)
+        User.objects.filter(id__in=[self.users[0].id, self.users[1].id]).update(
+            last_login=2000
+        )
+        buffer.flush()
+        self.assertEqual(self.last_logins(), [2000, 3000, None])
+
+
+    def test_logins_written_in_batches(self):
+        buffer = self.make_buffer(interval=3600, batch_size=2)
+        for user in self.users: buffer.record(user.id, 1000)
+        with self.assertNumQueries(2):
+            buffer.flush()
+        self.assertEqual(self.last_logins(), [1000, 1000, 1000])
+
+
+    def test_no_interval_writes_straight_away(self):
+        buffer = self.make_buffer(interval=0)
+        with self.assertNumQueries(1):
+            buffer.record(self.users[0].id, 1000)
+        self.assertEqual(len(buffer), 0)
+        self.assertEqual(self.last_logins(), [1000, None, None])
+
+
+    def test_can_clear_logins(self):
+        buffer = self.make_buffer(interval=3600)
+        buffer.record(self.users[0].id, 1000)
+        buffer.clear()
+        buffer.flush()
+        self.assertEqual(self.last_logins(), [None, None, None])
+
+
+    def test_background_thread_flushes_and_stops(self):
+        buffer = self.make_buffer(interval=0.01)
+        buffer.flush = lambda: flushes.append(time.time())
+        flushes = []
+        buffer.record(self.users[0].id, 1000)
+        self.assertTrue(buffer.thread.daemon)
+        time.sleep(0.1)
+        buffer.stop()
+        self.assertGreater(len(flushes), 1)
+        self.assertIsNone(buffer.thread)
@@ -1,8 +1,14 @@
 from unittest.mock import patch, Mock, PropertyMock, MagicMock
 from mixer.backend.django import mixer
-from django.test import TestCase
+import json
+from django.db import connection
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.http import HttpRequest
 from django.conf import settings
+from asgiref.sync import async_to_sync
 from core.middleware import *
+from core.logins import last_logins
 
 class ApiAuthMiddlewareTests(TestCase):
 
@@ -15,10 +21,30 @@ class ApiAuthMiddlewareTests(TestCase):
 
     @patch("core.middleware.User.from_token")
     def test_middleware_uses_access_token_to_assign_user(self, from_token):
+        self.request = HttpRequest()
         self.request.META = {"HTTP_AUTHORIZATION": "Bearer 12345"}
+        from_token.return_value = self.user
         response = self.mw(self.request)
+        self.assertEqual(self.request.user.id, self.user.id)
         from_token.assert_called_with("12345")
-        self.request.user = from_token.return_value
+    
+
+    @patch("core.middleware.User.from_token")
+    def test_middleware_only_looks_up_user_when_used(self, from_token):
+        self.request = HttpRequest()
+        self.request.META = {"HTTP_AUTHORIZATION": "Bearer 12345"}
+        response = self.mw(self.request)
+        self.assertFalse(from_token.called)
+        self.assertTrue(self.request.user)
+        self.assertTrue(self.request.user)
+        from_token.assert_called_once_with("12345")
+    
+
+    def test_middleware_assigns_no_user_for_missing_token(self):
+        self.request = HttpRequest()
+        with self.assertNumQueries(0):
+            response = self.mw(self.request)
+            self.assertFalse(self.request.user)
 
 
     def test_middleware_does_not_set_cookie_if_no_refresh_token_added(self):
@@ -36,4 +62,77 @@ class ApiAuthMiddlewareTests(TestCase):
     def test_middleware_deletes_cookie_if_refresh_token_false(self):
         self.request.refresh_token = False
         response = self.mw(self.request)
-        response.delete_cookie.assert_called_with("refresh_token")
\ No newline at end of file
+        response.delete_cookie.assert_called_with("refresh_token")
+
+
+class AsyncAuthMiddlewareTests(TestCase):
+
+    def setUp(self):
+        self.response = MagicMock()
+        async def get_response(request):
+            return self.response
+        self.mw = AsyncAuthenticationMiddleware(get_response)
+        self.user = mixer.blend(User)
+
+
+    @patch("core.middleware.User.from_token")
+    def test_middleware_assigns_lazy_user(self, from_token):
+        request = HttpRequest()
+        request.META = {"HTTP_AUTHORIZATION": "Bearer 12345"}
+        from_token.return_value = self.user
+        response = async_to_sync(self.mw)(request)
+        self.assertIs(response, self.response)
+        self.assertFalse(from_token.called)
+        self.assertEqual(request.user.id, self.user.id)
+        from_token.assert_called_once_with("12345")
+
+
+    def test_middleware_sets_and_deletes_cookie(self):
+        request = HttpRequest()
+        request.refresh_token = "abc"
+        async_to_sync(self.mw)(request)
+        self.response.set_cookie.assert_called_with("refresh_token", value="abc", httponly=True)
+        request.refresh_token = False
+        async_to_sync(self.mw)(request)
+        self.response.delete_cookie.assert_called_with("refresh_token")
+
+
+
+class UnusedUserLookupTests(TestCase):
+
+    def setUp(self):
+        self.user = mixer.blend(User, email="jack@gmail.com")
+        self.user.set_password("livetogetha")
+        self.other = mixer.blend(User)
+        self.client = Client()
+        self.client.cookies["refresh_token"] = self.user.make_refresh_jwt()
+        self.addCleanup(last_logins.clear)
+
+
+    def user_lookups(self, query):
+        """Sends an operation with another user's access token, and returns the
+        queries it made which looked that user up."""
+
+        with CaptureQueriesContext(connection) as context:
+            self.client.post(
+                "/graphql", json.dumps({"query": query}),
+                content_type="application/json",
+                HTTP_AUTHORIZATION=f"Bearer {self.other.make_access_jwt()}"
+            )
+        return [query["sql"] for query in context.captured_queries
+            if '"users"' in query["sql"] and str(self.other.id) in query["sql"]]
+
+
+    def test_operations_not_needing_user_dont_look_it_up(self):
+        for query in [
+            """mutation { login(
+                email: "jack@gmail.com", password: "livetogetha"
+            ) { accessToken } }""",
+            "{ accessToken }",
+            "mutation { logout { success } }"
+        ]:
+            self.assertEqual(self.user_lookups(query), [], query)
+
+
+    def test_operations_needing_user_look_it_up(self):
+        self.assertEqual(len(self.user_lookups("{ user { name } }")), 1)
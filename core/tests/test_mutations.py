@@ -0,0 +1,104 @@
+from django.test import TestCase, RequestFactory
+from core.models import User, Slot, Project, Tombstone
+from core.schema import schema
+
+class OwnedMutationQueryTests(TestCase):
+
+    fixtures = ["users.json", "slots.json", "projects.json"]
+
+    def setUp(self):
+        self.user = User.objects.get(email="jack@gmail.com")
+
+
+    def execute(self, operation, queries):
+        request = RequestFactory().post("/graphql")
+        request.user = self.user
+        with self.assertNumQueries(queries):
+            return schema.execute(operation, context_value=request)
+
+
+    def test_update_slot_is_one_update(self):
+        result = self.execute(
+            'mutation { updateSlot(id: 1, name: "X") { slot { id name } } }', 1
+        )
+        self.assertIsNone(result.errors)
+        self.assertEqual(result.data["updateSlot"]["slot"], {"id": "1", "name": "X"})
+        self.assertEqual(Slot.objects.get(id=1).name, "X")
+
+
+    def test_update_slot_fetches_fields_not_given(self):
+        result = self.execute(
+            'mutation { updateSlot(id: 1, name: "X") { slot { name order } } }', 3
+        )
+        self.assertIsNone(result.errors)
+        self.assertEqual(result.data["updateSlot"]["slot"], {"name": "X", "order": 1})
+
+
+    def test_update_other_users_slot_is_one_update(self):
+        result = self.execute(
+            'mutation { updateSlot(id: 100, name: "X") { slot { name } } }', 1
+        )
+        self.assertIn("Does not exist", result.errors[0].message)
+        self.assertNotEqual(Slot.objects.get(id=100).name, "X")
+
+
+    def test_update_project_is_one_update(self):
+        result = self.execute(
+            'mutation { updateProject(id: 1, status: 4) { project { status } } }', 1
+        )
+        self.assertIsNone(result.errors)
+        self.assertEqual(result.data["updateProject"]["project"], {"status": 4})
+        self.assertEqual(Project.objects.get(id=1).status, 4)
+
+
+    def test_update_project_fetches_fields_not_given(self):
+        result = self.execute(
+            'mutation { updateProject(id: 1, status: 4) { project { name status } } }', 2
+        )
+        self.assertIsNone(result.errors)
+        self.assertEqual(result.data["updateProject"]["project"]["status"], 4)
+
+
+    def test_update_other_users_project_is_one_update(self):
+        result = self.execute(
+            'mutation { updateProject(id: 3, status: 4) { project { status } } }', 1
+        )
+        self.assertIn("Does not exist", result.errors[0].message)
+        self.assertNotEqual(Project.objects.get(id=3).status, 4)
+
+
+    def test_delete_slot_is_one_delete(self):
+        # Savepoint, lock of the user's slots, delete, tombstone, release
+        result = self.execute("mutation { deleteSlot(id: 1) { success } }", 5)
+        self.assertIsNone(result.errors)
+        self.assertFalse(Slot.objects.filter(id=1).exists())
+        self.assertTrue(Tombstone.objects.filter(model="slot", object_id=1).exists())
+
+
+    def test_delete_last_slot_deletes_nothing(self):
+        Slot.objects.filter(id=2).delete()
+        # Savepoint, lock of the user's slots, rollback, release
+        result = self.execute("mutation { deleteSlot(id: 1) { success } }", 4)
+        self.assertIn("at least one slot", result.errors[0].message)
+        self.assertTrue(Slot.objects.filter(id=1).exists())
+        self.assertFalse(Tombstone.objects.filter(model="slot", object_id=1).exists())
+
+
+    def test_delete_other_users_slot_deletes_nothing(self):
+        updated_at = Slot.objects.get(id=100).updated_at
+        result = self.execute("mutation { deleteSlot(id: 100) { success } }", 4)
+        self.assertIn("Does not exist", result.errors[0].message)
+        self.assertEqual(Slot.objects.get(id=100).updated_at, updated_at)
+
+
+    def test_delete_project_is_one_delete(self):
+        # Delete, tombstone
+        result = self.execute("mutation { deleteProject(id: 1) { success } }", 2)
+        self.assertIsNone(result.errors)
+        self.assertFalse(Project.objects.filter(id=1).exists())
+
+
+    def test_delete_other_users_project_is_one_delete(self):
+        result = self.execute("mutation { deleteProject(id: 3) { success } }", 1)
+        self.assertIn("Does not exist", result.errors[0].message)
+        self.assertTrue(Project.objects.filter(id=3).exists())
@@ -0,0 +1,124 @@
+from mixer.backend.django import mixer
+from django.db import connection
+from django.test import TestCase, RequestFactory
+from django.test.utils import CaptureQueriesContext
+from core.models import User, Project, ProjectCategory
+from core.planner import QueryPlan, selected_fields
+from core.schema import schema
+from graphql import parse
+
+def selection(query):
+    """Parses a query and returns its top level selection set and fragments."""
+
+    document = parse(query)
+    fragments = {
+        d.name.value: d for d in document.definitions if hasattr(d, "type_condition")
+    }
+    return [document.definitions[0].selection_set], fragments
+
+
+
+class SelectedFieldsTests(TestCase):
+
+    def test_can_get_selected_fields(self):
+        fields = selected_fields(*selection("{ id name creationTime user { id } }"))
+        self.assertEqual(list(fields), ["id", "name", "creation_time", "user"])
+        self.assertEqual(fields["user"][0].selections[0].name.value, "id")
+    
+
+    def test_fragments_are_followed(self):
+        fields = selected_fields(*selection("""query { id ...F ... on X { color } }
+        fragment F on ProjectType { name description }"""))
+        self.assertEqual(list(fields), ["id", "name", "description", "color"])
+
+
+
+class QueryPlanTests(TestCase):
+
+    def test_plan_selects_only_selected_columns(self):
+        plan = QueryPlan(Project, *selection("{ id name color status }"))
+        self.assertEqual(plan.only_fields(), ["color", "id", "name", "status"])
+        self.assertEqual(plan.related_fields(), [])
+    
+
+    def test_plan_always_includes_parent(self):
+        plan = QueryPlan(Project, *selection("{ name user { email } }"), parent="user")
+        self.assertEqual(plan.only_fields(), ["id", "name", "user"])
+        self.assertEqual(plan.joins, {})
+    
+
+    def test_plan_joins_foreign_keys(self):
+        plan = QueryPlan(Project, *selection("{ name category { name } }"))
+        self.assertEqual(plan.related_fields(), ["category"])
+        self.assertEqual(plan.only_fields(), [
+            "category", "id", "name", "category__id", "category__name"
+        ])
+    
+
+    def test_plan_prefetches_reverse_relations(self):
+        plan = QueryPlan(ProjectCategory, *selection("{ name projects { name } }"))
+        self.assertEqual(list(plan.prefetches), ["projects"])
+        self.assertEqual(plan.prefetches["projects"].only_fields(), [
+            "category", "id", "name"
+        ])
+        user = mixer.blend(User)
+        category = mixer.blend(ProjectCategory, user=user, order=None)
+        mixer.blend(Project, user=user, category=category, name="P")
+        with self.assertNumQueries(2):
+            categories = list(plan.apply(ProjectCategory.objects.all()))
+            self.assertEqual([p.name for p in categories[0].projects.all()], ["P"])
+    
+
+    def test_plan_keys(self):
+        plan1 = QueryPlan(Project, *selection("{ name color }"))
+        plan2 = QueryPlan(Project, *selection("{ color name color }"))
+        plan3 = QueryPlan(Project, *selection("{ name description }"))
+        self.assertEqual(plan1.key, plan2.key)
+        self.assertNotEqual(plan1.key, plan3.key)
+
+
+
+class PlannedQueryTests(TestCase):
+
+    def setUp(self):
+        self.user = mixer.blend(User)
+        category = mixer.blend(ProjectCategory, user=self.user, order=None)
+        for i in range(3):
+            mixer.blend(Project, user=self.user, category=category, description="x" * 10000)
+        self.request = RequestFactory().post("/graphql")
+        self.request.user = self.user
+    
+
+    def test_list_view_does_not_fetch_descriptions(self):
+        with CaptureQueriesContext(connection) as context:
+            result = schema.execute(
+                "{ user { projects { id name color status } } }",
+                context_value=self.request
+            )
+        self.assertIsNone(result.errors)
+        self.assertEqual(len(context), 1)
+        self.assertNotIn("description", context[0]["sql"])
+    
+
+    def test_categories_are_joined(self):
+        with self.assertNumQueries(1):
+            result = schema.execute(
+                "{ user { projects { name description category { name } } } }",
+                context_value=self.request
+            )
+        self.assertIsNone(result.errors)
+        self.assertEqual(len(result.data["user"]["projects"]), 3)
+        self.assertEqual(result.data["user"]["projects"][0]["description"], "x" * 10000)
+    
+
+    def test_project_groups_use_one_query(self):
+        with CaptureQueriesContext(connection) as context:
+            result = schema.execute(
+                "{ user { projectGroups(first: 2) { count projects { name } } } }",
+                context_value=self.request
+            )
+        self.assertIsNone(result.errors)
+        self.assertEqual(len(context), 1)
+        self.assertNotIn("description", context[0]["sql"])
+        self.assertEqual(result.data["user"]["projectGroups"][1]["count"], 3)
+        self.assertEqual(len(result.data["user"]["projectGroups"][1]["projects"]), 2)
@@ -1,7 +1,10 @@
 import time
+from random import Random
 from mixer.backend.django import mixer
+from unittest.mock import patch
 from django.test import TestCase
-from core.models import User, ProjectCategory
+from django.db import transaction, IntegrityError
+from core.models import User, ProjectCategory, Project, Tombstone
 
 class ProjectCategoryCreationTests(TestCase):
 
@@ -17,15 +20,15 @@ class ProjectCategoryCreationTests(TestCase):
     def test_making_extra_categories_increases_order(self):
         user1, user2 = mixer.blend(User), mixer.blend(User)
         category = mixer.blend(ProjectCategory, user=user1, order=None)
-        self.assertEqual(category.order, 1)
+        self.assertEqual(category.order, ProjectCategory.ORDER_STEP)
         category = mixer.blend(ProjectCategory, user=user1, order=None)
-        self.assertEqual(category.order, 2)
+        self.assertEqual(category.order, 2 * ProjectCategory.ORDER_STEP)
         category = mixer.blend(ProjectCategory, user=user2, order=None)
-        self.assertEqual(category.order, 1)
+        self.assertEqual(category.order, ProjectCategory.ORDER_STEP)
         category = mixer.blend(ProjectCategory, user=user1, order=None)
-        self.assertEqual(category.order, 3)
+        self.assertEqual(category.order, 3 * ProjectCategory.ORDER_STEP)
         category = mixer.blend(ProjectCategory, user=user2, order=None)
-        self.assertEqual(category.order, 2)
+        self.assertEqual(category.order, 2 * ProjectCategory.ORDER_STEP)
     
 
     def test_can_specify_category_order(self):
@@ -36,13 +39,13 @@ class ProjectCategoryCreationTests(TestCase):
     def test_order_only_set_on_creation(self):
         user1 = mixer.blend(User)
         category = mixer.blend(ProjectCategory, user=user1, order=None)
-        self.assertEqual(category.order, 1)
+        self.assertEqual(category.order, ProjectCategory.ORDER_STEP)
         mixer.blend(ProjectCategory, user=user1, order=None)
         mixer.blend(ProjectCategory, user=user1, order=None)
         category.name = "S"
         category.save()
         category.refresh_from_db()
-        self.assertEqual(category.order, 1)
+        self.assertEqual(category.order, ProjectCategory.ORDER_STEP)
 
 
 
@@ -57,59 +60,110 @@ class ProjectCategoryOrderTests(TestCase):
 
 
 
-
 class ProjectCategoryMovingTests(TestCase):
 
-    def test_can_move_to_current_position(self):
-        user = mixer.blend(User)
-        categorys = [
-            mixer.blend(ProjectCategory, user=user, order=1),
-            mixer.blend(ProjectCategory, user=user, order=2),
-            mixer.blend(ProjectCategory, user=user, order=3),
-            mixer.blend(ProjectCategory, user=user, order=4),
-            mixer.blend(ProjectCategory, user=user, order=5),
-        ]
+    def setUp(self):
+        self.user = mixer.blend(User)
+        self.categorys = [mixer.blend(ProjectCategory, user=self.user, order=None) for _ in range(5)]
         mixer.blend(ProjectCategory)
-        categorys[2].move_to(2)
-        categorys[2].refresh_from_db()
-        self.assertEqual(categorys[2].order, 3)
+    
+
+    def assertSequence(self, *indices):
+        self.assertEqual(
+            list(self.user.project_categories.all()),
+            [self.categorys[i] for i in indices]
+        )
+    
+
+    def test_can_move_to_current_position(self):
+        with self.assertNumQueries(1):
+            self.categorys[2].move_to(2)
+        self.assertSequence(0, 1, 2, 3, 4)
     
 
     def test_can_move_to_right(self):
-        user = mixer.blend(User)
-        categorys = [
-            mixer.blend(ProjectCategory, user=user, order=1),
-            mixer.blend(ProjectCategory, user=user, order=2),
-            mixer.blend(ProjectCategory, user=user, order=3),
-            mixer.blend(ProjectCategory, user=user, order=4),
-            mixer.blend(ProjectCategory, user=user, order=5),
-        ]
-        mixer.blend(ProjectCategory)
-        with self.assertNumQueries(2):
-            categorys[1].move_to(3)
-        for category in categorys: category.refresh_from_db()
-        self.assertEqual(categorys[0].order, 1)
-        self.assertEqual(categorys[1].order, 4)
-        self.assertEqual(categorys[2].order, 2)
-        self.assertEqual(categorys[3].order, 3)
-        self.assertEqual(categorys[4].order, 5)
+        # One read, and one write in a savepoint
+        with self.assertNumQueries(4):
+            self.categorys[1].move_to(3)
+        self.assertSequence(0, 2, 3, 1, 4)
+        for category in self.categorys: category.refresh_from_db()
+        self.assertEqual(self.categorys[0].order, ProjectCategory.ORDER_STEP)
+        self.assertEqual(self.categorys[2].order, 3 * ProjectCategory.ORDER_STEP)
+        self.assertEqual(self.categorys[1].order, int(4.5 * ProjectCategory.ORDER_STEP))
     
 
     def test_can_move_to_left(self):
-        user = mixer.blend(User)
-        categorys = [
-            mixer.blend(ProjectCategory, user=user, order=1),
-            mixer.blend(ProjectCategory, user=user, order=2),
-            mixer.blend(ProjectCategory, user=user, order=3),
-            mixer.blend(ProjectCategory, user=user, order=4),
-            mixer.blend(ProjectCategory, user=user, order=5),
-        ]
-        mixer.blend(ProjectCategory)
-        with self.assertNumQueries(2):
-            categorys[4].move_to(0)
-        for category in categorys: category.refresh_from_db()
-        self.assertEqual(categorys[0].order, 2)
-        self.assertEqual(categorys[1].order, 3)
-        self.assertEqual(categorys[2].order, 4)
-        self.assertEqual(categorys[3].order, 5)
-        self.assertEqual(categorys[4].order, 1)
\ No newline at end of file
+        # One read, and one write in a savepoint
+        with self.assertNumQueries(4):
+            self.categorys[4].move_to(0)
+        self.assertSequence(4, 0, 1, 2, 3)
+        self.categorys[4].refresh_from_db()
+        self.assertEqual(self.categorys[4].order, 0)
+    
+
+    def test_can_move_to_end(self):
+        # One read, and one write in a savepoint
+        with self.assertNumQueries(4):
+            self.categorys[0].move_to(4)
+        self.assertSequence(1, 2, 3, 4, 0)
+        self.categorys[0].refresh_from_db()
+        self.assertEqual(self.categorys[0].order, 6 * ProjectCategory.ORDER_STEP)
+    
+
+    def test_moving_past_end_moves_to_end(self):
+        with self.assertNumQueries(5):
+            self.categorys[0].move_to(100)
+        self.assertSequence(1, 2, 3, 4, 0)
+    
+
+    def test_full_gaps_are_spread_out(self):
+        for _ in range(40):
+            self.categorys[4].move_to(1)
+            self.categorys[3].move_to(1)
+        self.assertSequence(0, 3, 4, 1, 2)
+        orders = [category.order for category in self.user.project_categories.all()]
+        self.assertEqual(len(set(orders)), 5)
+    
+
+    def test_many_moves_never_share_orders(self):
+        random = Random(1)
+        for _ in range(300):
+            category = random.choice(self.categorys)
+            category.refresh_from_db()
+            category.move_to(random.randint(0, 4))
+        orders = list(self.user.project_categories.values_list("order", flat=True))
+        self.assertEqual(len(set(orders)), 5)
+        self.assertEqual(set(self.user.project_categories.all()), set(self.categorys))
+    
+
+    def test_concurrent_moves_to_same_gap(self):
+        # Both moves read the same neighbours, so both want the same order
+        neighbours = self.categorys[4].neighbours(1)
+        self.categorys[3].move_to(1)
+        with patch.object(ProjectCategory, "neighbours", side_effect=[
+            neighbours, self.categorys[4].neighbours(1)
+        ]):
+            self.categorys[4].move_to(1)
+        self.assertSequence(0, 4, 3, 1, 2)
+        orders = [category.order for category in self.user.project_categories.all()]
+        self.assertEqual(len(set(orders)), 5)
+    
+
+    def test_orders_must_be_unique(self):
+        with self.assertRaises(IntegrityError):
+            with transaction.atomic():
+                mixer.blend(ProjectCategory, user=self.user, order=self.categorys[0].order)
+
+
+
+class ProjectCategorySyncTests(TestCase):
+
+    def test_deleting_marks_projects_updated(self):
+        category = mixer.blend(ProjectCategory)
+        project = mixer.blend(Project, user=category.user, category=category)
+        Project.objects.update(updated_at=0)
+        category.delete()
+        project.refresh_from_db()
+        self.assertIsNone(project.category)
+        self.assertGreater(project.updated_at, 0)
+        self.assertEqual(Tombstone.objects.get().model, "projectcategory")
@@ -1,7 +1,7 @@
 import time
 from mixer.backend.django import mixer
 from django.test import TestCase
-from core.models import User, Project
+from core.models import User, Project, Tombstone
 
 class ProjectCreationTests(TestCase):
 
@@ -23,4 +23,58 @@ class ProjectOrderingTests(TestCase):
         project1 = mixer.blend(Project, user=user, creation_time=1)
         project2 = mixer.blend(Project, user=user, creation_time=3)
         project3 = mixer.blend(Project, user=user, creation_time=2)
-        self.assertEqual(list(Project.objects.all()), [project1, project3, project2])
\ No newline at end of file
+        self.assertEqual(list(Project.objects.all()), [project1, project3, project2])
+
+
+class ProjectSyncTests(TestCase):
+
+    def test_saving_records_update_time(self):
+        project = mixer.blend(Project)
+        self.assertLessEqual(abs(project.updated_at - time.time()), 1)
+    
+
+    def test_deleting_leaves_tombstone(self):
+        project = mixer.blend(Project)
+        id = project.id
+        project.delete()
+        tombstone = Tombstone.objects.get()
+        self.assertEqual(tombstone.user, project.user)
+        self.assertEqual(tombstone.model, "project")
+        self.assertEqual(tombstone.object_id, id)
+
+
+
+class ProjectBulkTests(TestCase):
+
+    def setUp(self):
+        self.user = mixer.blend(User)
+
+
+    def test_can_create_many(self):
+        projects = [Project(name=f"P{i}", color="#000000", user=self.user) for i in range(50)]
+        with self.assertNumQueries(1):
+            Project.create_many(projects)
+        self.assertEqual(len({project.id for project in projects}), 50)
+        self.assertEqual(self.user.projects.count(), 50)
+        self.assertTrue(all(project.updated_at for project in self.user.projects.all()))
+    
+
+    def test_can_update_many(self):
+        projects = [mixer.blend(Project, user=self.user) for _ in range(5)]
+        Project.objects.update(updated_at=0)
+        for project in projects: project.name = "X"
+        with self.assertNumQueries(1):
+            Project.update_many(projects, ["name"])
+        self.assertEqual(self.user.projects.filter(name="X", updated_at__gt=0).count(), 5)
+    
+
+    def test_can_delete_many(self):
+        projects = [mixer.blend(Project, user=self.user) for _ in range(5)]
+        # Savepoint, one tombstone INSERT, one DELETE, release
+        with self.assertNumQueries(4):
+            Project.delete_many(projects[:3])
+        self.assertEqual(set(self.user.projects.all()), set(projects[3:]))
+        self.assertEqual(
+            set(Tombstone.objects.values_list("object_id", flat=True)),
+            {project.id for project in projects[:3]}
+        )
@@ -0,0 +1,127 @@
+import re
+from django.db import connection
+from django.test import TestCase, RequestFactory
+from core.models import User, Project, ProjectCategory
+from core.schema import schema
+
+TABLES = ["slots", "projects", "project_categories", "tombstones"]
+
+OPERATIONS = [
+    "{ user { slots { name order user { email } } } }",
+    "{ user { projects { name category { name } user { email } } } }",
+    '{ user { projects(orderBy: "-name", excludeDone: true) { name } } }',
+    '{ user { projects(statusIn: [1, 2], orderBy: "status") { name } } }',
+    "{ user { projectsConnection(first: 1) { edges { cursor node { name } } } } }",
+    "{ user { projectGroups(first: 2) { status count projects { name } } } }",
+    "{ user { projectCategories { name order projects { name } } } }",
+    "{ user { project(id: 1) { name } } }",
+    """{ user { changes(since: 0) {
+        watermark slots { name order } projects { name category { name } }
+        projectCategories { name order } deletions { model id }
+    } } }""",
+    "mutation { reorderSlots(ids: [2, 1]) { slots { name order } } }",
+    'mutation { createSlot(name: "Slot 3") { slot { name order } } }',
+    'mutation { updateSlot(id: 1, name: "X") { slot { name order } } }',
+    "mutation { moveSlot(id: 1, index: 1) { slot { order } user { slots { name } } } }",
+    "mutation { deleteSlot(id: 1) { success } }",
+    """mutation { createProject(
+        name: "P" description: "D" status: 4 color: "#00ff00"
+    ) { project { name } } }""",
+    """mutation { updateProject(
+        id: 1, name: "P" description: "D" status: 4 color: "#00ff00"
+    ) { project { name } } }""",
+    "mutation { deleteProject(id: 1) { success } }",
+]
+
+def explain(sql, params):
+    """Returns a list of (table, problem) pairs for every full scan or sort of
+    a watched table in the database's plan for a query."""
+
+    problems = []
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+            table = None
+            for row in cursor.fetchall():
+                detail = row[-1]
+                match = re.match(r"(SCAN|SEARCH) (?:TABLE )?(\S+)", detail)
+                if match:
+                    table = match.group(2)
+                    if match.group(1) == "SCAN" and table in TABLES:
+                        problems.append((table, detail))
+                elif detail.startswith("USE TEMP B-TREE") and table in TABLES:
+                    problems.append((table, detail))
+        elif connection.vendor == "postgresql":
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute("EXPLAIN " + sql, params)
+            for (line,) in cursor.fetchall():
+                for table in TABLES:
+                    if f"Seq Scan on {table} " in line + " " or (
+                        "Sort Key:" in line and f"{table}." in line
+                    ):
+                        problems.append((table, line.strip()))
+    return problems
+
+
+
+class QueryPlanRegressionTests(TestCase):
+
+    fixtures = ["users.json", "slots.json", "projects.json"]
+
+    def setUp(self):
+        self.user = User.objects.get(email="jack@gmail.com")
+        category = ProjectCategory.objects.create(name="C", user=self.user)
+        Project.objects.filter(id=1).update(category=category)
+
+
+    def test_operations_dont_scan_or_sort_tables(self):
+        if connection.vendor not in ["sqlite", "postgresql"]:
+            self.skipTest(f"No EXPLAIN parser for {connection.vendor}")
+        for operation in OPERATIONS:
+            with self.subTest(operation=operation):
+                request = RequestFactory().post("/graphql")
+                request.user = self.user
+                self.selects = []
+                with connection.execute_wrapper(self.record_select):
+                    result = schema.execute(operation, context_value=request)
+                self.assertIsNone(result.errors)
+                self.assertTrue(self.selects)
+                for sql, params in self.selects:
+                    self.assertEqual(explain(sql, params), [], sql)
+
+
+    def test_poll_without_changes_is_one_query(self):
+        request = RequestFactory().post("/graphql")
+        request.user = self.user
+        self.selects = []
+        with connection.execute_wrapper(self.record_select):
+            result = schema.execute("""{ user { changes(since: 2000000000) {
+                slots { name } projects { name } deletions { id }
+            } } }""", context_value=request)
+        self.assertIsNone(result.errors)
+        self.assertEqual(len(self.selects), 1)
+        if connection.vendor in ["sqlite", "postgresql"]:
+            self.assertEqual(explain(*self.selects[0]), [])
+
+
+    def record_select(self, execute, sql, params, many, context):
+        """Keeps each SELECT, UPDATE and DELETE statement run, along with its
+        parameters."""
+
+        if sql.startswith(("SELECT", "UPDATE", "DELETE")):
+            self.selects.append((sql, params))
+        return execute(sql, params, many, context)
+
+
+    def test_harness_catches_scans_and_sorts(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("Plans only checked against sqlite")
+        self.assertEqual(
+            [table for table, _ in explain('SELECT * FROM "slots" WHERE "name" = %s', ["X"])],
+            ["slots"]
+        )
+        self.assertEqual(
+            [table for table, _ in explain(
+                'SELECT * FROM "projects" WHERE "user_id" = %s ORDER BY "color"', [1]
+            )], ["projects"]
+        )
@@ -0,0 +1,115 @@
+from unittest.mock import Mock
+from django.http import HttpRequest
+from django.utils.functional import SimpleLazyObject
+from mixer.backend.django import mixer
+from django.core.cache import cache
+from django.test import TestCase
+from core.models import User
+from core.responses import *
+
+class UserVersionTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+
+    def test_versions_stable_until_bumped(self):
+        version = user_version(1)
+        self.assertEqual(user_version(1), version)
+        self.assertNotEqual(user_version(2), version)
+        bump_user_version(1)
+        self.assertNotEqual(user_version(1), version)
+
+
+    def test_evicted_versions_replaced(self):
+        version = user_version(1)
+        cache.clear()
+        self.assertNotEqual(user_version(1), version)
+
+
+    def test_cache_keys(self):
+        key = response_cache_key(1, "{ user { name } }", None, None)
+        self.assertEqual(response_cache_key(1, "{ user { name } }", None, None), key)
+        self.assertNotEqual(response_cache_key(2, "{ user { name } }", None, None), key)
+        self.assertNotEqual(response_cache_key(1, "{ user { email } }", None, None), key)
+        self.assertNotEqual(response_cache_key(1, "{ user { name } }", {"a": 1}, None), key)
+        self.assertNotEqual(response_cache_key(1, "{ user { name } }", None, "Op"), key)
+        bump_user_version(1)
+        self.assertNotEqual(response_cache_key(1, "{ user { name } }", None, None), key)
+
+
+
+class MutationVersionMiddlewareTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = mixer.blend(User)
+        self.other = mixer.blend(User)
+        self.versions = {user.id: user_version(user.id) for user in [self.user, self.other]}
+        self.middleware = MutationVersionMiddleware()
+
+
+    def info(self, operation, path, user=None):
+        context = HttpRequest()
+        context.user = user
+        return Mock(operation=Mock(operation=operation), path=path, context=context)
+
+
+    def bumped(self):
+        return [user_id for user_id, version in self.versions.items()
+            if user_version(user_id) != version]
+
+
+    def test_queries_dont_bump(self):
+        result = self.middleware.resolve(
+            lambda root, info: 1, None, self.info("query", ["user"], self.user)
+        )
+        self.assertEqual(result, 1)
+        self.assertEqual(self.bumped(), [])
+
+
+    def test_mutations_bump_requesting_user(self):
+        self.middleware.resolve(
+            lambda root, info: 1, None, self.info("mutation", ["createSlot"], self.user)
+        )
+        self.assertEqual(self.bumped(), [self.user.id])
+
+
+    def test_mutations_bump_returned_user(self):
+        self.middleware.resolve(
+            lambda root, info: Mock(user=self.other), None, self.info("mutation", ["login"])
+        )
+        self.assertEqual(self.bumped(), [self.other.id])
+
+
+    def test_failed_mutations_bump(self):
+        def fail(root, info): raise ValueError
+        with self.assertRaises(ValueError):
+            self.middleware.resolve(fail, None, self.info("mutation", ["x"], self.user))
+        self.assertEqual(self.bumped(), [self.user.id])
+
+
+    def test_nested_mutation_fields_dont_bump(self):
+        self.middleware.resolve(
+            lambda root, info: 1, None, self.info("mutation", ["x", "slot"], self.user)
+        )
+        self.assertEqual(self.bumped(), [])
+
+
+    def test_requesting_user_not_looked_up_to_bump(self):
+        lookups = []
+        user = SimpleLazyObject(lambda: lookups.append(1) or self.user)
+        self.middleware.resolve(
+            lambda root, info: Mock(user=self.other), None, self.info("mutation", ["login"], user)
+        )
+        self.assertEqual(lookups, [])
+        self.assertEqual(self.bumped(), [self.other.id])
+
+
+    def test_looked_up_requesting_user_bumped(self):
+        user = SimpleLazyObject(lambda: self.user)
+        self.middleware.resolve(
+            lambda root, info: bool(info.context.user), None,
+            self.info("mutation", ["createSlot"], user)
+        )
+        self.assertEqual(self.bumped(), [self.user.id])
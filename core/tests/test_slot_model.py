@@ -1,27 +1,33 @@
+import time
+from io import StringIO
+from random import Random
 from mixer.backend.django import mixer
+from unittest.mock import patch
+from django.core.management import call_command
 from django.test import TestCase
-from core.models import User, Slot
+from django.db import transaction, IntegrityError
+from core.models import User, Slot, Tombstone
 
 class SlotCreationTests(TestCase):
 
     def test_can_create_slot(self):
         slot = Slot.objects.create(name="Slot 1", user=mixer.blend(User))
         self.assertNotEqual(slot.id, 1)
-        self.assertEqual(slot.order, 1)
+        self.assertEqual(slot.order, Slot.ORDER_STEP)
     
 
     def test_making_extra_slots_increases_order(self):
         user1, user2 = mixer.blend(User), mixer.blend(User)
         slot = mixer.blend(Slot, user=user1, order=None)
-        self.assertEqual(slot.order, 1)
+        self.assertEqual(slot.order, Slot.ORDER_STEP)
         slot = mixer.blend(Slot, user=user1, order=None)
-        self.assertEqual(slot.order, 2)
+        self.assertEqual(slot.order, 2 * Slot.ORDER_STEP)
         slot = mixer.blend(Slot, user=user2, order=None)
-        self.assertEqual(slot.order, 1)
+        self.assertEqual(slot.order, Slot.ORDER_STEP)
         slot = mixer.blend(Slot, user=user1, order=None)
-        self.assertEqual(slot.order, 3)
+        self.assertEqual(slot.order, 3 * Slot.ORDER_STEP)
         slot = mixer.blend(Slot, user=user2, order=None)
-        self.assertEqual(slot.order, 2)
+        self.assertEqual(slot.order, 2 * Slot.ORDER_STEP)
     
 
     def test_can_specify_slot_order(self):
@@ -32,13 +38,13 @@ class SlotCreationTests(TestCase):
     def test_order_only_set_on_creation(self):
         user1 = mixer.blend(User)
         slot = mixer.blend(Slot, user=user1, order=None)
-        self.assertEqual(slot.order, 1)
+        self.assertEqual(slot.order, Slot.ORDER_STEP)
         mixer.blend(Slot, user=user1, order=None)
         mixer.blend(Slot, user=user1, order=None)
         slot.name = "S"
         slot.save()
         slot.refresh_from_db()
-        self.assertEqual(slot.order, 1)
+        self.assertEqual(slot.order, Slot.ORDER_STEP)
 
 
 
@@ -55,56 +61,208 @@ class SlotOrderTests(TestCase):
 
 class SlotMovingTests(TestCase):
 
-    def test_can_move_to_current_position(self):
-        user = mixer.blend(User)
-        slots = [
-            mixer.blend(Slot, user=user, order=1),
-            mixer.blend(Slot, user=user, order=2),
-            mixer.blend(Slot, user=user, order=3),
-            mixer.blend(Slot, user=user, order=4),
-            mixer.blend(Slot, user=user, order=5),
-        ]
+    def setUp(self):
+        self.user = mixer.blend(User)
+        self.slots = [mixer.blend(Slot, user=self.user, order=None) for _ in range(5)]
         mixer.blend(Slot)
-        slots[2].move_to(2)
-        slots[2].refresh_from_db()
-        self.assertEqual(slots[2].order, 3)
+    
+
+    def assertSequence(self, *indices):
+        self.assertEqual(
+            list(self.user.slots.all()),
+            [self.slots[i] for i in indices]
+        )
+    
+
+    def test_can_move_to_current_position(self):
+        with self.assertNumQueries(1):
+            self.slots[2].move_to(2)
+        self.assertSequence(0, 1, 2, 3, 4)
     
 
     def test_can_move_to_right(self):
-        user = mixer.blend(User)
-        slots = [
-            mixer.blend(Slot, user=user, order=1),
-            mixer.blend(Slot, user=user, order=2),
-            mixer.blend(Slot, user=user, order=3),
-            mixer.blend(Slot, user=user, order=4),
-            mixer.blend(Slot, user=user, order=5),
-        ]
-        mixer.blend(Slot)
-        with self.assertNumQueries(2):
-            slots[1].move_to(3)
-        for slot in slots: slot.refresh_from_db()
-        self.assertEqual(slots[0].order, 1)
-        self.assertEqual(slots[1].order, 4)
-        self.assertEqual(slots[2].order, 2)
-        self.assertEqual(slots[3].order, 3)
-        self.assertEqual(slots[4].order, 5)
+        # One read, and one write in a savepoint
+        with self.assertNumQueries(4):
+            self.slots[1].move_to(3)
+        self.assertSequence(0, 2, 3, 1, 4)
+        for slot in self.slots: slot.refresh_from_db()
+        self.assertEqual(self.slots[0].order, Slot.ORDER_STEP)
+        self.assertEqual(self.slots[2].order, 3 * Slot.ORDER_STEP)
+        self.assertEqual(self.slots[1].order, int(4.5 * Slot.ORDER_STEP))
     
 
     def test_can_move_to_left(self):
-        user = mixer.blend(User)
-        slots = [
-            mixer.blend(Slot, user=user, order=1),
-            mixer.blend(Slot, user=user, order=2),
-            mixer.blend(Slot, user=user, order=3),
-            mixer.blend(Slot, user=user, order=4),
-            mixer.blend(Slot, user=user, order=5),
+        # One read, and one write in a savepoint
+        with self.assertNumQueries(4):
+            self.slots[4].move_to(0)
+        self.assertSequence(4, 0, 1, 2, 3)
+        self.slots[4].refresh_from_db()
+        self.assertEqual(self.slots[4].order, 0)
+    
+
+    def test_moving_before_start_moves_to_start(self):
+        self.slots[2].move_to(-2)
+        self.assertSequence(2, 0, 1, 3, 4)
+
+
+    def test_can_move_to_end(self):
+        # One read, and one write in a savepoint
+        with self.assertNumQueries(4):
+            self.slots[0].move_to(4)
+        self.assertSequence(1, 2, 3, 4, 0)
+        self.slots[0].refresh_from_db()
+        self.assertEqual(self.slots[0].order, 6 * Slot.ORDER_STEP)
+    
+
+    def test_moving_past_end_moves_to_end(self):
+        with self.assertNumQueries(5):
+            self.slots[0].move_to(100)
+        self.assertSequence(1, 2, 3, 4, 0)
+    
+
+    def test_full_gaps_are_spread_out(self):
+        for _ in range(40):
+            self.slots[4].move_to(1)
+            self.slots[3].move_to(1)
+        self.assertSequence(0, 3, 4, 1, 2)
+        orders = [slot.order for slot in self.user.slots.all()]
+        self.assertEqual(len(set(orders)), 5)
+    
+
+    def test_many_moves_never_share_orders(self):
+        random = Random(1)
+        for _ in range(300):
+            slot = random.choice(self.slots)
+            slot.refresh_from_db()
+            slot.move_to(random.randint(0, 4))
+        orders = list(self.user.slots.values_list("order", flat=True))
+        self.assertEqual(len(set(orders)), 5)
+        self.assertEqual(set(self.user.slots.all()), set(self.slots))
+    
+
+    def test_concurrent_moves_to_same_gap(self):
+        # Both moves read the same neighbours, so both want the same order
+        neighbours = self.slots[4].neighbours(1)
+        self.slots[3].move_to(1)
+        with patch.object(Slot, "neighbours", side_effect=[
+            neighbours, self.slots[4].neighbours(1)
+        ]):
+            self.slots[4].move_to(1)
+        self.assertSequence(0, 4, 3, 1, 2)
+        orders = [slot.order for slot in self.user.slots.all()]
+        self.assertEqual(len(set(orders)), 5)
+    
+
+    def test_orders_must_be_unique(self):
+        with self.assertRaises(IntegrityError):
+            with transaction.atomic():
+                mixer.blend(Slot, user=self.user, order=self.slots[0].order)
+
+
+
+class SlotSyncTests(TestCase):
+
+    def setUp(self):
+        self.user = mixer.blend(User)
+        self.slots = [mixer.blend(Slot, user=self.user, order=None) for _ in range(5)]
+        Slot.objects.update(updated_at=0)
+    
+
+    def updated(self):
+        return [slot.id in set(Slot.objects.filter(
+            updated_at__gt=0
+        ).values_list("id", flat=True)) for slot in self.slots]
+    
+
+    def test_saving_records_update_time(self):
+        self.slots[0].save()
+        self.slots[0].refresh_from_db()
+        self.assertLessEqual(abs(self.slots[0].updated_at - time.time()), 1)
+    
+
+    def test_moving_marks_only_moved_slot_updated(self):
+        with self.assertNumQueries(4):
+            self.slots[3].move_to(1)
+        self.assertEqual(self.updated(), [False, False, False, True, False])
+        self.slots[0].move_to(4)
+        self.assertEqual(self.updated(), [True, False, False, True, False])
+
+
+    def test_spreading_marks_every_slot_updated(self):
+        self.slots[0].spread()
+        self.assertEqual(self.updated(), [True, True, True, True, True])
+    
+
+    def test_deleting_leaves_tombstone(self):
+        id = self.slots[2].id
+        self.slots[2].delete()
+        tombstone = Tombstone.objects.get()
+        self.assertEqual(tombstone.user, self.user)
+        self.assertEqual(tombstone.model, "slot")
+        self.assertEqual(tombstone.object_id, id)
+        self.assertEqual(self.updated(), [False, False, False, False, False])
+
+    
+
+    def test_old_tombstones_pruned(self):
+        ids = [self.slots[0].id, self.slots[1].id]
+        self.slots[0].delete()
+        self.slots[1].delete()
+        Tombstone.objects.filter(object_id=ids[0]).update(deleted_at=1000)
+        out = StringIO()
+        call_command("prunetombstones", stdout=out)
+        self.assertEqual(out.getvalue(), "Deleted 1 tombstones\n")
+        self.assertEqual(Tombstone.objects.get().object_id, ids[1])
+
+
+
+class SlotBulkTests(TestCase):
+
+    def setUp(self):
+        self.user = mixer.blend(User)
+        self.slots = [mixer.blend(Slot, user=self.user, order=None) for _ in range(5)]
+        Slot.objects.update(updated_at=0)
+        for slot in self.slots: slot.refresh_from_db()
+
+
+    def test_created_slots_go_at_end(self):
+        slots = Slot.create_many([Slot(name=f"S{i}", user=self.user) for i in range(3)])
+        self.assertEqual(list(self.user.slots.all()), self.slots + slots)
+    
+
+    def stale_siblings(self):
+        """Returns what siblings() would have before the last slot was added,
+        followed by what it returns now."""
+
+        return [
+            self.user.slots.exclude(id=self.slots[-1].id), self.user.slots.all()
         ]
-        mixer.blend(Slot)
-        with self.assertNumQueries(2):
-            slots[4].move_to(0)
-        for slot in slots: slot.refresh_from_db()
-        self.assertEqual(slots[0].order, 2)
-        self.assertEqual(slots[1].order, 3)
-        self.assertEqual(slots[2].order, 4)
-        self.assertEqual(slots[3].order, 5)
-        self.assertEqual(slots[4].order, 1)
\ No newline at end of file
+    
+
+    def test_appending_retried_if_order_taken(self):
+        slot = Slot(name="New", user=self.user)
+        with patch.object(Slot, "siblings", side_effect=self.stale_siblings()):
+            slot.save()
+        self.assertEqual(list(self.user.slots.all()), self.slots + [slot])
+    
+
+    def test_creating_many_retried_if_order_taken(self):
+        slots = [Slot(name=f"S{i}", user=self.user) for i in range(2)]
+        with patch.object(Slot, "siblings", side_effect=self.stale_siblings()):
+            Slot.create_many(slots)
+        self.assertEqual(list(self.user.slots.all()), self.slots + slots)
+    
+
+    def test_deleting_many_leaves_other_slots_alone(self):
+        Slot.delete_many([self.slots[3], self.slots[1]])
+        self.assertFalse(self.user.slots.filter(updated_at__gt=0).exists())
+        self.assertEqual(Tombstone.objects.count(), 2)
+    
+
+    def test_can_reorder(self):
+        order = [self.slots[i] for i in [4, 1, 2, 0, 3]]
+        # Savepoint, one UPDATE, release
+        with self.assertNumQueries(3):
+            Slot.reorder(order)
+        self.assertEqual(list(self.user.slots.all()), order)
+        self.assertEqual(list(self.user.slots.filter(updated_at__gt=0)), order)
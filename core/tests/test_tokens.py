@@ -0,0 +1,72 @@
+import jwt
+import time
+from django.test import TestCase
+from core.tokens import *
+
+class TokenCodecTests(TestCase):
+
+    def setUp(self):
+        self.codec = TokenCodec("secret")
+
+
+    def test_tokens_round_trip(self):
+        token = self.codec.encode(23, 100, 1000000000000)
+        self.assertEqual(self.codec.decode(token), {
+            "sub": 23, "iat": 100, "expires": 1000000000000
+        })
+
+
+    def test_tokens_compatible_with_pyjwt(self):
+        token = self.codec.encode(23, 100, 1000000000000)
+        self.assertEqual(jwt.decode(token, "secret", algorithms=["HS256"]), {
+            "sub": 23, "iat": 100, "expires": 1000000000000
+        })
+        token = jwt.encode({
+            "expires": 1000000000000, "sub": 23, "iat": 100
+        }, "secret", algorithm="HS256").decode()
+        self.assertEqual(self.codec.decode(token)["sub"], 23)
+
+
+    def test_malformed_tokens_rejected(self):
+        token = self.codec.encode(23, 100, 1000000000000)
+        header, payload, signature = token.split(".")
+        for bad in [
+            None, b"", "", "sdsfsfd", "a.b.c", token + "." + signature,
+            token + "A" * 600, f"{header}.{payload}", f"{header}.{payload}.{signature}A",
+            f"{header}.{payload}.{signature[:-1]}!",
+            jwt.encode({"sub": 23}, "secret", algorithm="HS512").decode(),
+            jwt.encode({"sub": 23}, None, algorithm="none").decode(),
+        ]:
+            with self.assertRaises(MalformedToken, msg=bad):
+                self.codec.decode(bad)
+
+
+    def test_bad_signatures_rejected(self):
+        with self.assertRaises(BadSignature):
+            self.codec.decode(TokenCodec("other").encode(23, 100, 1000000000000))
+        token = self.codec.encode(23, 100, 1000000000000)
+        header, payload, signature = token.split(".")
+        other_payload = self.codec.encode(24, 100, 1000000000000).split(".")[1]
+        with self.assertRaises(BadSignature):
+            self.codec.decode(f"{header}.{other_payload}.{signature}")
+
+
+    def test_invalid_claims_rejected(self):
+        for claims in [{"sub": 23}, {"sub": "23", "iat": 1, "expires": 2}]:
+            token = jwt.encode(claims, "secret", algorithm="HS256").decode()
+            with self.assertRaises(InvalidClaims):
+                self.codec.decode(token)
+
+
+    def test_expired_tokens_rejected(self):
+        token = self.codec.encode(23, 100, 200)
+        with self.assertRaises(ExpiredToken):
+            self.codec.decode(token)
+        self.assertEqual(self.codec.decode(token, now=150)["sub"], 23)
+        with self.assertRaises(ExpiredToken):
+            self.codec.decode(token, now=200)
+
+
+    def test_failures_share_base_class(self):
+        for error in [MalformedToken, BadSignature, InvalidClaims, ExpiredToken]:
+            self.assertTrue(issubclass(error, TokenError))
@@ -1,13 +1,16 @@
 import jwt
 import time
 import os
+from unittest.mock import patch
 from mixer.backend.django import mixer
 from django.test import TestCase
+from django.test.utils import override_settings
 from django.db.utils import IntegrityError
 from django.db import transaction
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.conf import settings
-from core.models import User
+from core.models import User, Slot
+from core.cache import verified_tokens
 
 class UserCreationTests(TestCase):
 
@@ -38,6 +41,40 @@ class UserCreationTests(TestCase):
 
 
 
+class UserWithSlotsCreationTests(TestCase):
+
+    def test_can_create_user_with_slots(self):
+        user = User(email="john@gmail.com", name="John Locke")
+        with self.assertNumQueries(4):
+            slots = user.create_with_slots(["Work", "Personal", "Other"])
+        self.assertLess(abs(time.time() - user.creation_time), 1)
+        self.assertEqual(list(user.slots.all()), slots)
+        self.assertEqual([slot.order for slot in slots], [
+            Slot.ORDER_STEP, Slot.ORDER_STEP * 2, Slot.ORDER_STEP * 3
+        ])
+        self.assertTrue(all(slot.updated_at == user.creation_time for slot in slots))
+    
+
+    def test_ids_given_before_saving(self):
+        user = User(email="john@gmail.com", name="John Locke")
+        id = user.id
+        slots = user.create_with_slots(["Work", "Personal"])
+        self.assertEqual(user.id, id)
+        self.assertEqual(User.objects.get(id=id), user)
+        self.assertEqual([slot.user_id for slot in slots], [id, id])
+        self.assertLess(slots[0].id, slots[1].id)
+    
+
+    def test_failing_to_save_saves_nothing(self):
+        mixer.blend(User, email="john@gmail.com")
+        user = User(email="john@gmail.com", name="John Locke")
+        with self.assertRaises(IntegrityError):
+            user.create_with_slots(["Work", "Personal"])
+        self.assertEqual(User.objects.count(), 1)
+        self.assertEqual(Slot.objects.count(), 0)
+
+
+
 class UserOrderingTests(TestCase):
 
     def test_users_ordered_by_creation_time(self):
@@ -57,6 +94,34 @@ class UserPasswordTests(TestCase):
         self.assertNotEqual(user.password, "sw0rdfish")
         algorithm, iterations, salt, hash_ = user.password.split("$")
         self.assertGreaterEqual(int(iterations), 100000)
+    
+
+    @override_settings(PASSWORD_ITERATIONS=1000)
+    def test_iterations_come_from_settings(self):
+        user = mixer.blend(User)
+        user.set_password("sw0rdfish123")
+        self.assertEqual(user.password.split("$")[1], "1000")
+    
+
+    def test_can_check_password(self):
+        user = mixer.blend(User)
+        user.set_password("sw0rdfish123")
+        password = user.password
+        self.assertTrue(user.check_password("sw0rdfish123"))
+        self.assertFalse(user.check_password("sw0rdfish124"))
+        self.assertEqual(user.password, password)
+    
+
+    def test_outdated_hashes_upgraded_on_check(self):
+        user = mixer.blend(User)
+        with override_settings(PASSWORD_ITERATIONS=1000):
+            user.set_password("sw0rdfish123")
+        self.assertFalse(user.check_password("sw0rdfish124"))
+        self.assertEqual(user.password.split("$")[1], "1000")
+        with override_settings(PASSWORD_ITERATIONS=2000):
+            self.assertTrue(user.check_password("sw0rdfish123"))
+        self.assertEqual(user.password.split("$")[1], "2000")
+        self.assertTrue(user.check_password("sw0rdfish123"))
 
 
 
@@ -85,6 +150,7 @@ class UserFromTokenTests(TestCase):
 
     def setUp(self):
         self.user = mixer.blend(User)
+        verified_tokens.clear()
 
 
     def test_no_token_returns_no_user(self):
@@ -114,4 +180,42 @@ class UserFromTokenTests(TestCase):
             "sub": self.user.id, "expires": 1000000000000, "iat": 100
         }, settings.SECRET_KEY, algorithm="HS256").decode()
         self.assertEqual(User.from_token(token), self.user)
-        
\ No newline at end of file
+        
+    
+
+    def test_verified_token_not_decoded_again(self):
+        token = self.user.make_access_jwt()
+        self.assertEqual(User.from_token(token), self.user)
+        with patch("core.models.token_codec.decode") as decode:
+            self.assertEqual(User.from_token(token), self.user)
+            self.assertFalse(decode.called)
+        self.assertEqual((verified_tokens.hits, verified_tokens.misses), (1, 1))
+    
+
+    def test_verified_token_user_looked_up_by_id(self):
+        token = self.user.make_access_jwt()
+        User.from_token(token)
+        User.objects.filter(id=self.user.id).update(name="Kate")
+        with self.assertNumQueries(1):
+            self.assertEqual(User.from_token(token).name, "Kate")
+        User.objects.filter(id=self.user.id).delete()
+        self.assertIsNone(User.from_token(token))
+    
+
+    def test_changing_user_forgets_tokens(self):
+        token = self.user.make_access_jwt()
+        User.from_token(token)
+        self.user.name = "Kate"
+        self.user.save()
+        self.assertIsNone(verified_tokens.get(token))
+        User.from_token(token)
+        self.user.set_password("sw0rdfish123")
+        self.assertIsNone(verified_tokens.get(token))
+    
+
+    def test_deleting_user_forgets_tokens(self):
+        token = self.user.make_access_jwt()
+        User.from_token(token)
+        self.user.delete()
+        self.assertEqual(len(verified_tokens), 0)
+        self.assertIsNone(User.from_token(token))
@@ -1,11 +1,33 @@
 import json
+import asyncio
+from asgiref.sync import sync_to_async
 from graphql.error import GraphQLLocatedError, GraphQLError
 from graphene_django.views import GraphQLView
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.exception import convert_exception_to_response
+from django.db import close_old_connections
+from django.http import HttpResponseNotModified, JsonResponse
 from django.urls import path
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+from django.utils.module_loading import import_string
+from core.backend import document_backend
+from core.responses import response_cache_key, response_etag
+from core.events import broker, EventStreamResponse
+from core.middleware import token_user_id
+from core.models import User
 
 class ReadableErrorGraphQLView(GraphQLView):
     """A custom GraphQLView which stops Python error messages being sent to
-    the user unless they were explicitly raised."""
+    the user unless they were explicitly raised.
+
+    Successful query responses for a logged in user are cached against the
+    user's data version, which every mutation bumps, so asking the same
+    question again skips execution entirely until something changes. Those
+    responses carry an ETag - whether or not response caching is on - and
+    clients sending it back in If-None-Match get an empty 304 response if the
+    answer would be the same."""
 
     @staticmethod
     def format_error(error):
@@ -17,6 +39,145 @@ class ReadableErrorGraphQLView(GraphQLView):
         return GraphQLView.format_error(error)
 
 
+    def dispatch(self, request, *args, **kwargs):
+        request.response_cache_key = None
+        response = GraphQLView.dispatch(self, request, *args, **kwargs)
+        if request.response_cache_key and response.status_code == 200:
+            etag = response_etag(response.content)
+            if etag in parse_etags(request.META.get("HTTP_IF_NONE_MATCH", "")):
+                response = HttpResponseNotModified()
+            response["ETag"] = etag
+            response["Cache-Control"] = "private, no-cache"
+            patch_vary_headers(response, ["Authorization"])
+        return response
+
+
+    def get_response(self, request, data, show_graphiql=False):
+        """Returns the cached response to a query if there is one. Otherwise
+        the query is executed, and the response cached if it can be and
+        response caching is on."""
+
+        key = self.get_cache_key(request, data)
+        if key is None:
+            return GraphQLView.get_response(self, request, data, show_graphiql)
+        result = cache.get(key) if settings.RESPONSE_CACHE_TIMEOUT else None
+        if result is None:
+            result, status_code = GraphQLView.get_response(
+                self, request, data, show_graphiql
+            )
+            if status_code != 200 or request.graphql_errors or getattr(
+                request, "refresh_token", None
+            ) is not None:
+                return result, status_code
+            if settings.RESPONSE_CACHE_TIMEOUT:
+                cache.set(key, result, settings.RESPONSE_CACHE_TIMEOUT)
+        request.response_cache_key = key
+        return result, 200
+
+
+    def get_cache_key(self, request, data):
+        """Returns the key the response to a request would be cached under, or
+        None if it can't be cached - because it isn't a query, or because there
+        is no user to cache it for. The user's ID comes from their access
+        token, so working out the key never looks the user up."""
+
+        query, variables, operation_name, id = self.get_graphql_params(request, data)
+        if self.batch or not query: return None
+        try:
+            document = self.get_backend(request).document_from_string(self.schema, query)
+            if document.get_operation_type(operation_name) != "query": return None
+        except Exception: return None
+        user_id = token_user_id(request)
+        if user_id is None: return None
+        return response_cache_key(user_id, query, variables, operation_name)
+
+
+    def execute_graphql_request(self, request, *args, **kwargs):
+        result = GraphQLView.execute_graphql_request(self, request, *args, **kwargs)
+        request.graphql_errors = bool(result and result.errors)
+        return result
+
+
+
+class AsyncView:
+    """Wraps a synchronous view for core.asgi.
+
+    Views and the ORM are synchronous, so each request is handed to a pool of
+    worker threads, passing through the project's other middleware on the
+    way. The event loop is left free to accept connections and read request
+    bodies while the workers wait on the database. Database connections are
+    closed after each request, as Django's request_finished signal - which
+    normally does this - is never sent here."""
+
+    def __init__(self, view):
+        handler = convert_exception_to_response(view)
+        for middleware in reversed(settings.MIDDLEWARE):
+            if middleware != "core.middleware.AuthenticationMiddleware":
+                handler = convert_exception_to_response(
+                    import_string(middleware)(handler)
+                )
+        self.handler = handler
+
+
+    def handle(self, request):
+        close_old_connections()
+        try:
+            return self.handler(request)
+        finally:
+            close_old_connections()
+
+
+    async def __call__(self, request):
+        return await sync_to_async(self.handle, thread_sensitive=False)(request)
+
+
+
+class AsyncGraphQLView(AsyncView):
+    """An async counterpart to ReadableErrorGraphQLView, for core.asgi."""
+
+    def __init__(self, **kwargs):
+        AsyncView.__init__(self, ReadableErrorGraphQLView.as_view(**kwargs))
+
+
+
+class ChangeStreamView(AsyncView):
+    """Streams notifications of changes to the requesting user's slots,
+    projects and project categories as server-sent events, for core.asgi, so
+    that clients can ask for the changes when there are some rather than
+    polling for them.
+
+    The user is looked up on a worker thread, after which the stream is just a
+    subscription on the event loop - an idle stream costs a socket and a
+    queue, not a thread. A comment is sent every so often so that proxies
+    don't close idle streams. Browsers can't send an Authorization header
+    with an EventSource, so the refresh token cookie is accepted too."""
+
+    def __init__(self, heartbeat=None):
+        AsyncView.__init__(self, self.view)
+        self.heartbeat = heartbeat or settings.EVENT_STREAM_HEARTBEAT
+
+
+    def view(self, request):
+        user = request.user or User.from_token(request.COOKIES.get("refresh_token", ""))
+        if not user: return JsonResponse({"error": "Not authorized"}, status=401)
+        return EventStreamResponse(self.events(user.id))
+
+
+    async def events(self, user_id):
+        """Yields each event sent to the user, or None whenever there has been
+        none for a heartbeat's length. Nothing is subscribed to until the
+        stream starts, on the event loop, and a first None is yielded as soon
+        as it has been."""
+
+        with broker.subscribe(user_id) as subscription:
+            yield None
+            while True:
+                try:
+                    yield await asyncio.wait_for(subscription.get(), self.heartbeat)
+                except asyncio.TimeoutError: yield None
+
+
+
 urlpatterns = [
-    path("graphql", ReadableErrorGraphQLView.as_view()),
+    path("graphql", ReadableErrorGraphQLView.as_view(backend=document_backend)),
 ]
\ No newline at end of file
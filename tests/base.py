@@ -4,8 +4,10 @@ import kirjava
 from datetime import datetime
 from unittest.mock import Mock, patch
 from django.test.utils import override_settings
+from django.core.cache import cache
 from django.contrib.staticfiles.testing import StaticLiveServerTestCase
 from core.models import User
+from core.logins import last_logins
 
 class FunctionalTest(StaticLiveServerTestCase):
 
@@ -14,6 +16,8 @@ class FunctionalTest(StaticLiveServerTestCase):
     ]
 
     def setUp(self):
+        cache.clear()
+        self.addCleanup(last_logins.clear)
         self.user = User.objects.get(email="jack@gmail.com")
         self.user.set_password("livetogetha")
         self.client = kirjava.Client(self.live_server_url + "/graphql")
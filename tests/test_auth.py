@@ -6,9 +6,11 @@ import json
 import time
 import os
 from django.conf import settings
+from django.test.utils import override_settings
 from django.contrib.auth.hashers import check_password
 from .base import FunctionalTest, TokenFunctionaltest
 from core.models import User
+from core.logins import last_logins
 
 class SignupTests(FunctionalTest):
 
@@ -131,9 +133,26 @@ class LoginTests(FunctionalTest):
         self.assertLess(time.time() - payload["iat"], 10)
         self.assertLess(time.time() - payload["expires"] - 31536000, 10)
 
-        # Last login has been updated
+        # Last login has been updated, once the buffered logins are written
+        self.user.refresh_from_db()
+        self.assertIsNone(self.user.last_login)
+        last_logins.flush()
         self.user.refresh_from_db()
         self.assertLess(time.time() - self.user.last_login, 10)
+
+
+    def test_login_upgrades_outdated_password_hash(self):
+        with override_settings(PASSWORD_ITERATIONS=1000):
+            self.user.set_password("livetogetha")
+        result = self.client.execute("""mutation { login(
+            email: "jack@gmail.com", password: "livetogetha",
+        ) { accessToken } }""")
+        self.assertIn("accessToken", result["data"]["login"])
+        self.user.refresh_from_db()
+        self.assertEqual(
+            self.user.password.split("$")[1], str(settings.PASSWORD_ITERATIONS)
+        )
+        self.assertTrue(check_password("livetogetha", self.user.password))
     
 
     def test_login_can_fail(self):
@@ -346,6 +365,17 @@ class UserModificationTests(TokenFunctionaltest):
         self.assertEqual(self.user.name, "Dr Jack")
     
 
+    def test_can_update_some_user_info(self):
+        result = self.client.execute("""mutation { updateUser(name: "Dr Jack") {
+            user { email name }
+        } }""")
+        self.assertEqual(result["data"]["updateUser"]["user"], {
+            "email": "jack@gmail.com", "name": "Dr Jack",
+        })
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password("livetogetha"))
+    
+
     def test_cant_edit_user_when_not_logged_in(self):
         del self.client.headers["Authorization"]
         self.check_query_error("""mutation { updateUser(
@@ -1,5 +1,8 @@
+import os
+import json
+from contextlib import redirect_stderr
 from .base import FunctionalTest, TokenFunctionaltest
-from core.models import Project
+from core.models import Project, ProjectCategory
 
 class ProjectQueryTests(TokenFunctionaltest):
 
@@ -82,6 +85,19 @@ class ProjectMutationTests(TokenFunctionaltest):
         })
     
 
+    def test_can_edit_some_project_fields(self):
+        result = self.client.execute("""mutation { updateProject(id: 1, status: 6) {
+            project { name description color status }
+        } }""")
+        self.assertEqual(result["data"]["updateProject"]["project"], {
+            "name": "Get Rescued", "description": "Get everybody home",
+            "status": 6, "color": "#0000ff"
+        })
+        self.check_query_error("""mutation { updateProject(id: 1, name: "") {
+            project { name }
+        } }""", message="required")
+    
+
     def test_project_editing_validation(self):
         # Project must exist
         self.check_query_error("""mutation { updateProject(
@@ -128,4 +144,296 @@ class ProjectMutationTests(TokenFunctionaltest):
         del self.client.headers["Authorization"]
         self.check_query_error(
             """mutation { deleteProject(id: 1) { success } }""", message="Not authorized"
-        )
\ No newline at end of file
+        )
+
+
+
+class BulkProjectMutationTests(TokenFunctionaltest):
+
+    def get_item_errors(self, query):
+        """Sends a query which should fail, and returns the errors it gives
+        for each item."""
+
+        with open(os.devnull, "w") as fnull:
+            with redirect_stderr(fnull):
+                result = self.client.execute(query)
+        return json.loads(result["errors"][0]["message"])
+    
+
+    def test_can_create_projects(self):
+        category = ProjectCategory.objects.create(name="C", user=self.user)
+        result = self.client.execute("""mutation($category: ID) { createProjects(projects: [
+            {name: "P1", description: "1", status: 4, color: "#00ff00"},
+            {name: "P2", description: "2", status: 1, color: "#ff0000", category: $category}
+        ]) { projects { name status category { name } } } }""", variables={
+            "category": category.id
+        })
+        self.assertEqual(result["data"]["createProjects"]["projects"], [
+            {"name": "P1", "status": 4, "category": None},
+            {"name": "P2", "status": 1, "category": {"name": "C"}},
+        ])
+        self.assertEqual(self.user.projects.filter(name__in=["P1", "P2"]).count(), 2)
+    
+
+    def test_project_creation_is_all_or_nothing(self):
+        projects_at_start = Project.objects.count()
+        errors = self.get_item_errors("""mutation { createProjects(projects: [
+            {name: "P1", description: "1", status: 4, color: "#00ff00"},
+            {name: "P2", description: "2", status: 1, color: "#ff0000", category: 1},
+            {name: "P3", description: "3", status: 9, color: "#ff0000"}
+        ]) { projects { name } } }""")
+        self.assertEqual(set(errors), {"1", "2"})
+        self.assertIn("category", errors["1"])
+        self.assertIn("status", errors["2"])
+        self.assertEqual(Project.objects.count(), projects_at_start)
+    
+
+    def test_can_update_projects(self):
+        result = self.client.execute("""mutation { updateProjects(projects: [
+            {id: 1, name: "X", description: "x", status: 6, color: "#000000"},
+            {id: 2, name: "Y", description: "y", status: 5, color: "#111111"}
+        ]) { projects { name status } } }""")
+        self.assertEqual(result["data"]["updateProjects"]["projects"], [
+            {"name": "X", "status": 6}, {"name": "Y", "status": 5}
+        ])
+        self.assertEqual(Project.objects.get(id=2).color, "#111111")
+    
+
+    def test_updating_projects_keeps_categories_not_given(self):
+        categories = [
+            ProjectCategory.objects.create(name=name, user=self.user) for name in "CD"
+        ]
+        Project.objects.filter(id__in=[1, 2]).update(category=categories[0])
+        result = self.client.execute("""mutation($category: ID) { updateProjects(projects: [
+            {id: 1, name: "X", description: "x", status: 6, color: "#000000"},
+            {id: 2, name: "Y", description: "y", status: 5, color: "#111111", category: $category}
+        ]) { projects { name category { name } } } }""", variables={
+            "category": categories[1].id
+        })
+        self.assertEqual(result["data"]["updateProjects"]["projects"], [
+            {"name": "X", "category": {"name": "C"}}, {"name": "Y", "category": {"name": "D"}}
+        ])
+        self.assertEqual(Project.objects.get(id=1).category, categories[0])
+        self.assertEqual(Project.objects.get(id=2).category, categories[1])
+    
+
+    def test_cant_update_invalid_projects(self):
+        errors = self.get_item_errors("""mutation { updateProjects(projects: [
+            {id: 1, name: "X", description: "x", status: 6, color: "#000000"},
+            {id: 3, name: "Y", description: "y", status: 5, color: "#111111"},
+            {id: 1, name: "Z", description: "z", status: 5, color: "#111111"}
+        ]) { projects { name status } } }""")
+        self.assertEqual(errors, {
+            "1": {"project": ["Does not exist"]},
+            "2": {"project": ["Given more than once"]}
+        })
+        self.assertEqual(Project.objects.get(id=1).name, "Get Rescued")
+    
+
+    def test_can_delete_projects(self):
+        result = self.client.execute("""mutation { deleteProjects(ids: [1, 2]) { success } }""")
+        self.assertTrue(result["data"]["deleteProjects"]["success"])
+        self.assertEqual(self.user.projects.count(), 0)
+        self.assertEqual(self.user.tombstones.count(), 2)
+    
+
+    def test_cant_delete_invalid_projects(self):
+        errors = self.get_item_errors("""mutation { deleteProjects(ids: [1, 3, 5]) { success } }""")
+        self.assertEqual(set(errors), {"1", "2"})
+        self.assertEqual(self.user.projects.count(), 2)
+    
+
+    def test_bulk_project_protection(self):
+        del self.client.headers["Authorization"]
+        self.check_query_error(
+            """mutation { deleteProjects(ids: [1]) { success } }""", message="Not authorized"
+        )
+        self.check_query_error("""mutation { createProjects(projects: [
+            {name: "P1", description: "1", status: 4, color: "#00ff00"}
+        ]) { projects { name } } }""", message="Not authorized")
+
+
+
+class ProjectCategoryMutationTests(TokenFunctionaltest):
+
+    def test_can_reorder_project_categories(self):
+        categories = [ProjectCategory.objects.create(
+            name=name, user=self.user, id=id
+        ) for id, name in [(1, "A"), (2, "B"), (3, "C")]]
+        result = self.client.execute("""mutation {
+            reorderProjectCategories(ids: [2, 3, 1]) { projectCategories { name order } }
+        }""")
+        self.assertEqual(result["data"]["reorderProjectCategories"]["projectCategories"], [
+            {"name": "B", "order": 1}, {"name": "C", "order": 2}, {"name": "A", "order": 3}
+        ])
+        self.assertEqual(
+            list(self.user.project_categories.values_list("name", flat=True)), ["B", "C", "A"]
+        )
+        self.check_query_error("""mutation {
+            reorderProjectCategories(ids: [2, 3]) { projectCategories { name } }
+        }""", message="exactly once")
+
+
+
+class ProjectConnectionTests(TokenFunctionaltest):
+
+    def setUp(self):
+        TokenFunctionaltest.setUp(self)
+        Project.objects.filter(user=self.user).update(creation_time=100)
+        for i in range(5):
+            Project.objects.create(
+                name=f"P{i}", color="#000000", user=self.user, creation_time=200 + i
+            )
+    
+
+    def get_page(self, first, after=None):
+        after = f', after: "{after}"' if after else ""
+        result = self.client.execute("""{ user { projectsConnection(first: %i%s) {
+            edges { cursor node { name } } pageInfo { hasNextPage endCursor }
+        } } }""" % (first, after))
+        return result["data"]["user"]["projectsConnection"]
+
+
+    def test_can_page_through_projects(self):
+        names, after = [], None
+        while True:
+            page = self.get_page(2, after)
+            self.assertLessEqual(len(page["edges"]), 2)
+            names += [edge["node"]["name"] for edge in page["edges"]]
+            after = page["pageInfo"]["endCursor"]
+            if not page["pageInfo"]["hasNextPage"]: break
+        self.assertEqual(names, [
+            "Get Rescued", "Neutralise Others", "P0", "P1", "P2", "P3", "P4"
+        ])
+    
+
+    def test_can_get_single_page(self):
+        page = self.get_page(10)
+        self.assertEqual(len(page["edges"]), 7)
+        self.assertFalse(page["pageInfo"]["hasNextPage"])
+        self.assertEqual(page["pageInfo"]["endCursor"], page["edges"][-1]["cursor"])
+    
+
+    def test_invalid_cursor(self):
+        self.check_query_error("""{ user { projectsConnection(after: "xyz") {
+            edges { node { name } }
+        } } }""", message="Invalid cursor")
+
+
+
+class ProjectFilteringTests(TokenFunctionaltest):
+
+    def setUp(self):
+        TokenFunctionaltest.setUp(self)
+        Project.objects.filter(user=self.user).update(creation_time=100)
+        self.category = ProjectCategory.objects.create(name="C", user=self.user)
+        Project.objects.create(
+            name="Build Raft", color="#000000", user=self.user, creation_time=200,
+            status=6, category=self.category
+        )
+        Project.objects.create(
+            name="Find Hatch", color="#000000", user=self.user, creation_time=300,
+            status=5
+        )
+    
+
+    def get_projects(self, arguments=""):
+        result = self.client.execute(
+            "{ user { projects%s { name } } }" % arguments
+        )
+        return [project["name"] for project in result["data"]["user"]["projects"]]
+    
+
+    def test_done_projects_shown_by_default(self):
+        self.assertEqual(self.get_projects(), [
+            "Get Rescued", "Neutralise Others", "Build Raft", "Find Hatch"
+        ])
+    
+
+    def test_done_projects_hidden_if_user_hides_them(self):
+        self.user.show_done_projects = False
+        self.user.save()
+        self.assertEqual(self.get_projects(), ["Get Rescued", "Neutralise Others"])
+        self.assertEqual(self.get_projects("(excludeDone: false)"), [
+            "Get Rescued", "Neutralise Others", "Build Raft", "Find Hatch"
+        ])
+    
+
+    def test_can_exclude_done_projects(self):
+        self.assertEqual(
+            self.get_projects("(excludeDone: true)"), ["Get Rescued", "Neutralise Others"]
+        )
+        self.assertEqual(
+            self.get_projects("(excludeDone: true, statusIn: [1, 6])"), ["Neutralise Others"]
+        )
+    
+
+    def test_can_filter_by_status(self):
+        self.assertEqual(self.get_projects("(statusIn: [2, 5])"), [
+            "Get Rescued", "Find Hatch"
+        ])
+        self.assertEqual(self.get_projects("(statusIn: [])"), [])
+    
+
+    def test_can_filter_by_category(self):
+        self.assertEqual(
+            self.get_projects("(category: %s)" % self.category.id), ["Build Raft"]
+        )
+    
+
+    def test_can_order_projects(self):
+        self.assertEqual(self.get_projects('(orderBy: "-name")'), [
+            "Neutralise Others", "Get Rescued", "Find Hatch", "Build Raft"
+        ])
+        self.assertEqual(self.get_projects('(orderBy: "-creationTime")'), [
+            "Find Hatch", "Build Raft", "Neutralise Others", "Get Rescued"
+        ])
+        self.assertEqual(self.get_projects('(orderBy: "status")'), [
+            "Neutralise Others", "Get Rescued", "Find Hatch", "Build Raft"
+        ])
+        self.check_query_error(
+            '{ user { projects(orderBy: "color") { name } } }', message="Must be one of"
+        )
+
+
+
+class ProjectGroupTests(TokenFunctionaltest):
+
+    def setUp(self):
+        TokenFunctionaltest.setUp(self)
+        Project.objects.filter(user=self.user).update(creation_time=100)
+        for i in range(4):
+            Project.objects.create(
+                name=f"P{i}", color="#000000", user=self.user,
+                creation_time=200 - i, status=6
+            )
+    
+
+    def test_can_get_project_groups(self):
+        result = self.client.execute("""{ user { projectGroups(first: 3) {
+            status name count projects { name }
+        } } }""")
+        self.assertEqual(result["data"]["user"]["projectGroups"], [
+            {"status": 1, "name": "Active", "count": 1, "projects": [
+                {"name": "Neutralise Others"}
+            ]},
+            {"status": 2, "name": "Maintenance", "count": 1, "projects": [
+                {"name": "Get Rescued"}
+            ]},
+            {"status": 3, "name": "On Hold", "count": 0, "projects": []},
+            {"status": 4, "name": "Not Started", "count": 0, "projects": []},
+            {"status": 5, "name": "Abandoned", "count": 0, "projects": []},
+            {"status": 6, "name": "Completed", "count": 4, "projects": [
+                {"name": "P3"}, {"name": "P2"}, {"name": "P1"}
+            ]},
+        ])
+    
+
+    def test_project_groups_can_be_filtered(self):
+        result = self.client.execute("""{ user { projectGroups(excludeDone: true) {
+            status count
+        } } }""")
+        self.assertEqual(result["data"]["user"]["projectGroups"], [
+            {"status": 1, "count": 1}, {"status": 2, "count": 1},
+            {"status": 3, "count": 0}, {"status": 4, "count": 0}
+        ])
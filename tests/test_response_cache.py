@@ -0,0 +1,104 @@
+import os
+from contextlib import redirect_stderr
+from unittest.mock import patch
+from django.test.utils import override_settings
+from .base import TokenFunctionaltest
+from core.urls import ReadableErrorGraphQLView
+from core.models import Slot
+
+class ResponseTest(TokenFunctionaltest):
+
+    def post(self, query, variables=None, etag=None):
+        headers = dict(self.client.headers)
+        if etag: headers["If-None-Match"] = etag
+        with open(os.devnull, "w") as fnull:
+            with redirect_stderr(fnull):
+                return self.client.session.post(self.live_server_url + "/graphql", json={
+                    "query": query, "variables": variables
+                }, headers=headers)
+
+
+
+@override_settings(RESPONSE_CACHE_TIMEOUT=300)
+class ResponseCacheTests(ResponseTest):
+
+    def test_repeated_queries_not_executed_again(self):
+        with patch.object(
+            ReadableErrorGraphQLView, "execute_graphql_request",
+            side_effect=ReadableErrorGraphQLView.execute_graphql_request,
+            autospec=True
+        ) as execute:
+            first = self.client.execute("{ user { slots { name } } }")
+            second = self.client.execute("{ user { slots { name } } }")
+            self.assertEqual(first, second)
+            self.assertEqual(execute.call_count, 1)
+            self.client.execute("{ user { name } }")
+            self.assertEqual(execute.call_count, 2)
+    
+
+    def test_variables_cached_separately(self):
+        query = "query($id: ID!) { user { project(id: $id) { name } } }"
+        first = self.post(query, {"id": 1}).json()
+        second = self.post(query, {"id": 2}).json()
+        self.assertEqual(first["data"]["user"]["project"]["name"], "Get Rescued")
+        self.assertEqual(second["data"]["user"]["project"]["name"], "Neutralise Others")
+    
+
+    def test_mutations_invalidate_cached_responses(self):
+        self.client.execute("{ user { slots { name } } }")
+        self.client.execute('mutation { createSlot(name: "Slot 3") { slot { name } } }')
+        result = self.client.execute("{ user { slots { name } } }")
+        self.assertEqual(len(result["data"]["user"]["slots"]), 3)
+    
+
+    def test_errors_not_cached(self):
+        self.check_query_error("{ user { project(id: 99) { name } } }", "Does not exist")
+        response = self.post("{ user { project(id: 99) { name } } }")
+        self.assertNotIn("ETag", response.headers)
+    
+
+    def test_unchanged_responses_not_modified(self):
+        response = self.post("{ user { slots { name } } }")
+        etag = response.headers["ETag"]
+        self.assertEqual(response.headers["Cache-Control"], "private, no-cache")
+        self.assertIn("Authorization", response.headers["Vary"])
+
+        response = self.post("{ user { slots { name } } }", etag=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response.headers["ETag"], etag)
+
+        self.client.execute('mutation { createSlot(name: "Slot 3") { slot { name } } }')
+        response = self.post("{ user { slots { name } } }", etag=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+        self.assertEqual(len(response.json()["data"]["user"]["slots"]), 3)
+    
+
+    def test_mutations_and_anonymous_requests_have_no_etag(self):
+        response = self.post('mutation { createSlot(name: "Slot 3") { slot { name } } }')
+        self.assertNotIn("ETag", response.headers)
+        del self.client.headers["Authorization"]
+        response = self.post("{ user { name } }")
+        self.assertNotIn("ETag", response.headers)
+
+
+
+class DisabledResponseCacheTests(ResponseTest):
+
+    def test_responses_not_cached_with_process_local_cache(self):
+        query = "{ user { slots { name } } }"
+        self.client.execute(query)
+        Slot.objects.filter(id=1).update(name="Changed")
+        result = self.client.execute(query)
+        self.assertEqual(result["data"]["user"]["slots"][0]["name"], "Changed")
+    
+
+    def test_unchanged_responses_not_modified_without_cache(self):
+        etag = self.post("{ user { slots { name } } }").headers["ETag"]
+        response = self.post("{ user { slots { name } } }", etag=etag)
+        self.assertEqual(response.status_code, 304)
+        Slot.objects.filter(id=1).update(name="Changed")
+        response = self.post("{ user { slots { name } } }", etag=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["data"]["user"]["slots"][0]["name"], "Changed")
@@ -94,6 +94,11 @@ class SlotMutationTests(TokenFunctionaltest):
             slot { name }
         } }""", message="Does not exist")
 
+        # Index must not be negative
+        self.check_query_error("""mutation { moveSlot(id: 1, index: -2) {
+            slot { name }
+        } }""", message="Must not be negative")
+
 
     def test_slot_moving_protection(self):
         del self.client.headers["Authorization"]
@@ -102,6 +107,46 @@ class SlotMutationTests(TokenFunctionaltest):
         } }""", message="Not authorized")
     
 
+    def test_can_reorder_slots(self):
+        Slot.objects.create(name="Third", user=self.user, id=3)
+        result = self.client.execute("""mutation { reorderSlots(ids: [3, 1, 2]) {
+            slots { name order }
+        } }""")
+        self.assertEqual(result["data"]["reorderSlots"]["slots"], [
+            {"name": "Third", "order": 1},
+            {"name": "Public Work", "order": 2},
+            {"name": "Private Work", "order": 3},
+        ])
+        self.assertEqual(
+            list(self.user.slots.values_list("name", flat=True)),
+            ["Third", "Public Work", "Private Work"]
+        )
+    
+
+    def test_slot_reordering_validation(self):
+        # Every slot must be given
+        self.check_query_error("""mutation { reorderSlots(ids: [2]) {
+            slots { name }
+        } }""", message="exactly once")
+
+        # Only once
+        self.check_query_error("""mutation { reorderSlots(ids: [2, 1, 2]) {
+            slots { name }
+        } }""", message="exactly once")
+
+        # Only the user's
+        self.check_query_error("""mutation { reorderSlots(ids: [2, 100]) {
+            slots { name }
+        } }""", message="exactly once")
+    
+
+    def test_slot_reordering_protection(self):
+        del self.client.headers["Authorization"]
+        self.check_query_error("""mutation { reorderSlots(ids: [2, 1]) {
+            slots { name }
+        } }""", message="Not authorized")
+    
+
     def test_can_delete_slot(self):
         # Send deletion mutation
         slots_at_start = Slot.objects.count()
@@ -135,4 +180,21 @@ class SlotMutationTests(TokenFunctionaltest):
         del self.client.headers["Authorization"]
         self.check_query_error(
             """mutation { deleteSlot(id: 1) { success } }""", message="Not authorized"
-        )
\ No newline at end of file
+        )
+    
+
+    def test_can_delete_slots(self):
+        Slot.objects.create(name="Third", user=self.user)
+        result = self.client.execute("""mutation { deleteSlots(ids: [1, 2]) { success } }""")
+        self.assertTrue(result["data"]["deleteSlots"]["success"])
+        self.assertEqual(list(self.user.slots.values_list("name", flat=True)), ["Third"])
+    
+
+    def test_cant_delete_invalid_slots(self):
+        self.check_query_error("""mutation { deleteSlots(ids: [1, 100]) {
+            success
+        } }""", message="Does not exist")
+        self.check_query_error("""mutation { deleteSlots(ids: [1, 2]) {
+            success
+        } }""", message="at least one slot")
+        self.assertEqual(self.user.slots.count(), 2)
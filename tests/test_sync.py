@@ -0,0 +1,80 @@
+import time
+from .base import TokenFunctionaltest
+from core.models import Slot, Project, ProjectCategory
+
+QUERY = """query($since: Int!) { user { changes(since: $since) {
+    watermark slots { id name order } projects { id name category { name } }
+    projectCategories { id name order } deletions { model id }
+} } }"""
+
+class ChangesTests(TokenFunctionaltest):
+
+    def setUp(self):
+        TokenFunctionaltest.setUp(self)
+        for model in [Slot, Project, ProjectCategory]:
+            model.objects.update(updated_at=0)
+    
+
+    def changes(self, since):
+        result = self.client.execute(QUERY, variables={"since": since})
+        return result["data"]["user"]["changes"]
+    
+
+    def test_everything_sent_from_zero(self):
+        changes = self.changes(0)
+        self.assertLessEqual(abs(changes["watermark"] - (time.time() - 60)), 1)
+        self.assertEqual(len(changes["slots"]), self.user.slots.count())
+        self.assertEqual(len(changes["projects"]), self.user.projects.count())
+        self.assertEqual(len(changes["projectCategories"]), self.user.project_categories.count())
+        self.assertEqual(changes["deletions"], [])
+    
+
+    def test_only_changes_sent(self):
+        watermark = self.changes(0)["watermark"]
+        self.client.execute("""mutation {
+            updateSlot(id: 1, name: "X") { slot { name } }
+            deleteProject(id: 2) { success }
+            moveSlot(id: 2, index: 0) { slot { name } }
+        }""")
+        changes = self.changes(watermark)
+        self.assertEqual(sorted(changes["slots"], key=lambda slot: slot["id"]), [
+            {"id": "1", "name": "X", "order": 2},
+            {"id": "2", "name": "Private Work", "order": 1}
+        ])
+        self.assertEqual(changes["projects"], [])
+        self.assertEqual(changes["projectCategories"], [])
+        self.assertEqual(changes["deletions"], [{"model": "project", "id": "2"}])
+    
+
+    def test_slot_deletions_sent(self):
+        watermark = self.changes(0)["watermark"]
+        self.client.execute("mutation { deleteSlot(id: 1) { success } }")
+        changes = self.changes(watermark)
+        self.assertEqual(changes["slots"], [])
+        self.assertEqual(changes["deletions"], [{"model": "slot", "id": "1"}])
+    
+
+    def test_moves_send_only_moved_slot_with_sort_key(self):
+        slots = {slot["id"]: slot for slot in self.client.execute(
+            "{ user { slots { id sortKey } } }"
+        )["data"]["user"]["slots"]}
+        watermark = self.changes(0)["watermark"]
+        self.client.execute("mutation { moveSlot(id: 2, index: 0) { slot { id } } }")
+        changes = self.client.execute("""query($since: Int!) { user { changes(
+            since: $since
+        ) { slots { id sortKey } } } }""", variables={"since": watermark})
+        moved = changes["data"]["user"]["changes"]["slots"]
+        self.assertEqual([slot["id"] for slot in moved], ["2"])
+        slots.update({slot["id"]: slot for slot in moved})
+        self.assertEqual(sorted(slots, key=lambda id: slots[id]["sortKey"]), ["2", "1"])
+    
+
+    def test_changes_committed_after_poll_sent_next_time(self):
+        watermark = self.changes(0)["watermark"]
+        Slot.objects.filter(id=1).update(updated_at=int(time.time()) - 1)
+        self.assertEqual([slot["id"] for slot in self.changes(watermark)["slots"]], ["1"])
+    
+
+    def test_watermarks_older_than_tombstones_refused(self):
+        self.check_query_error("""{ user { changes(since: 1000) { watermark } } }""",
+            message="Too old")